@@ -8,6 +8,7 @@ from SREgent.llm import LLM
 from SREgent.logger import logger
 # from sandbox.client import SANDBOX_CLIENT
 from SREgent.schema import ROLE_TYPE, AgentState, Memory, Message
+from SREgent.tracing import tracer
 
 
 class BaseAgent(BaseModel, ABC):
@@ -53,6 +54,8 @@ class BaseAgent(BaseModel, ABC):
             self.llm = LLM()
         if not isinstance(self.memory, Memory):
             self.memory = Memory()
+        if self.memory.token_counter is None:
+            self.memory.set_token_counter(self.llm.token_counter)
         return self
 
     @asynccontextmanager
@@ -140,7 +143,8 @@ class BaseAgent(BaseModel, ABC):
             ):
                 self.current_step += 1
                 logger.info(f"Executing step {self.current_step}/{self.max_steps}")
-                step_result = await self.step()
+                with tracer.span("agent.step", agent=self.name, step=self.current_step):
+                    step_result = await self.step()
 
                 # Handle User Interaction (User as a Tool)
                 if self.state == AgentState.AWAITING_INPUT:
@@ -220,4 +224,4 @@ class BaseAgent(BaseModel, ABC):
     @messages.setter
     def messages(self, value: List[Message]):
         """Set the list of messages in the agent's memory."""
-        self.memory.messages = value
+        self.memory.set_messages(value)
@@ -4,7 +4,18 @@ from pydantic import Field
 
 from SREgent.agents.toolcall import ToolCallAgent
 from SREgent.config import SystemPrompts
-from SREgent.tool import Bash, Terminate, ToolCollection, AskUser# ,  StrReplaceEditor,
+from SREgent.tool import (
+    AskUser,
+    Bash,
+    DetectAnomalies,
+    EbpfTrace,
+    MetricsQuery,
+    ProcSnapshot,
+    StackProfile,
+    StrReplaceEditor,
+    Terminate,
+    ToolCollection,
+)
 
 
 class SWEAgent(ToolCallAgent):
@@ -17,7 +28,15 @@ class SWEAgent(ToolCallAgent):
     next_step_prompt: str = ""
 
     available_tools: ToolCollection = ToolCollection(
-        Bash(), Terminate(), AskUser()#  StrReplaceEditor()
+        Bash(),
+        StrReplaceEditor(),
+        EbpfTrace(),
+        ProcSnapshot(),
+        StackProfile(),
+        MetricsQuery(),
+        DetectAnomalies(),
+        Terminate(),
+        AskUser(),
     )
     special_tool_names: List[str] = Field(default_factory=lambda: [Terminate().name])
 
@@ -6,6 +6,7 @@ from pydantic import Field
 from SREgent.agents.base import BaseAgent
 from SREgent.llm import LLM
 from SREgent.schema import AgentState, Memory
+from SREgent.tracing import tracer
 
 
 class ReActAgent(BaseAgent, ABC):
@@ -33,10 +34,12 @@ class ReActAgent(BaseAgent, ABC):
 
     async def step(self) -> str:
         """Execute a single step: think and act."""
-        should_act = await self.think()
+        with tracer.span("agent.think"):
+            should_act = await self.think()
         if not should_act:
             return "Thinking complete - no action needed"
-        self.results = await self.act()
+        with tracer.span("agent.act"):
+            self.results = await self.act()
         return await self.answer()
 
     @abstractmethod
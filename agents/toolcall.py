@@ -1,14 +1,28 @@
 import asyncio
+import contextlib
 import json
-from typing import Any, List, Optional, Union, AsyncGenerator, Dict
+import uuid
+import weakref
+from typing import Any, Callable, List, Optional, Tuple, Union, AsyncGenerator, Dict
 
-from pydantic import Field
+from pydantic import Field, PrivateAttr
 
 from SREgent.agents.react import ReActAgent
 from SREgent.logger import logger
 from SREgent.config import NEXT_STEP_PROMPT, SYSTEM_PROMPT
-from SREgent.schema import TOOL_CHOICE_TYPE, AgentState, Message, ToolCall, ToolChoice
+from SREgent.schema import (
+    TOOL_CHOICE_TYPE,
+    AgentState,
+    Message,
+    Role,
+    StreamEvent,
+    StreamEventType,
+    ToolCall,
+    ToolChoice,
+)
 from SREgent.tool import CreateChatCompletion, Terminate, ToolCollection, AskUser
+from SREgent.tool.base import tool_session_id
+from SREgent.tracing import tracer
 
 
 TOOL_CALL_REQUIRED = "Tool calls required but none provided"
@@ -31,7 +45,30 @@ class ToolCallAgent(ReActAgent):
     special_tool_names: List[str] = Field(default_factory=lambda: [Terminate().name])
 
     tool_calls: List[ToolCall] = Field(default_factory=list)
+    parallel_tool_calls: bool = Field(
+        default=True, description="Run multiple tool calls from one response concurrently"
+    )
+    max_concurrent_tools: int = Field(
+        default=4, description="Maximum number of tool calls executed at once"
+    )
+    stream_tool_calls: bool = Field(
+        default=False, description="Stream responses and start tool calls as they complete"
+    )
+    on_stream_event: Optional[Callable[[StreamEvent], Any]] = Field(
+        default=None, description="Called with every streamed event (reasoning, content, ...)"
+    )
     results: Dict = Field(default_factory=dict)
+    session_id: str = Field(
+        default_factory=lambda: uuid.uuid4().hex,
+        description="Keys this agent's state in stateful tools (e.g. its own bash shell)",
+    )
+
+    # (concurrency semaphore, per-tool locks) for each event loop the agent runs on
+    _tool_limits: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Tuple[asyncio.Semaphore, Dict[str, asyncio.Lock]]]" = PrivateAttr(
+        default_factory=weakref.WeakKeyDictionary
+    )
+    # tool calls started while the response streamed, by position in the message's tool_calls
+    _streamed_tasks: Dict[int, asyncio.Task] = PrivateAttr(default_factory=dict)
     # _current_base64_image: Optional[str] = None
 
     # max_steps: int = 30
@@ -55,21 +92,25 @@ class ToolCallAgent(ReActAgent):
     async def think(self) -> bool:
         """Process current state and decide next actions using tools"""
         if self.next_step_prompt:
-            user_msg = Message.user_message(self.next_step_prompt)
-            self.messages += [user_msg]
+            user_msg = Message.user_message(self.next_step_prompt, step_prompt=True)
+            self.memory.add_message(user_msg)
 
+        system_msgs = (
+            [Message.system_message(self.system_prompt)]
+            if self.system_prompt
+            else None
+        )
         try:
             # Get response with tool options
-            response = await self.llm.ask_tool(
-                messages=self.messages,
-                system_msgs=(
-                    [Message.system_message(self.system_prompt)]
-                    if self.system_prompt
-                    else None
-                ),
-                tools=self.available_tools.to_params(),
-                tool_choice=self.tool_choices,
-            )
+            if self.stream_tool_calls:
+                response = await self._stream_response(system_msgs)
+            else:
+                response = await self.llm.ask_tool(
+                    messages=self.messages,
+                    system_msgs=system_msgs,
+                    tools=self.available_tools,
+                    tool_choice=self.tool_choices,
+                )
         except ValueError:
             raise
         except Exception as e:
@@ -91,13 +132,6 @@ class ToolCallAgent(ReActAgent):
         self.tool_calls = tool_calls = (
             response.tool_calls if response and response.tool_calls else []
         )
-        if len(tool_calls) > 1:
-            self.memory.add_message(
-                Message.assistant_message(
-                    "请你一次只调用一个工具"
-                )
-            )
-            return False
         content = response.content if response and response.content else ""
         self.results = {'reasoning' : content}
         self.results.update({'tool_use' : [call.function.name for call in tool_calls]})
@@ -111,13 +145,11 @@ class ToolCallAgent(ReActAgent):
             logger.info(
                 f"🧰 Tools being prepared: {[call.function.name for call in tool_calls]}"
             )
-            # Parse arguments
-            raw_args = tool_calls[0].function.arguments or "{}"
-            
-            # Use generic cleaning method
-            raw_args = self._clean_args(raw_args)
-            self.tool_calls[0].function.arguments = raw_args
-            logger.info(f"🔧 Tool arguments: {raw_args}")
+            for call in self.tool_calls:
+                # Use generic cleaning method
+                raw_args = self._clean_args(call.function.arguments)
+                call.function.arguments = raw_args
+                logger.info(f"🔧 Tool arguments for '{call.function.name}': {raw_args}")
 
         try:
             if response is None:
@@ -140,7 +172,8 @@ class ToolCallAgent(ReActAgent):
                 if self.tool_calls
                 else Message.assistant_message(content)
             )
-            self.memory.add_message(assistant_msg)
+            with tracer.span("memory.update", messages=1):
+                self.memory.add_message(assistant_msg)
 
             if self.tool_choices == ToolChoice.REQUIRED and not self.tool_calls:
                 return True  # Will be handled in act()
@@ -152,6 +185,8 @@ class ToolCallAgent(ReActAgent):
             return bool(self.tool_calls)
         except Exception as e:
             logger.error(f"🚨 Oops! The {self.name}'s thinking process hit a snag: {e}")
+            # act() will not run to collect calls started while streaming
+            self._cancel_streamed_tasks()
             self.memory.add_message(
                 Message.assistant_message(
                     f"Error encountered while processing: {str(e)}"
@@ -159,32 +194,133 @@ class ToolCallAgent(ReActAgent):
             )
             return False
 
-    async def act(self) -> Dict:
-        """Execute tool calls and handle their results"""
+    async def _stream_response(self, system_msgs: Optional[List[Message]]) -> Message:
+        """Get the next response via `ask_tool_stream`.
 
-        for command in self.tool_calls:
-            # Reset base64_image for each tool call
-            # self._current_base64_image = None
+        With `parallel_tool_calls`, each ordinary tool call is started as soon as its
+        arguments are complete, while the rest of the message is still streaming;
+        `act` then collects the running tasks. Special tools and ask_user are left
+        to `act`, since they change the agent state. Calls are keyed by their
+        position in the message, since servers may send empty or repeated ids.
+        """
+        self._cancel_streamed_tasks()
+        try:
+            async for event in self.llm.ask_tool_stream(
+                messages=self.messages,
+                system_msgs=system_msgs,
+                tools=self.available_tools,
+                tool_choice=self.tool_choices,
+            ):
+                if self.on_stream_event:
+                    self.on_stream_event(event)
+
+                if event.type == StreamEventType.TOOL_CALL:
+                    call = event.tool_call
+                    name = call.function.name
+                    if (
+                        self.parallel_tool_calls
+                        and self.tool_choices != ToolChoice.NONE
+                        and not self._is_special_tool(name)
+                        and name.lower() != "ask_user"
+                    ):
+                        logger.info(f"🚀 Starting tool '{name}' while the response streams")
+                        self._streamed_tasks[event.index] = asyncio.create_task(
+                            self._run_tool_call(call)
+                        )
+                elif event.type == StreamEventType.DONE:
+                    return Message(
+                        role=Role.ASSISTANT,
+                        content=event.content,
+                        tool_calls=event.tool_calls or None,
+                    )
+        except BaseException:
+            self._cancel_streamed_tasks()
+            raise
+        self._cancel_streamed_tasks()
+        raise RuntimeError("Stream ended without a final event")
 
-            result = await self.execute_tool(command)
-            self.results.update({'result' : result})
+    def _cancel_streamed_tasks(self) -> None:
+        for task in self._streamed_tasks.values():
+            task.cancel()
+        self._streamed_tasks = {}
 
+    async def act(self) -> Dict:
+        """Execute tool calls and handle their results"""
+        # Calls already started while the response was streaming
+        started, self._streamed_tasks = self._streamed_tasks, {}
 
+        if self.parallel_tool_calls and len(self.tool_calls) > 1:
             logger.info(
-                f"🎯 Tool '{command.function.name}' completed its mission! Result: {result}"
+                f"⚡ Running {len(self.tool_calls)} tool calls concurrently (limit {self.max_concurrent_tools})"
             )
-
-            # Add tool response to memory
-            tool_msg = Message.tool_message(
-                content=result,
-                tool_call_id=command.id,
-                name=command.function.name,
-                # base64_image=self._current_base64_image,
+            results = await asyncio.gather(
+                *(
+                    started.pop(position, None) or self._run_tool_call(command)
+                    for position, command in enumerate(self.tool_calls)
+                )
             )
-            self.memory.add_message(tool_msg)
+        else:
+            results = []
+            for position, command in enumerate(self.tool_calls):
+                task = started.pop(position, None)
+                results.append(await task if task else await self.execute_tool(command))
+
+        for task in started.values():
+            task.cancel()
+
+        # Results are recorded in the order the model issued the calls. Once a
+        # special tool or ask_user has answered, later calls must not hide its result.
+        with tracer.span("memory.update", messages=len(results)):
+            pinned = False
+            for command, result in zip(self.tool_calls, results):
+                if not pinned:
+                    self.results.update({'result' : result})
+                name = command.function.name
+                pinned = pinned or self._is_special_tool(name) or name.lower() == "ask_user"
+
+                logger.info(
+                    f"🎯 Tool '{command.function.name}' completed its mission! Result: {result}"
+                )
+
+                # Add tool response to memory
+                tool_msg = Message.tool_message(
+                    content=result,
+                    tool_call_id=command.id,
+                    name=command.function.name,
+                    # base64_image=self._current_base64_image,
+                )
+                self.memory.add_message(tool_msg)
 
         return self.results
 
+    async def _run_tool_call(self, command: ToolCall) -> str:
+        """Execute a tool call under the agent's concurrency limit.
+
+        At most `max_concurrent_tools` calls run at once. Calls to a tool flagged as
+        `stateful` (e.g. the shared bash session) are serialized on a per-tool lock;
+        the editor serializes edits of the same file itself.
+        """
+        loop = asyncio.get_running_loop()
+        limits = self._tool_limits.get(loop)
+        if limits is None:
+            limits = self._tool_limits[loop] = (
+                asyncio.Semaphore(max(1, self.max_concurrent_tools)),
+                {},
+            )
+        semaphore, locks = limits
+
+        name = command.function.name if command and command.function else None
+        tool = self.available_tools.get_tool(name) if name else None
+        lock = (
+            locks.setdefault(name, asyncio.Lock())
+            if tool is not None and tool.stateful
+            else contextlib.nullcontext()
+        )
+        # Take the tool lock before a slot, so queued stateful calls don't hold slots
+        async with lock:
+            async with semaphore:
+                return await self.execute_tool(command)
+
     async def answer(self) -> str:
         if not self.results:
             return ""
@@ -234,11 +370,17 @@ class ToolCallAgent(ReActAgent):
 
         try:
             # Parse arguments
-            args = json.loads(cleaned_args)
+            with tracer.span("tool.parse_args", tool=name):
+                args = json.loads(cleaned_args)
 
             # Execute the tool
             logger.info(f"🔧 Activating tool: '{name}'...")
-            result = await self.available_tools.execute(name=name, tool_input=args)
+            token = tool_session_id.set(self.session_id)
+            try:
+                with tracer.span("tool.execute", tool=name, tool_call_id=command.id):
+                    result = await self.available_tools.execute(name=name, tool_input=args)
+            finally:
+                tool_session_id.reset(token)
 
             # Handle special tools
             await self._handle_special_tool(name=name, result=result)
@@ -302,6 +444,26 @@ class ToolCallAgent(ReActAgent):
                     )
         logger.info(f"✨ Cleanup complete for agent '{self.name}'.")
 
+    async def close(self) -> None:
+        """Release this agent's state in stateful tools (e.g. close its bash shell).
+
+        Not part of `cleanup`: the shell's working directory and environment carry
+        over between runs, like the agent's memory. Call it when the agent is
+        discarded; shells left open are closed after BASH_SESSION_CONFIG["IDLE_TIMEOUT"].
+        """
+        token = tool_session_id.set(self.session_id)
+        try:
+            for tool_name, tool_instance in self.available_tools.tool_map.items():
+                close_session = getattr(tool_instance, "close_session", None)
+                if close_session is None or not asyncio.iscoroutinefunction(close_session):
+                    continue
+                try:
+                    await close_session()
+                except Exception as e:
+                    logger.error(f"🚨 Error closing session of tool '{tool_name}': {e}", exc_info=True)
+        finally:
+            tool_session_id.reset(token)
+
     async def run(self, request: Optional[str] = None) -> AsyncGenerator[str, str]:
         """Run the agent with cleanup when done."""
         try:
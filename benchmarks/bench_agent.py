@@ -0,0 +1,277 @@
+"""Agent-loop overhead against a local mock OpenAI-compatible server.
+
+Drives `SWEAgent` (bash + terminate) or a plain `ToolCallAgent` through N
+scripted steps served by `MockOpenAIServer`, so no API quota or network variance
+is involved. Timings come from the tracer spans (agent.step, llm.request /
+llm.stream, tool.execute); framework overhead per step is the step time not
+covered by model or tool time. Memory growth is measured in a second run under
+tracemalloc so it does not skew the timings.
+
+Usage (from the directory containing the SREgent package):
+    python -m SREgent.benchmarks.bench_agent [--steps 20] [--latency 0.05] [--stream]
+        [--agent swe|toolcall] [--output report.json]
+
+Compare two reports with e.g. `jq .overhead_ms` on each commit's output.
+Without a cached tiktoken encoding, token counts are approximated (see
+`token_counting.encoding` in the report).
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from typing import Any, Dict, List, Optional, Tuple
+from unittest import mock
+
+import tiktoken
+
+from SREgent.benchmarks.mock_server import MockOpenAIServer
+from SREgent.llm import LLM
+from SREgent.tracing import RingBufferSink, Span, tracer
+
+
+def build_script(steps: int, agent: str) -> List[Dict[str, Any]]:
+    """N tool-calling turns followed by a terminate call.
+
+    Content differs per step so the agent's stuck detection never fires.
+    """
+    script = []
+    for i in range(steps - 1):
+        if agent == "swe":
+            call = {"name": "bash", "arguments": {"command": f"echo step {i}"}}
+        else:
+            call = {"name": "create_chat_completion", "arguments": {"response": f"step {i}"}}
+        script.append({"content": f"Step {i}: checking the next item.", "tool_calls": [call]})
+    script.append(
+        {
+            "content": "All checks done.",
+            "tool_calls": [{"name": "terminate", "arguments": {"status": "success"}}],
+        }
+    )
+    return script
+
+
+def _make_agent(kind: str, llm: LLM, steps: int, stream: bool):
+    if kind == "swe":
+        from SREgent.agents.code import SWEAgent
+
+        return SWEAgent(llm=llm, max_steps=steps, stream_tool_calls=stream)
+
+    from SREgent.agents.toolcall import ToolCallAgent
+
+    return ToolCallAgent(llm=llm, max_steps=steps, stream_tool_calls=stream)
+
+
+def _covered_ms(intervals: List[Tuple[float, float]]) -> float:
+    """Total length of the union of (start, end) intervals, in ms"""
+    total = 0.0
+    current_start, current_end = None, None
+    for start, end in sorted(intervals):
+        if current_end is None or start > current_end:
+            if current_end is not None:
+                total += current_end - current_start
+            current_start, current_end = start, end
+        else:
+            current_end = max(current_end, end)
+    if current_end is not None:
+        total += current_end - current_start
+    return total * 1000
+
+
+def _summary(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {}
+    values = sorted(values)
+    return {
+        "mean": round(statistics.mean(values), 3),
+        "median": round(statistics.median(values), 3),
+        "p95": round(values[min(len(values) - 1, int(len(values) * 0.95))], 3),
+        "max": round(values[-1], 3),
+    }
+
+
+def _step_breakdown(spans: List[Span]) -> Dict[str, Any]:
+    """Split each agent.step into model time, tool time and framework overhead"""
+    by_id = {s.span_id: s for s in spans}
+
+    def step_of(span: Span) -> Optional[Span]:
+        while span is not None and span.name != "agent.step":
+            span = by_id.get(span.parent_id)
+        return span
+
+    external: Dict[str, List[Tuple[float, float]]] = {}
+    tool_ms: Dict[str, float] = {}
+    for span in spans:
+        if span.name not in ("llm.request", "llm.stream", "tool.execute"):
+            continue
+        step = step_of(span)
+        if step is None:
+            continue
+        external.setdefault(step.span_id, []).append((span.start_time, span.end_time))
+        if span.name == "tool.execute":
+            tool = span.attributes.get("tool", "?")
+            tool_ms[tool] = tool_ms.get(tool, 0.0) + span.duration_ms
+
+    steps = [s for s in spans if s.name == "agent.step"]
+    overhead = [
+        max(0.0, s.duration_ms - _covered_ms(external.get(s.span_id, []))) for s in steps
+    ]
+    return {
+        "steps": len(steps),
+        "step_ms": _summary([s.duration_ms for s in steps]),
+        "overhead_ms": _summary(overhead),
+        "llm_ms": _summary(
+            [s.duration_ms for s in spans if s.name in ("llm.request", "llm.stream")]
+        ),
+        "tool_execute_ms": _summary(
+            [s.duration_ms for s in spans if s.name == "tool.execute"]
+        ),
+        "tool_total_ms": {k: round(v, 3) for k, v in tool_ms.items()},
+        "memory_update_ms": _summary(
+            [s.duration_ms for s in spans if s.name == "memory.update"]
+        ),
+    }
+
+
+def _token_throughput(llm: LLM, messages: List[dict], min_seconds: float = 0.2) -> Dict[str, Any]:
+    """Tokens counted per second over the final conversation (dicts are never cached)"""
+    rounds, tokens = 0, 0
+    start = time.perf_counter()
+    while True:
+        tokens += llm.count_message_tokens(messages)
+        rounds += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_seconds:
+            break
+    return {
+        "messages": len(messages),
+        "tokens_per_pass": tokens // rounds,
+        "tokens_per_sec": round(tokens / elapsed),
+    }
+
+
+class _ApproxEncoding:
+    """About 4 bytes per token; used when the real encoding cannot be downloaded"""
+
+    name = "approx-4-bytes"
+
+    def encode(self, text: str, **kwargs) -> range:
+        return range((len(text.encode("utf-8")) + 3) // 4)
+
+
+def _load_encoding(model: str) -> Any:
+    """tiktoken's encoding for `model` (cached after the first download), else an approximation"""
+    try:
+        return tiktoken.encoding_for_model(model)
+    except Exception as e:
+        print(
+            f"warning: tiktoken encoding for {model} unavailable ({type(e).__name__}); "
+            "token counts are approximate. Set TIKTOKEN_CACHE_DIR to a cache holding it for exact counts.",
+            file=sys.stderr,
+        )
+        return _ApproxEncoding()
+
+
+async def _run_agent(args, server: MockOpenAIServer, encoding: Any) -> Any:
+    # the encoding is handed in, so the benchmark never needs the network
+    with mock.patch.object(tiktoken, "encoding_for_model", return_value=encoding):
+        llm = LLM(model="gpt-4o", base_url=server.base_url, api_key="mock")
+    # Measure the loop, not the client-side limiter or cache
+    llm.rate_limiter = None
+    llm.cache = None
+    agent = _make_agent(args.agent, llm, args.steps, args.stream)
+    async for _ in agent.run("Run the benchmark checks."):
+        pass
+    return agent
+
+
+async def main(args) -> dict:
+    script = build_script(args.steps, args.agent)
+    encoding = _load_encoding("gpt-4o")
+
+    sink = tracer.add_sink(RingBufferSink(maxlen=100_000))
+    try:
+        async with MockOpenAIServer(
+            script, latency=args.latency, chunk_delay=args.chunk_delay
+        ) as server:
+            start = time.perf_counter()
+            agent = await _run_agent(args, server, encoding)
+            wall = time.perf_counter() - start
+            requests = server.requests
+    finally:
+        tracer.remove_sink(sink)
+    spans = sink.spans()
+
+    # Second pass under tracemalloc for memory growth
+    tracemalloc.start()
+    try:
+        async with MockOpenAIServer(script) as server:
+            before, _ = tracemalloc.get_traced_memory()
+            mem_agent = await _run_agent(args, server, encoding)
+            after, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    messages = [m.to_dict() for m in agent.memory.messages]
+    report = {
+        "commit": _git_commit(),
+        "config": {
+            "agent": args.agent,
+            "steps": args.steps,
+            "stream": args.stream,
+            "latency_s": args.latency,
+            "chunk_delay_s": args.chunk_delay,
+        },
+        "wall_seconds": round(wall, 3),
+        "llm_requests": requests,
+        **_step_breakdown(spans),
+        "token_counting": {"encoding": encoding.name, **_token_throughput(agent.llm, messages)},
+        "memory": {
+            "messages": len(mem_agent.memory.messages),
+            "memory_tokens": mem_agent.memory.total_tokens,
+            "growth_bytes": after - before,
+            "growth_bytes_per_step": (after - before) // max(1, args.steps),
+            "peak_bytes": peak - before,
+        },
+    }
+    await LLM.aclose()
+    return report
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Agent loop overhead benchmark")
+    parser.add_argument("--steps", type=int, default=20)
+    parser.add_argument("--agent", choices=["swe", "toolcall"], default="swe")
+    parser.add_argument("--stream", action="store_true", help="Stream tool calls")
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="Simulated model latency (s)"
+    )
+    parser.add_argument(
+        "--chunk-delay", type=float, default=0.0, help="Delay between streamed chunks (s)"
+    )
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    args = parser.parse_args()
+
+    report = asyncio.run(main(args))
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    print(text)
@@ -0,0 +1,114 @@
+"""Per-command latency of the Bash tool session reader.
+
+Compares the event-driven sentinel reader in `_BashSession.run` against the
+previous implementation, which slept `_output_delay` per loop and decoded the
+whole StreamReader buffer on every tick. Note that the polling reader never
+consumes the buffer, so once it exceeds the StreamReader limit the transport is
+paused and large outputs only finish by timing out.
+
+Usage (from the directory containing the SREgent package):
+    python -m SREgent.benchmarks.bench_bash [--repeat 20] [--big-mb 50]
+"""
+import argparse
+import asyncio
+import json
+import os
+import signal
+import statistics
+import time
+
+from SREgent.exceptions import ToolError
+from SREgent.tool.base import CLIResult
+from SREgent.tool.bash import _BashSession
+
+
+class _PollingBashSession(_BashSession):
+    """The previous polling reader, kept here only as a baseline."""
+
+    _output_delay: float = 0.2  # seconds
+
+    async def run(self, command: str):
+        self._process.stdin.write(
+            command.encode() + f"; echo '{self._sentinel}'\n".encode()
+        )
+        await self._process.stdin.drain()
+
+        try:
+            async with asyncio.timeout(self._timeout):
+                while True:
+                    await asyncio.sleep(self._output_delay)
+                    output = self._process.stdout._buffer.decode()
+                    if self._sentinel in output:
+                        output = output[: output.index(self._sentinel)]
+                        break
+        except asyncio.TimeoutError:
+            self._timed_out = True
+            raise ToolError(
+                f"timed out: bash has not returned in {self._timeout} seconds and must be restarted",
+            ) from None
+
+        error = self._process.stderr._buffer.decode()
+        self._process.stdout._buffer.clear()
+        self._process.stderr._buffer.clear()
+        return CLIResult(output=output, error=error)
+
+
+async def _measure(session_cls, command: str, repeat: int, timeout: float) -> dict:
+    session = session_cls()
+    session._timeout = timeout
+    await session.start()
+    samples = []
+    error = None
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            try:
+                result = await session.run(command)
+            except ToolError as e:
+                error = e.message
+                break
+            samples.append(time.perf_counter() - start)
+    finally:
+        # kill the whole group and close the pipes: the polling reader can leave
+        # the stdout transport paused, in which case EOF is never observed
+        os.killpg(session._process.pid, signal.SIGKILL)
+        session._process._transport.close()
+        await session._process.wait()
+
+    if not samples:
+        return {"runs": 0, "error": error}
+    return {
+        "runs": len(samples),
+        "mean_ms": round(statistics.mean(samples) * 1000, 2),
+        "min_ms": round(min(samples) * 1000, 2),
+        "max_ms": round(max(samples) * 1000, 2),
+        "output_bytes": len(result.output or ""),
+        "exit_code": getattr(result, "exit_code", None),
+        "error": error,
+    }
+
+
+async def main(repeat: int, big_mb: int, timeout: float) -> dict:
+    big_command = f"head -c {big_mb * 1024 * 1024} /dev/zero | tr '\\0' 'a' | fold -w 1023"
+    cases = {
+        "true": (repeat, "true"),
+        f"print_{big_mb}mb": (max(1, repeat // 10), big_command),
+    }
+    report = {}
+    for case, (runs, command) in cases.items():
+        report[case] = {
+            "before": await _measure(_PollingBashSession, command, runs, timeout),
+            "after": await _measure(_BashSession, command, runs, timeout),
+        }
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bash tool reader microbenchmark")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--big-mb", type=int, default=50)
+    parser.add_argument(
+        "--timeout", type=float, default=30.0, help="Per-command timeout in seconds"
+    )
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(main(args.repeat, args.big_mb, args.timeout)), indent=2))
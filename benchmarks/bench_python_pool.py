@@ -0,0 +1,77 @@
+"""exec_python latency: cold `python -c` start vs. the warm worker pool.
+
+Each snippet is run `--repeat` times through `aexec_python` with and without
+`use_pool`. Preloaded modules (`--preload numpy,pandas`) are imported once per
+worker, so snippets using them skip the import cost entirely.
+
+Usage (from the directory containing the SREgent package):
+    python -m SREgent.benchmarks.bench_python_pool [--repeat 20] [--preload numpy]
+"""
+import argparse
+import asyncio
+import importlib.util
+import json
+import statistics
+import time
+
+from SREgent.tool import python_pool
+from SREgent.tool.python_pool import PythonWorkerPool
+from SREgent.tool.tool import aexec_python
+
+
+SNIPPETS = {
+    "print": "print('hello')",
+    "stdlib": "import json, re, collections; print(json.dumps({'a': 1}))",
+    "numpy": "import numpy as np; print(np.arange(1000).sum())",
+    "pandas": "import pandas as pd; print(pd.DataFrame({'a': range(100)}).a.sum())",
+}
+
+
+async def _measure(code: str, repeat: int, use_pool: bool) -> dict:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = await aexec_python(code, timeout=60, use_pool=use_pool)
+        samples.append(time.perf_counter() - start)
+        if not result["ok"]:
+            return {"error": result.get("error") or result.get("stderr")}
+    return {
+        "runs": len(samples),
+        "mean_ms": round(statistics.mean(samples) * 1000, 2),
+        "median_ms": round(statistics.median(samples) * 1000, 2),
+        "min_ms": round(min(samples) * 1000, 2),
+    }
+
+
+async def main(repeat: int, preload: list, size: int) -> dict:
+    pool = PythonWorkerPool(size=size, preload=preload, max_runs=repeat * len(SNIPPETS) + 1)
+    # route aexec_python(use_pool=True) to this pool
+    python_pool._pools[asyncio.get_running_loop()] = pool
+    await pool.start()
+
+    report = {"preload": preload, "pool_size": size}
+    try:
+        for name, code in SNIPPETS.items():
+            module = name if name in ("numpy", "pandas") else None
+            if module and importlib.util.find_spec(module) is None:
+                report[name] = {"skipped": f"{module} not installed"}
+                continue
+            report[name] = {
+                "cold": await _measure(code, repeat, use_pool=False),
+                "pooled": await _measure(code, repeat, use_pool=True),
+            }
+    finally:
+        await pool.close()
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="exec_python cold start vs. worker pool")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--size", type=int, default=2, help="Workers in the pool")
+    parser.add_argument(
+        "--preload", default="", help="Comma-separated modules to import in each worker"
+    )
+    args = parser.parse_args()
+    preload = [m.strip() for m in args.preload.split(",") if m.strip()]
+    print(json.dumps(asyncio.run(main(args.repeat, preload, args.size)), indent=2))
@@ -0,0 +1,241 @@
+"""A local stand-in for an OpenAI-compatible `/v1/chat/completions` endpoint.
+
+Replays scripted responses (plain content or tool calls), either as one JSON
+body or as SSE streaming chunks, with configurable latency. Only the standard
+library is used, so benchmarks run offline without API quota.
+
+Script entries:
+    {"content": "text", "tool_calls": [{"name": "bash", "arguments": {"command": "ls"}}]}
+"""
+import asyncio
+import itertools
+import json
+import time
+from typing import Any, Dict, List, Optional
+
+
+class MockOpenAIServer:
+    """Serves scripted chat completions over HTTP/1.1 with keep-alive.
+
+    Args:
+        script: Responses returned in order (cycled when exhausted)
+        latency: Seconds to wait before responding (simulated model time)
+        chunk_delay: Seconds between streamed chunks
+        chunk_size: Characters of content / arguments per streamed chunk
+    """
+
+    def __init__(
+        self,
+        script: List[Dict[str, Any]],
+        latency: float = 0.0,
+        chunk_delay: float = 0.0,
+        chunk_size: int = 16,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ):
+        self.script = script
+        self.latency = latency
+        self.chunk_delay = chunk_delay
+        self.chunk_size = chunk_size
+        self.host = host
+        self.port = port
+
+        self.requests = 0
+        self.simulated_seconds = 0.0
+        self._responses = itertools.cycle(script)
+        self._ids = itertools.count()
+        self._server: Optional[asyncio.base_events.Server] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}/v1"
+
+    async def start(self) -> "MockOpenAIServer":
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def __aenter__(self) -> "MockOpenAIServer":
+        return await self.start()
+
+    async def __aexit__(self, *exc) -> None:
+        await self.stop()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode().split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    key, _, value = line.decode().partition(":")
+                    headers[key.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+
+                if method != "POST" or not path.rstrip("/").endswith("/chat/completions"):
+                    await self._send_json(writer, 404, {"error": {"message": "not found"}})
+                    continue
+
+                request = json.loads(body or b"{}")
+                self.requests += 1
+                if self.latency:
+                    await asyncio.sleep(self.latency)
+                    self.simulated_seconds += self.latency
+
+                scripted = next(self._responses)
+                if request.get("stream"):
+                    await self._send_stream(writer, request, scripted, len(body))
+                else:
+                    await self._send_json(
+                        writer, 200, self._completion(request, scripted, len(body))
+                    )
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    def _tool_calls(self, scripted: Dict[str, Any]) -> List[Dict[str, Any]]:
+        return [
+            {
+                "id": f"call_{next(self._ids)}",
+                "type": "function",
+                "function": {
+                    "name": call["name"],
+                    "arguments": json.dumps(call.get("arguments", {})),
+                },
+            }
+            for call in scripted.get("tool_calls", [])
+        ]
+
+    @staticmethod
+    def _usage(body_size: int, scripted: Dict[str, Any]) -> Dict[str, int]:
+        # Rough estimate: ~4 bytes per token
+        prompt = body_size // 4
+        completion = len(json.dumps(scripted)) // 4
+        return {
+            "prompt_tokens": prompt,
+            "completion_tokens": completion,
+            "total_tokens": prompt + completion,
+        }
+
+    def _completion(
+        self, request: Dict[str, Any], scripted: Dict[str, Any], body_size: int
+    ) -> Dict[str, Any]:
+        tool_calls = self._tool_calls(scripted)
+        message: Dict[str, Any] = {
+            "role": "assistant",
+            "content": scripted.get("content"),
+        }
+        if tool_calls:
+            message["tool_calls"] = tool_calls
+        return {
+            "id": f"chatcmpl-{self.requests}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "mock"),
+            "choices": [
+                {
+                    "index": 0,
+                    "message": message,
+                    "finish_reason": "tool_calls" if tool_calls else "stop",
+                }
+            ],
+            "usage": self._usage(body_size, scripted),
+        }
+
+    def _chunks(self, request: Dict[str, Any], scripted: Dict[str, Any], body_size: int):
+        """Yield chat.completion.chunk payloads the way OpenAI streams them"""
+
+        def chunk(delta: Dict[str, Any], finish: Optional[str] = None, usage=None):
+            payload = {
+                "id": f"chatcmpl-{self.requests}",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": request.get("model", "mock"),
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish}],
+            }
+            if usage is not None:
+                payload["choices"] = []
+                payload["usage"] = usage
+            return payload
+
+        yield chunk({"role": "assistant", "content": ""})
+        content = scripted.get("content") or ""
+        for i in range(0, len(content), self.chunk_size):
+            yield chunk({"content": content[i : i + self.chunk_size]})
+
+        tool_calls = self._tool_calls(scripted)
+        for index, call in enumerate(tool_calls):
+            yield chunk(
+                {
+                    "tool_calls": [
+                        {
+                            "index": index,
+                            "id": call["id"],
+                            "type": "function",
+                            "function": {"name": call["function"]["name"], "arguments": ""},
+                        }
+                    ]
+                }
+            )
+            arguments = call["function"]["arguments"]
+            for i in range(0, len(arguments), self.chunk_size):
+                yield chunk(
+                    {
+                        "tool_calls": [
+                            {
+                                "index": index,
+                                "function": {"arguments": arguments[i : i + self.chunk_size]},
+                            }
+                        ]
+                    }
+                )
+
+        yield chunk({}, finish="tool_calls" if tool_calls else "stop")
+        if (request.get("stream_options") or {}).get("include_usage"):
+            yield chunk({}, usage=self._usage(body_size, scripted))
+
+    async def _send_stream(self, writer, request, scripted, body_size: int) -> None:
+        writer.write(
+            b"HTTP/1.1 200 OK\r\n"
+            b"Content-Type: text/event-stream\r\n"
+            b"Transfer-Encoding: chunked\r\n"
+            b"Connection: keep-alive\r\n\r\n"
+        )
+
+        async def send(data: bytes) -> None:
+            writer.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+            await writer.drain()
+
+        for payload in self._chunks(request, scripted, body_size):
+            await send(f"data: {json.dumps(payload)}\n\n".encode())
+            if self.chunk_delay:
+                await asyncio.sleep(self.chunk_delay)
+                self.simulated_seconds += self.chunk_delay
+        await send(b"data: [DONE]\n\n")
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+    @staticmethod
+    async def _send_json(writer, status: int, payload: Dict[str, Any]) -> None:
+        body = json.dumps(payload).encode()
+        reason = "OK" if status == 200 else "Not Found"
+        writer.write(
+            f"HTTP/1.1 {status} {reason}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: keep-alive\r\n\r\n".encode()
+            + body
+        )
+        await writer.drain()
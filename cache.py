@@ -0,0 +1,267 @@
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from SREgent.config import LLM_CACHE_CONFIG
+from SREgent.logger import logger
+
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+# LRU access times are written in batches: after this many hits or seconds
+_TOUCH_BATCH = 64
+_TOUCH_INTERVAL = 5.0
+
+
+def _digest(payload: Any) -> str:
+    return hashlib.sha256(
+        json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str).encode()
+    ).hexdigest()
+
+
+def _words(text: str) -> set:
+    """Word set used by the similarity tier (CJK text falls back to characters)"""
+    words = set(_WORD_RE.findall(text.lower()))
+    if len(words) <= 1:
+        words = {ch for ch in text.lower() if not ch.isspace()}
+    return words
+
+
+class ResponseCache:
+    """LLM response cache backed by SQLite, so it survives restarts.
+
+    Two lookup tiers:
+    - exact: hash of the formatted messages, tools, tool_choice, model and temperature
+    - similar (optional, temperature-0 calls only): same context (everything except
+      the last user message) and a last user message whose word-set Jaccard
+      similarity reaches `similarity_threshold`
+
+    Entries expire after `ttl` seconds and the least recently used ones are evicted
+    beyond `max_entries`. Lookups only read; hits record their access time in
+    memory, written out in batches (and before every insert, so eviction sees
+    them). Calls block on SQLite; async callers run them in a thread.
+    """
+
+    def __init__(
+        self,
+        path: str = ":memory:",
+        max_entries: int = 1000,
+        ttl: Optional[float] = 3600.0,
+        similarity_threshold: Optional[float] = None,
+    ):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.similarity_threshold = similarity_threshold
+
+        self.hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        # key -> access time not written yet
+        self._touched: Dict[str, float] = {}
+        self._touches_written = time.monotonic()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                context_key TEXT NOT NULL,
+                query TEXT NOT NULL,
+                temperature REAL,
+                kind TEXT NOT NULL,
+                response TEXT NOT NULL,
+                created REAL NOT NULL,
+                accessed REAL NOT NULL
+            )"""
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS responses_context ON responses (context_key)"
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)"
+        )
+        self._db.commit()
+
+    @classmethod
+    def from_config(cls) -> "ResponseCache":
+        return cls(
+            path=LLM_CACHE_CONFIG["PATH"],
+            max_entries=LLM_CACHE_CONFIG["MAX_ENTRIES"],
+            ttl=LLM_CACHE_CONFIG["TTL"],
+            similarity_threshold=LLM_CACHE_CONFIG["SIMILARITY_THRESHOLD"],
+        )
+
+    @staticmethod
+    def make_keys(kind: str, params: Dict[str, Any]) -> Tuple[str, str, str]:
+        """Build (exact key, context key, query text) from completion params.
+
+        Only request-shaping fields take part; e.g. the timeout does not.
+        """
+        messages: List[dict] = params.get("messages") or []
+        last_user = max(
+            (i for i, msg in enumerate(messages) if msg.get("role") == "user"),
+            default=None,
+        )
+        query = ""
+        context_messages = messages
+        if last_user is not None:
+            content = messages[last_user].get("content")
+            query = content if isinstance(content, str) else json.dumps(content, default=str)
+            context_messages = messages[:last_user] + messages[last_user + 1 :]
+
+        shape = {
+            "kind": kind,
+            "model": params.get("model"),
+            "temperature": params.get("temperature"),
+            "max_tokens": params.get("max_tokens"),
+            "tools": params.get("tools"),
+            "tool_choice": params.get("tool_choice"),
+        }
+        exact_key = _digest({**shape, "messages": messages})
+        context_key = _digest({**shape, "messages": context_messages, "last_user": last_user})
+        return exact_key, context_key, query
+
+    def get(self, kind: str, params: Dict[str, Any]) -> Optional[str]:
+        """Look up a serialized response, or None on a miss"""
+        exact_key, context_key, query = self.make_keys(kind, params)
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT response FROM responses WHERE key = ? AND created >= ?",
+                (exact_key, self._oldest(now)),
+            ).fetchone()
+            if row:
+                self._touch(exact_key, now)
+                self.hits += 1
+                return row[0]
+
+            if self._similarity_enabled(params) and query:
+                match = self._most_similar(context_key, query, now)
+                if match:
+                    key, response = match
+                    self._touch(key, now)
+                    self.similar_hits += 1
+                    logger.debug("Response cache: similar hit")
+                    return response
+
+            self.misses += 1
+            return None
+
+    def put(self, kind: str, params: Dict[str, Any], response: str) -> None:
+        """Store a serialized response, evicting LRU entries beyond max_entries"""
+        exact_key, context_key, query = self.make_keys(kind, params)
+        now = time.time()
+        with self._lock:
+            self._write_touches()
+            self._expire(now)
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    exact_key,
+                    context_key,
+                    query,
+                    params.get("temperature"),
+                    kind,
+                    response,
+                    now,
+                    now,
+                ),
+            )
+            self._db.execute(
+                """DELETE FROM responses WHERE key IN (
+                    SELECT key FROM responses ORDER BY accessed DESC LIMIT -1 OFFSET ?
+                )""",
+                (self.max_entries,),
+            )
+            self._db.commit()
+
+    def _similarity_enabled(self, params: Dict[str, Any]) -> bool:
+        return self.similarity_threshold is not None and params.get("temperature") == 0
+
+    def _most_similar(self, context_key: str, query: str, now: float) -> Optional[Tuple[str, str]]:
+        query_words = _words(query)
+        if not query_words:
+            return None
+        best: Optional[Tuple[float, str, str]] = None
+        rows = self._db.execute(
+            "SELECT key, query, response FROM responses "
+            "WHERE context_key = ? AND temperature = 0 AND created >= ?",
+            (context_key, self._oldest(now)),
+        )
+        for key, cached_query, response in rows:
+            cached_words = _words(cached_query)
+            union = query_words | cached_words
+            score = len(query_words & cached_words) / len(union) if union else 0.0
+            if score >= self.similarity_threshold and (best is None or score > best[0]):
+                best = (score, key, response)
+        return (best[1], best[2]) if best else None
+
+    def _touch(self, key: str, now: float) -> None:
+        self._touched[key] = now
+        if (
+            len(self._touched) >= _TOUCH_BATCH
+            or time.monotonic() - self._touches_written >= _TOUCH_INTERVAL
+        ):
+            self._write_touches()
+            self._db.commit()
+
+    def _write_touches(self) -> None:
+        if self._touched:
+            self._db.executemany(
+                "UPDATE responses SET accessed = ? WHERE key = ?",
+                [(accessed, key) for key, accessed in self._touched.items()],
+            )
+            self._touched.clear()
+        self._touches_written = time.monotonic()
+
+    def _oldest(self, now: float) -> float:
+        """Creation time of the oldest entry that has not expired"""
+        return 0.0 if self.ttl is None else now - self.ttl
+
+    def _expire(self, now: float) -> None:
+        if self.ttl is None:
+            return
+        self._db.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl,))
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current size"""
+        lookups = self.hits + self.similar_hits + self.misses
+        with self._lock:
+            (entries,) = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()
+        return {
+            "hits": self.hits,
+            "similar_hits": self.similar_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.similar_hits) / lookups if lookups else 0.0,
+            "entries": entries,
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._touched.clear()
+            self._db.execute("DELETE FROM responses")
+            self._db.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._write_touches()
+            self._db.commit()
+            self._db.close()
+
+
+_response_cache: Optional[ResponseCache] = None
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """Process-wide response cache, or None unless enabled in LLM_CACHE_CONFIG"""
+    global _response_cache
+    if _response_cache is None and LLM_CACHE_CONFIG["ENABLED"]:
+        _response_cache = ResponseCache.from_config()
+    return _response_cache
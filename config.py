@@ -1,7 +1,10 @@
 import os
+import shlex
+import tempfile
 from pathlib import Path
 from typing import Dict, List, Optional
 from dotenv import load_dotenv
+from loguru import logger
 from pydantic import BaseModel, Field
 
 load_dotenv()
@@ -25,6 +28,183 @@ LLM_STEP_CONFIG = {
     "MAX_TOKENS": 4096,
 }
 
+LLM_HTTP_CONFIG = {
+    "MAX_CONNECTIONS": int(os.getenv("LLM_MAX_CONNECTIONS", 100)),
+    "MAX_KEEPALIVE_CONNECTIONS": 20,
+    "KEEPALIVE_EXPIRY": 30.0,  # seconds
+    "HTTP2": True,  # used only when the optional `h2` package is installed
+}
+
+# Opt-in LLM response cache (see cache.ResponseCache)
+LLM_CACHE_CONFIG = {
+    "ENABLED": os.getenv("LLM_CACHE", "0").lower() in ("1", "true", "yes"),
+    "PATH": os.getenv("LLM_CACHE_PATH", str(PROJECT_ROOT / "cache" / "llm_responses.sqlite")),
+    "MAX_ENTRIES": 5000,
+    "TTL": 24 * 3600.0,  # seconds, None to keep entries until evicted
+    "SIMILARITY_THRESHOLD": None,  # e.g. 0.85 enables the similar tier for temperature-0 calls
+}
+
+def _optional_float(name: str, default: Optional[float]) -> Optional[float]:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    if not value.strip():
+        return None
+    try:
+        number = float(value)
+    except ValueError:
+        logger.warning(f"Ignoring {name}={value!r}: not a number, using {default}")
+        return default
+    return number if number > 0 else None
+
+
+# Opt-in client-side rate limiter shared by all LLM instances (see rate_limit.RateLimiter);
+# while it is on, the OpenAI SDK's own retries are off so 429s reach the limiter
+LLM_RATE_LIMIT_CONFIG = {
+    "ENABLED": os.getenv("LLM_RATE_LIMIT", "0").lower() in ("1", "true", "yes"),
+    "REQUESTS_PER_MINUTE": _optional_float("LLM_REQUESTS_PER_MINUTE", 120),  # None: unlimited
+    "TOKENS_PER_MINUTE": _optional_float("LLM_TOKENS_PER_MINUTE", None),  # None: unlimited
+    "MIN_SCALE": 0.1,  # lowest fraction of the configured rate after repeated 429s
+}
+
+# Per-step span sinks (see tracing.Tracer): any of memory, jsonl, otel; empty disables
+TRACE_CONFIG = {
+    "SINKS": [
+        sink.strip()
+        for sink in os.getenv("SREGENT_TRACE_SINKS", "memory").split(",")
+        if sink.strip()
+    ],
+    "RING_SIZE": 2000,
+    "JSONL_PATH": os.getenv("SREGENT_TRACE_FILE", str(PROJECT_ROOT / "logs" / "trace.jsonl")),
+}
+
+MEMORY_CONFIG = {
+    "MAX_MESSAGES": 100,
+    "MAX_TOKENS": int(os.getenv("MEMORY_MAX_TOKENS", 100000)),
+}
+
+# exec_shell / exec_python subprocesses (tool/tool.py)
+TOOL_EXEC_CONFIG = {
+    # processes running at once across all agents and event loops
+    "MAX_CONCURRENT_PROCESSES": int(
+        os.getenv("TOOL_MAX_PROCESSES", max(4, (os.cpu_count() or 1) * 2))
+    ),
+    "READ_CHUNK_SIZE": 64 * 1024,
+}
+
+# Output capture for commands (tool/output_capture.py): beyond MAX_BYTES a stream
+# is spilled to a file in SPILL_DIR and only its head and tail are kept in memory
+TOOL_OUTPUT_CONFIG = {
+    "MAX_BYTES": int(os.getenv("TOOL_OUTPUT_MAX_BYTES", 256 * 1024)),
+    "HEAD_BYTES": 16 * 1024,
+    "TAIL_BYTES": 16 * 1024,
+    "SPILL_DIR": os.getenv(
+        "TOOL_OUTPUT_DIR", os.path.join(tempfile.gettempdir(), "sregent-output")
+    ),
+}
+
+# File tools (tool/dir_scan.py, tool/search.py): directory scans are reused for STAT_CACHE_TTL seconds
+# (0 disables); worth enabling on NFS where every stat is a round-trip
+TOOL_FS_CONFIG = {
+    "STAT_CACHE_TTL": float(os.getenv("TOOL_STAT_CACHE_TTL", 0)),
+    "STAT_CACHE_MAX_DIRS": 10000,
+    "SEARCH_WORKERS": int(os.getenv("TOOL_SEARCH_WORKERS", min(16, (os.cpu_count() or 1) * 2))),
+}
+
+# StrReplaceEditor undo history (tool/edit_history.py): reverse diffs, evicted oldest
+# first beyond the byte budgets; PERSIST_DIR keeps history across restarts
+EDITOR_HISTORY_CONFIG = {
+    "MAX_BYTES_PER_FILE": 8 * 1024 * 1024,
+    "MAX_BYTES": int(os.getenv("EDITOR_HISTORY_MAX_BYTES", 64 * 1024 * 1024)),
+    "MAX_STEPS_PER_FILE": 100,
+    "PERSIST_DIR": os.getenv("EDITOR_HISTORY_DIR") or None,
+}
+
+# StrReplaceEditor file access (tool/file_operators.py); bigger files are refused by read_file
+# (views and searches read windows and work on files of any size)
+FILE_OPERATOR_CONFIG = {
+    "MAX_READ_BYTES": int(os.getenv("EDITOR_MAX_READ_BYTES", 1024 * 1024 * 1024)),
+    "FSYNC": True,  # fsync before the atomic rename of a written file
+}
+
+# Sandboxed file access: one persistent helper process started through COMMAND, e.g.
+# "docker exec -i sregent-sandbox" or "chroot /srv/sandbox" (empty: a plain local process)
+SANDBOX_CONFIG = {
+    "USE_SANDBOX": os.getenv("SREGENT_SANDBOX", "0").lower() in ("1", "true", "yes"),
+    "COMMAND": shlex.split(os.getenv("SANDBOX_COMMAND", "")),
+    "PYTHON": os.getenv("SANDBOX_PYTHON", "python3"),
+    "TIMEOUT": 120.0,  # seconds per file operation; commands pass their own
+}
+
+# Bash tool shells (tool/bash.py BashSessionManager): one shell per agent session,
+# SPARES started ahead of time, shells idle for IDLE_TIMEOUT seconds are closed
+BASH_SESSION_CONFIG = {
+    "SPARES": int(os.getenv("BASH_SPARE_SESSIONS", 1)),
+    "IDLE_TIMEOUT": float(os.getenv("BASH_IDLE_TIMEOUT", 600)),
+    "MAX_SESSIONS": int(os.getenv("BASH_MAX_SESSIONS", 32)),
+}
+
+# ebpf_trace tool (tool/ebpf.py): probes are interrupted (SIGINT, so bpftrace prints its
+# maps) after the requested duration and killed GRACE seconds later
+EBPF_CONFIG = {
+    "BPFTRACE": os.getenv("BPFTRACE_BIN", "bpftrace"),
+    "MAX_DURATION": 300.0,
+    "GRACE": 5.0,
+    "MAX_KEYS": 50000,  # distinct keys kept per map / distinct event lines counted
+}
+
+# Metric store shared by the tools (tool/metric_store.py): series of NumPy chunks,
+# oldest chunks dropped beyond MAX_POINTS_PER_SERIES; PERSIST_DIR keeps them as mmapped .npy files
+METRIC_STORE_CONFIG = {
+    "CHUNK_SIZE": 4096,  # points per chunk
+    "MAX_POINTS_PER_SERIES": int(os.getenv("METRIC_MAX_POINTS", 1_000_000)),
+    "MAX_SERIES": int(os.getenv("METRIC_MAX_SERIES", 10000)),
+    # at MAX_SERIES, series without a point for this many seconds make room for new ones
+    "SERIES_TTL": float(os.getenv("METRIC_SERIES_TTL", 3600)),
+    "PERSIST_DIR": os.getenv("METRIC_STORE_DIR") or None,
+    "EBPF_KEYS_PER_MAP": 100,  # top keys of each bpftrace map recorded as series
+}
+
+# detect_anomalies tool (tool/anomaly.py); longer series are averaged down to
+# MAX_POINTS_PER_SERIES points before the detectors run
+ANOMALY_CONFIG = {
+    "WINDOW": 60,  # trailing points for the rolling z-score / EWMA span
+    "THRESHOLD": 4.0,  # standard deviations
+    "MAX_SERIES": 5000,
+    "MAX_POINTS_PER_SERIES": 2000,
+}
+
+# proc_snapshot tool (tool/proc_collector.py): /proc files stay open and are re-read with
+# pread; per-process files beyond MAX_OPEN_FDS are opened and closed on every sample
+PROC_COLLECTOR_CONFIG = {
+    "PID_STATUS": os.getenv("PROC_PID_STATUS", "1").lower() in ("1", "true", "yes"),  # ctxt switches, swap
+    "MAX_OPEN_FDS": int(os.getenv("PROC_MAX_OPEN_FDS", 4096)),
+    "MAX_DURATION": 300.0,  # seconds, interval * samples
+}
+
+# stack_profile tool (tool/flamegraph.py): stack samples are folded into a call tree of at
+# most MAX_NODES nodes; deeper detail of new paths beyond that is counted as [truncated]
+PROFILE_CONFIG = {
+    "MAX_NODES": int(os.getenv("PROFILE_MAX_NODES", 200_000)),
+    "MAX_DURATION": 300.0,  # seconds a `command` may run
+    "SVG_WIDTH": 1200,
+}
+
+# Opt-in warm interpreters for exec_python (tool/python_pool.py)
+PYTHON_POOL_CONFIG = {
+    "ENABLED": os.getenv("PYTHON_WORKER_POOL", "0").lower() in ("1", "true", "yes"),
+    "SIZE": int(os.getenv("PYTHON_WORKER_POOL_SIZE", 2)),
+    # modules imported once per worker, e.g. "numpy,pandas"; missing ones are skipped
+    "PRELOAD": [
+        name.strip()
+        for name in os.getenv("PYTHON_WORKER_PRELOAD", "").split(",")
+        if name.strip()
+    ],
+    "MAX_RUNS": 50,  # recycle a worker after this many calls
+    "MEMORY_LIMIT_MB": _optional_float("PYTHON_WORKER_MEMORY_MB", None),  # RLIMIT_AS per worker
+    "RESET_NAMESPACE": True,  # fresh globals for every call
+}
+
 SystemPrompts = {
     "default": "You are a helpful assistant.",
     "code_assistant": "You are a coding assistant specialized in Python.",
@@ -40,6 +220,9 @@ SystemPrompts = {
         - 请不要模拟工具执行结果，必须通过工具与真实场景交互。
         - 在涉及到工具调用时，你的思维链遵循是否需要调用工具，调用什么工具，如何调用工具三步，确保格式满足工具定义。
         - 工具中还包含辅助工具，如工具说明工具，终止对话工具等，请你判断何时需要调用。
+        - 工具采集的指标会记录下来；需要在大量指标中找异常时，优先调用"detect_anomalies"得到排好序的异常窗口，再用"metrics_query"查看细节，不要逐条阅读原始数据。
+        - 查看系统整体负载（CPU、内存、磁盘、网络、PSI 压力和最忙的进程）时，优先调用"proc_snapshot"，不要反复执行 top/vmstat/iostat 等命令。
+        - 分析 perf/bpftrace 采集的调用栈时，调用"stack_profile"得到热点函数和热点路径（可输出火焰图），不要直接读取原始栈输出。
         """,
 }
 
@@ -1,10 +1,20 @@
+import asyncio
+import importlib.util
+import json
 import math
+import sys
+import time
+import uuid
+import weakref
+import httpx
 import tiktoken
-from typing import List, Dict, Optional, Callable, Any, Union
+from typing import AsyncGenerator, List, Dict, Optional, Callable, Any, Tuple, Union
 from openai import (
     APIError,
     AsyncOpenAI,
     AuthenticationError,
+    DEFAULT_MAX_RETRIES,
+    DefaultAsyncHttpxClient,
     OpenAIError,
     RateLimitError,
 )
@@ -15,15 +25,71 @@ from tenacity import (
     stop_after_attempt,
     wait_random_exponential,
 )
-from SREgent.config import LLM_DEFAULT_CONFIG, LLM_STEP_CONFIG, SystemPrompts
+from SREgent.cache import ResponseCache, get_response_cache
+from SREgent.config import (
+    LLM_DEFAULT_CONFIG,
+    LLM_HTTP_CONFIG,
+    LLM_STEP_CONFIG,
+    SystemPrompts,
+)
 from SREgent.logger import logger
+from SREgent.rate_limit import RateLimiter, get_rate_limiter, retry_after_seconds
+from SREgent.tracing import tracer
 from SREgent.schema import (
     ROLE_VALUES,
     TOOL_CHOICE_TYPE,
     TOOL_CHOICE_VALUES,
+    Function,
     Message,
+    StreamEvent,
+    StreamEventType,
+    ToolCall,
     ToolChoice,
 )
+from SREgent.tool.tool_collection import ToolCollection
+
+
+class _JsonObjectScanner:
+    """Follows streamed JSON text one chunk at a time.
+
+    Only the new chunk is scanned, so watching for the end of a long argument
+    string is linear in its length rather than re-parsing it on every delta.
+    """
+
+    __slots__ = ("depth", "in_string", "escaped")
+
+    def __init__(self):
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+
+    def feed(self, text: str) -> bool:
+        """Whether the top-level object closed in this chunk (possibly complete JSON)"""
+        closed = False
+        for char in text:
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == "\\":
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = True
+            elif char in "{[":
+                self.depth += 1
+            elif char in "}]":
+                self.depth -= 1
+                closed = closed or self.depth == 0
+        return closed
+
+
+def _is_json(text: str) -> bool:
+    try:
+        json.loads(text)
+    except json.JSONDecodeError:
+        return False
+    return True
 
 
 class TokenCounter:
@@ -128,38 +194,112 @@ class TokenCounter:
                 token_count += self.count_text(function.get("arguments", ""))
         return token_count
 
-    def count_message_tokens(self, messages: List[dict]) -> int:
+    def count_message(self, message: Union[dict, Message]) -> int:
+        """Calculate the tokens of a single message.
+
+        The count of a Message object is cached on it, so a message is only
+        tokenized once no matter how many requests it is sent in.
+        """
+        if isinstance(message, Message):
+            if message._token_count is None:
+                message._token_count = self.count_message(message.to_dict())
+            return message._token_count
+
+        tokens = self.BASE_MESSAGE_TOKENS  # Base tokens per message
+
+        # Add role tokens
+        tokens += self.count_text(message.get("role", ""))
+
+        # Add content tokens
+        if "content" in message:
+            tokens += self.count_content(message["content"])
+
+        # Add tool calls tokens
+        if "tool_calls" in message:
+            tokens += self.count_tool_calls(message["tool_calls"])
+
+        # Add name and tool_call_id tokens
+        tokens += self.count_text(message.get("name", ""))
+        tokens += self.count_text(message.get("tool_call_id", ""))
+
+        return tokens
+
+    def count_message_tokens(self, messages: List[Union[dict, Message]]) -> int:
         """Calculate the total number of tokens in a message list"""
         total_tokens = self.FORMAT_TOKENS  # Base format tokens
 
         for message in messages:
-            tokens = self.BASE_MESSAGE_TOKENS  # Base tokens per message
+            total_tokens += self.count_message(message)
 
-            # Add role tokens
-            tokens += self.count_text(message.get("role", ""))
+        return total_tokens
 
-            # Add content tokens
-            if "content" in message:
-                tokens += self.count_content(message["content"])
 
-            # Add tool calls tokens
-            if "tool_calls" in message:
-                tokens += self.count_tool_calls(message["tool_calls"])
+_backoff = wait_random_exponential(min=1, max=60)
 
-            # Add name and tool_call_id tokens
-            tokens += self.count_text(message.get("name", ""))
-            tokens += self.count_text(message.get("tool_call_id", ""))
 
-            total_tokens += tokens
+def _retry_wait(retry_state) -> float:
+    """Retry wait for tenacity.
 
-        return total_tokens
+    After a 429 the shared RateLimiter already holds the retry back for the
+    server's retry-after, so retrying immediately just re-joins its fair queue
+    instead of backing off at random.
+    """
+    if get_rate_limiter() is not None and isinstance(
+        retry_state.outcome.exception(), RateLimitError
+    ):
+        return 0.0
+    return _backoff(retry_state)
+
+
+def _http2_available() -> bool:
+    """HTTP/2 in httpx needs the optional `h2` package"""
+    return importlib.util.find_spec("h2") is not None
 
 
 class LLM:
-    def __init__(self):
-        self.base_url = LLM_DEFAULT_CONFIG["OPENAI_BASE_URL"]
-        self.api_key = LLM_DEFAULT_CONFIG["OPENAI_API_KEY"]
-        self.model = LLM_DEFAULT_CONFIG["DEFAULT_MODEL"]
+    """Chat completion client.
+
+    Instances are shared process-wide per (base_url, api_key, model), so agents
+    created with `Field(default_factory=LLM)` reuse one tokenizer and token
+    counter. That includes the default settings: assigning `llm.temperature` or
+    `llm.max_tokens` changes them for every agent on the same model; pass
+    `temperature` to `ask`/`ask_tool` for a per-call value instead.
+
+    Connections are bound to an event loop, so each running loop gets its own
+    keep-alive httpx pool, shared by all instances, and each instance one
+    AsyncOpenAI client per loop. Call `await LLM.aclose()` before a loop ends
+    to close its pool.
+    """
+
+    _instances: Dict[Tuple[Optional[str], Optional[str], str], "LLM"] = {}
+    _http_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = (
+        weakref.WeakKeyDictionary()
+    )
+
+    def __new__(
+        cls,
+        model: Optional[str] = None,
+        base_url: Optional[str] = None,
+        api_key: Optional[str] = None,
+    ):
+        key = cls._instance_key(model, base_url, api_key)
+        instance = cls._instances.get(key)
+        if instance is None:
+            instance = super().__new__(cls)
+        return instance
+
+    def __init__(
+        self,
+        model: Optional[str] = None,
+        base_url: Optional[str] = None,
+        api_key: Optional[str] = None,
+    ):
+        if getattr(self, "_initialized", False):
+            return
+
+        self.base_url, self.api_key, self.model = self._instance_key(
+            model, base_url, api_key
+        )
 
         self.max_tokens = LLM_STEP_CONFIG["MAX_TOKENS"]
         self.temperature = LLM_STEP_CONFIG["TEMPERATURE"]
@@ -176,19 +316,121 @@ class LLM:
         
         self.token_counter = TokenCounter(self.tokenizer)
 
-        # 使用新版 OpenAI 客户端
-        self.client = AsyncOpenAI(
-            api_key=self.api_key,
-            base_url=self.base_url
+        # Opt-in response cache shared by all instances (LLM_CACHE_CONFIG)
+        self.cache: Optional[ResponseCache] = get_response_cache()
+
+        # Process-wide client-side rate limiter (LLM_RATE_LIMIT_CONFIG)
+        self.rate_limiter: Optional[RateLimiter] = get_rate_limiter()
+
+        # (pool, OpenAI client on it) per event loop, see `client`
+        self._clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Tuple[httpx.AsyncClient, AsyncOpenAI]]" = (
+            weakref.WeakKeyDictionary()
         )
 
+        self._initialized = True
+        self._instances[(self.base_url, self.api_key, self.model)] = self
+
+    @staticmethod
+    def _instance_key(
+        model: Optional[str], base_url: Optional[str], api_key: Optional[str]
+    ) -> Tuple[Optional[str], Optional[str], str]:
+        return (
+            base_url or LLM_DEFAULT_CONFIG["OPENAI_BASE_URL"],
+            api_key or LLM_DEFAULT_CONFIG["OPENAI_API_KEY"],
+            model or LLM_DEFAULT_CONFIG["DEFAULT_MODEL"],
+        )
+
+    @property
+    def client(self) -> AsyncOpenAI:
+        """The OpenAI client for the running event loop, on that loop's shared pool"""
+        loop = asyncio.get_running_loop()
+        http_client = self._get_http_client()
+        pool, client = self._clients.get(loop, (None, None))
+        if pool is not http_client:
+            # 使用新版 OpenAI 客户端，共享连接池
+            # With the rate limiter on, 429 retries are ours; the SDK must not retry on its own
+            client = AsyncOpenAI(
+                api_key=self.api_key,
+                base_url=self.base_url,
+                http_client=http_client,
+                max_retries=0 if self.rate_limiter else DEFAULT_MAX_RETRIES,
+            )
+            self._clients[loop] = (http_client, client)
+        return client
+
+    @classmethod
+    def _get_http_client(cls) -> httpx.AsyncClient:
+        """Return the running loop's connection pool, creating it on first use"""
+        loop = asyncio.get_running_loop()
+        http_client = cls._http_clients.get(loop)
+        if http_client is None or http_client.is_closed:
+            http2 = LLM_HTTP_CONFIG["HTTP2"] and _http2_available()
+            http_client = cls._http_clients[loop] = DefaultAsyncHttpxClient(
+                http2=http2,
+                limits=httpx.Limits(
+                    max_connections=LLM_HTTP_CONFIG["MAX_CONNECTIONS"],
+                    max_keepalive_connections=LLM_HTTP_CONFIG["MAX_KEEPALIVE_CONNECTIONS"],
+                    keepalive_expiry=LLM_HTTP_CONFIG["KEEPALIVE_EXPIRY"],
+                ),
+            )
+            logger.debug(f"Created shared LLM HTTP pool (http2={http2})")
+        return http_client
+
+    @classmethod
+    async def aclose(cls) -> None:
+        """Close the running loop's connection pool and forget all shared instances"""
+        cls._instances.clear()
+        http_client = cls._http_clients.pop(asyncio.get_running_loop(), None)
+        if http_client is not None:
+            await http_client.aclose()
+
+    async def _create_completion(self, params: Dict[str, Any], input_tokens: int):
+        """Send a completion request through the shared rate limiter (if enabled).
+
+        Recorded as an `llm.request` span with queue and network time and, for
+        non-streamed responses, the reported token usage.
+        """
+        with tracer.span(
+            "llm.request",
+            model=self.model,
+            stream=bool(params.get("stream")),
+            estimated_input_tokens=input_tokens,
+        ) as span:
+            if self.rate_limiter is not None:
+                # Rate-limit budgets count the prompt plus the requested completion
+                waited = await self.rate_limiter.acquire(
+                    input_tokens + params.get("max_tokens", 0)
+                )
+                span.set_attribute("queue_ms", waited * 1000)
+
+            # For streams this is the time until response headers arrive
+            start = time.perf_counter()
+            try:
+                response = await self.client.chat.completions.create(**params)
+            except RateLimitError as e:
+                if self.rate_limiter is not None:
+                    self.rate_limiter.on_rate_limited(retry_after_seconds(e))
+                raise
+            span.set_attribute("network_ms", (time.perf_counter() - start) * 1000)
+
+            usage = getattr(response, "usage", None)
+            if usage:
+                span.set_attributes(
+                    prompt_tokens=usage.prompt_tokens,
+                    completion_tokens=usage.completion_tokens,
+                )
+
+        if self.rate_limiter is not None:
+            self.rate_limiter.on_success()
+        return response
+
     def count_tokens(self, text: str) -> int:
         """Calculate the number of tokens in a text"""
         if not text:
             return 0
         return len(self.tokenizer.encode(text))
 
-    def count_message_tokens(self, messages: List[dict]) -> int:
+    def count_message_tokens(self, messages: List[Union[dict, Message]]) -> int:
         return self.token_counter.count_message_tokens(messages)
         
 
@@ -219,7 +461,7 @@ class LLM:
         return formatted_messages
 
     @retry(
-        wait=wait_random_exponential(min=1, max=60),
+        wait=_retry_wait,
         stop=stop_after_attempt(2),
         retry=retry_if_exception_type(
             (OpenAIError, Exception, ValueError)
@@ -233,15 +475,15 @@ class LLM:
         stream: bool = False,     
     ) -> str:
         try:
+            # Calculate input token count (Message objects reuse their cached counts)
+            input_tokens = self.count_message_tokens((system_msgs or []) + messages)
+
             if system_msgs:
                 system_msgs = self.format_messages(system_msgs)
                 messages = system_msgs + self.format_messages(messages)
             else:
                 messages = self.format_messages(messages)
 
-            # Calculate input token count
-            input_tokens = self.count_message_tokens(messages)
-
             # 准备 API 调用参数
             params = {
                 "model": self.model,
@@ -251,9 +493,18 @@ class LLM:
             }
 
             if not stream:
+                if self.cache:
+                    # SQLite work stays off the event loop
+                    cached = await asyncio.to_thread(self.cache.get, "ask", params)
+                    if cached is not None:
+                        logger.info("Response cache hit for ask")
+                        return cached
+
                 # 调用 API
                 print("Non-streaming response:")
-                response = await self.client.chat.completions.create(**params, stream=False)
+                response = await self._create_completion(
+                    {**params, "stream": False}, input_tokens
+                )
                 if not response.choices or not response.choices[0].message.content:
                     raise ValueError("Empty or invalid response from LLM")
                 
@@ -264,10 +515,14 @@ class LLM:
                 else:
                     completion_tokens = self.count_tokens(content)
                     logger.info(f"Token usage: Input={input_tokens}, Completion={completion_tokens}, Total={input_tokens + completion_tokens}")
-                
+
+                if self.cache:
+                    await asyncio.to_thread(self.cache.put, "ask", params, content)
                 return content
 
-            response = await self.client.chat.completions.create(**params, stream=True)
+            response = await self._create_completion(
+                {**params, "stream": True}, input_tokens
+            )
             collected_messages = []
             completion_text = ""
             async for chunk in response:
@@ -301,8 +556,253 @@ class LLM:
             logger.exception(f"Unexpected error in ask")
             raise
         
+    def _build_tool_request(
+        self,
+        messages: List[Union[dict, Message]],
+        system_msgs: Optional[List[Union[dict, Message]]],
+        timeout: int,
+        tools: Optional[Union[List[dict], ToolCollection]],
+        tool_choice: TOOL_CHOICE_TYPE,  # type: ignore
+        temperature: Optional[float],
+        **kwargs,
+    ) -> Tuple[Dict[str, Any], int]:
+        """Validate and format a tool request; returns (params, input token count)"""
+        # Validate tool_choice
+        if tool_choice not in TOOL_CHOICE_VALUES:
+            raise ValueError(f"Invalid tool_choice: {tool_choice}")
+
+        # Calculate input token count (Message objects reuse their cached counts)
+        input_tokens = self.count_message_tokens((system_msgs or []) + messages)
+
+        # Format messages
+        if system_msgs:
+            system_msgs = self.format_messages(system_msgs)
+            messages = system_msgs + self.format_messages(messages)
+        else:
+            messages = self.format_messages(messages)
+
+        # If there are tools, calculate token count for tool descriptions
+        tools_tokens = 0
+        if isinstance(tools, ToolCollection):
+            # Schemas and their token cost are cached by the collection
+            tools_tokens = sum(tools.token_counts(self.token_counter).values())
+            tools = tools.to_params()
+        elif tools:
+            # Validate tools if provided
+            for tool in tools:
+                if not isinstance(tool, dict) or "type" not in tool:
+                    raise ValueError("Each tool must be a dict with 'type' field")
+                tools_tokens += self.count_tokens(str(tool))
+
+        input_tokens += tools_tokens
+
+        # Set up the completion request
+        params = {
+            "model": self.model,
+            "messages": messages,
+            "tools": tools,
+            "tool_choice": tool_choice,
+            "timeout": timeout,
+            **kwargs,
+        }
+
+        params["max_tokens"] = self.max_tokens
+        params["temperature"] = (
+            temperature if temperature is not None else self.temperature
+        )
+        return params, input_tokens
+
+    @retry(
+        wait=_retry_wait,
+        stop=stop_after_attempt(6),
+        retry=retry_if_exception_type(
+            (OpenAIError, Exception, ValueError)
+        ),  # Don't retry TokenLimitExceeded
+    )
+    async def _create_stream(self, params: Dict[str, Any], input_tokens: int):
+        """Open a streamed completion; only opening is retried, never a half-read stream"""
+        return await self._create_completion({**params, "stream": True}, input_tokens)
+
+    async def ask_tool_stream(
+        self,
+        messages: List[Union[dict, Message]],
+        system_msgs: Optional[List[Union[dict, Message]]] = None,
+        timeout: int = 300,
+        tools: Optional[Union[List[dict], ToolCollection]] = None,
+        tool_choice: TOOL_CHOICE_TYPE = ToolChoice.AUTO,  # type: ignore
+        temperature: Optional[float] = None,
+        **kwargs,
+    ) -> AsyncGenerator[StreamEvent, None]:
+        """
+        Streaming variant of `ask_tool`.
+
+        Reasoning and content tokens are yielded as they arrive. Each tool call is
+        yielded as soon as its arguments form complete JSON (or the next call starts),
+        so the caller can start executing it before the message is finished. The last
+        event is `done`, carrying the full content and all tool calls.
+
+        Args:
+            Same as `ask_tool`.
+
+        Yields:
+            StreamEvent: reasoning / content / tool_call / done events
+        """
+        params, input_tokens = self._build_tool_request(
+            messages, system_msgs, timeout, tools, tool_choice, temperature, **kwargs
+        )
+        params["stream_options"] = {"include_usage": True}
+
+        # Not made current: the context of an async generator belongs to its consumer
+        span = tracer.start_span("llm.stream", model=self.model)
+        started = time.perf_counter()
+        first_chunk = True
+        try:
+            response = await self._create_stream(params, input_tokens)
+
+            content_parts: List[str] = []
+            # index -> {"id", "name", "arguments": [str], "emitted": bool, "scanner"}
+            calls: Dict[int, Dict[str, Any]] = {}
+            # stream indexes in the order their calls were emitted; the done event
+            # lists the calls in this order, so a tool_call event's `index` is stable
+            emitted: List[int] = []
+            usage = None
+
+            def finish(index: int) -> Optional[StreamEvent]:
+                call = calls[index]
+                if call["emitted"]:
+                    return None
+                call["emitted"] = True
+                emitted.append(index)
+                return StreamEvent(
+                    type=StreamEventType.TOOL_CALL,
+                    index=len(emitted) - 1,
+                    tool_call=ToolCall(
+                        id=call["id"],
+                        function=Function(
+                            name=call["name"], arguments="".join(call["arguments"])
+                        ),
+                    ),
+                )
+
+            async for chunk in response:
+                if first_chunk:
+                    first_chunk = False
+                    span.set_attribute(
+                        "first_chunk_ms", (time.perf_counter() - started) * 1000
+                    )
+                if getattr(chunk, "usage", None):
+                    usage = chunk.usage
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta
+
+                # Some OpenAI-compatible servers (qwen, deepseek) stream reasoning separately
+                reasoning = getattr(delta, "reasoning_content", None)
+                if reasoning:
+                    yield StreamEvent(type=StreamEventType.REASONING, content=reasoning)
+                if delta.content:
+                    content_parts.append(delta.content)
+                    yield StreamEvent(type=StreamEventType.CONTENT, content=delta.content)
+
+                for tool_delta in delta.tool_calls or []:
+                    index = tool_delta.index
+                    if index not in calls:
+                        # A new call starts: every earlier call is complete
+                        for earlier in sorted(calls):
+                            event = finish(earlier)
+                            if event:
+                                yield event
+                        calls[index] = {
+                            "id": "", "name": "", "arguments": [], "emitted": False,
+                            "scanner": _JsonObjectScanner(),
+                        }
+                    call = calls[index]
+                    if tool_delta.id:
+                        call["id"] = tool_delta.id
+                    if tool_delta.function:
+                        if tool_delta.function.name:
+                            call["name"] += tool_delta.function.name
+                        if tool_delta.function.arguments:
+                            call["arguments"].append(tool_delta.function.arguments)
+                            complete = call["scanner"].feed(tool_delta.function.arguments)
+                            if complete and call["name"] and _is_json(
+                                "".join(call["arguments"])
+                            ):
+                                event = finish(index)
+                                if event:
+                                    yield event
+
+            for index in sorted(calls):
+                event = finish(index)
+                if event:
+                    yield event
+
+            content = "".join(content_parts)
+            if usage:
+                logger.info(f"Token usage: Input={usage.prompt_tokens}, Completion={usage.completion_tokens}, Total={usage.total_tokens}")
+                span.set_attributes(
+                    prompt_tokens=usage.prompt_tokens,
+                    completion_tokens=usage.completion_tokens,
+                )
+            else:
+                completion_tokens = self.count_tokens(content)
+                logger.info(f"Token usage: Input={input_tokens}, Completion={completion_tokens}, Total={input_tokens + completion_tokens}")
+                span.set_attributes(
+                    prompt_tokens=input_tokens, completion_tokens=completion_tokens
+                )
+            span.set_attribute("tool_calls", len(calls))
+            tracer.end_span(span)
+
+            yield StreamEvent(
+                type=StreamEventType.DONE,
+                content=content,
+                tool_calls=[
+                    ToolCall(
+                        id=calls[index]["id"],
+                        function=Function(
+                            name=calls[index]["name"],
+                            arguments="".join(calls[index]["arguments"]),
+                        ),
+                    )
+                    for index in emitted
+                ],
+            )
+
+        except OpenAIError as oe:
+            logger.error(f"OpenAI API error in ask_tool_stream: {oe}")
+            if isinstance(oe, AuthenticationError):
+                logger.error("Authentication failed. Check API key.")
+            elif isinstance(oe, RateLimitError):
+                logger.error("Rate limit exceeded. Consider increasing retry attempts.")
+            raise
+        except Exception as e:
+            logger.error(f"Unexpected error in ask_tool_stream: {e}")
+            raise
+        finally:
+            if span.end_time is None:
+                # Failed, or the consumer stopped iterating early
+                tracer.end_span(span, error=sys.exc_info()[1])
+
+    @staticmethod
+    def _with_fresh_call_ids(message: ChatCompletionMessage) -> ChatCompletionMessage:
+        """A cached message with new tool call ids.
+
+        Replaying the stored ids would repeat them within a conversation, and
+        tool results would then be paired with the wrong calls.
+        """
+        if not message.tool_calls:
+            return message
+        return message.model_copy(
+            update={
+                "tool_calls": [
+                    call.model_copy(update={"id": f"call_{uuid.uuid4().hex[:24]}"})
+                    for call in message.tool_calls
+                ]
+            }
+        )
+
     @retry(
-        wait=wait_random_exponential(min=1, max=60),
+        wait=_retry_wait,
         stop=stop_after_attempt(6),
         retry=retry_if_exception_type(
             (OpenAIError, Exception, ValueError)
@@ -313,7 +813,7 @@ class LLM:
         messages: List[Union[dict, Message]],
         system_msgs: Optional[List[Union[dict, Message]]] = None,
         timeout: int = 300,
-        tools: Optional[List[dict]] = None,
+        tools: Optional[Union[List[dict], ToolCollection]] = None,
         tool_choice: TOOL_CHOICE_TYPE = ToolChoice.AUTO,  # type: ignore
         temperature: Optional[float] = None,
         **kwargs,
@@ -325,7 +825,7 @@ class LLM:
             messages: List of conversation messages
             system_msgs: Optional system messages to prepend
             timeout: Request timeout in seconds
-            tools: List of tools to use
+            tools: List of tools to use, or a ToolCollection to reuse its cached schemas
             tool_choice: Tool choice strategy
             temperature: Sampling temperature for the response
             **kwargs: Additional completion arguments
@@ -340,53 +840,22 @@ class LLM:
             Exception: For unexpected errors
         """
         try:
-            # Validate tool_choice
-            if tool_choice not in TOOL_CHOICE_VALUES:
-                raise ValueError(f"Invalid tool_choice: {tool_choice}")
-
-
-            # Format messages
-            if system_msgs:
-                system_msgs = self.format_messages(system_msgs)
-                messages = system_msgs + self.format_messages(messages)
-            else:
-                messages = self.format_messages(messages)
-
-            # Calculate input token count
-            input_tokens = self.count_message_tokens(messages)
-
-            # If there are tools, calculate token count for tool descriptions
-            tools_tokens = 0
-            if tools:
-                for tool in tools:
-                    tools_tokens += self.count_tokens(str(tool))
-
-            input_tokens += tools_tokens
-
-            # Validate tools if provided
-            if tools:
-                for tool in tools:
-                    if not isinstance(tool, dict) or "type" not in tool:
-                        raise ValueError("Each tool must be a dict with 'type' field")
-
-            # Set up the completion request
-            params = {
-                "model": self.model,
-                "messages": messages,
-                "tools": tools,
-                "tool_choice": tool_choice,
-                "timeout": timeout,
-                **kwargs,
-            }
-
-            params["max_tokens"] = self.max_tokens
-            params["temperature"] = (
-                temperature if temperature is not None else self.temperature
+            params, input_tokens = self._build_tool_request(
+                messages, system_msgs, timeout, tools, tool_choice, temperature, **kwargs
             )
 
-            params["stream"] = False  # Always use non-streaming for tool requests
-            response: ChatCompletion = await self.client.chat.completions.create(
-                **params
+            if self.cache:
+                # SQLite work stays off the event loop
+                cached = await asyncio.to_thread(self.cache.get, "ask_tool", params)
+                if cached is not None:
+                    logger.info("Response cache hit for ask_tool")
+                    return self._with_fresh_call_ids(
+                        ChatCompletionMessage.model_validate_json(cached)
+                    )
+
+            params["stream"] = False  # Streaming tool requests go through ask_tool_stream
+            response: ChatCompletion = await self._create_completion(
+                params, input_tokens
             )
 
             # Check if response is valid
@@ -404,6 +873,13 @@ class LLM:
                     completion_tokens = self.count_tokens(response.choices[0].message.content)
                 logger.info(f"Token usage: Input={input_tokens}, Completion={completion_tokens}, Total={input_tokens + completion_tokens}")
 
+            if self.cache:
+                await asyncio.to_thread(
+                    self.cache.put,
+                    "ask_tool",
+                    params,
+                    response.choices[0].message.model_dump_json(),
+                )
             return response.choices[0].message
 
         except ValueError as ve:
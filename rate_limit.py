@@ -0,0 +1,176 @@
+import asyncio
+import time
+import weakref
+from typing import Any, Dict, Optional
+
+from SREgent.config import LLM_RATE_LIMIT_CONFIG
+from SREgent.logger import logger
+
+
+class _TokenBucket:
+    """A bucket refilled continuously at `rate_per_minute`, holding at most one minute of budget."""
+
+    def __init__(self, rate_per_minute: float):
+        self.capacity = float(rate_per_minute)
+        self.level = float(rate_per_minute)
+        self._updated = time.monotonic()
+
+    def refill(self, now: float, scale: float) -> None:
+        elapsed = now - self._updated
+        self._updated = now
+        self.level = min(self.capacity, self.level + elapsed * self.capacity / 60.0 * scale)
+
+    def time_until(self, amount: float, scale: float) -> float:
+        """Seconds until `amount` is available (0 if it already is)"""
+        missing = min(amount, self.capacity) - self.level
+        if missing <= 0:
+            return 0.0
+        return missing / (self.capacity / 60.0 * scale)
+
+    def take(self, amount: float) -> None:
+        self.level -= min(amount, self.capacity)
+
+
+class RateLimiter:
+    """Client-side limiter for LLM requests, shared by all LLM instances.
+
+    Callers wait in FIFO order until both the requests-per-minute and the
+    tokens-per-minute buckets can cover the request. On a 429 the refill rate is
+    halved (down to `min_scale`) and nobody is admitted until `retry-after` has
+    passed; every success recovers the rate additively. Either limit can be None
+    to disable that bucket; 429 back-pressure still applies.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        min_scale: float = 0.1,
+        recovery_step: float = 0.05,
+        default_retry_after: float = 1.0,
+    ):
+        self._requests = _TokenBucket(requests_per_minute) if requests_per_minute else None
+        self._tokens = _TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.min_scale = min_scale
+        self.recovery_step = recovery_step
+        self.default_retry_after = default_retry_after
+
+        self._scale = 1.0
+        self._blocked_until = 0.0
+        # asyncio.Lock wakes waiters in FIFO order, which makes admission fair; a lock
+        # belongs to one event loop, so each loop queues on its own (the buckets are shared)
+        self._locks: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Lock]" = (
+            weakref.WeakKeyDictionary()
+        )
+
+        # Metrics
+        self._queue_depth = 0
+        self._max_queue_depth = 0
+        self._admitted = 0
+        self._rate_limited = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    @classmethod
+    def from_config(cls) -> "RateLimiter":
+        return cls(
+            requests_per_minute=LLM_RATE_LIMIT_CONFIG["REQUESTS_PER_MINUTE"],
+            tokens_per_minute=LLM_RATE_LIMIT_CONFIG["TOKENS_PER_MINUTE"],
+            min_scale=LLM_RATE_LIMIT_CONFIG["MIN_SCALE"],
+        )
+
+    async def acquire(self, tokens: int = 0) -> float:
+        """Wait for a slot for one request costing `tokens`; returns seconds waited"""
+        start = time.monotonic()
+        self._queue_depth += 1
+        self._max_queue_depth = max(self._max_queue_depth, self._queue_depth)
+        try:
+            loop = asyncio.get_running_loop()
+            lock = self._locks.get(loop)
+            if lock is None:
+                lock = self._locks[loop] = asyncio.Lock()
+            async with lock:
+                while True:
+                    now = time.monotonic()
+                    delay = max(0.0, self._blocked_until - now)
+                    for bucket, amount in ((self._requests, 1), (self._tokens, tokens)):
+                        if bucket is not None:
+                            bucket.refill(now, self._scale)
+                            delay = max(delay, bucket.time_until(amount, self._scale))
+                    if delay <= 0:
+                        break
+                    await asyncio.sleep(delay)
+
+                if self._requests is not None:
+                    self._requests.take(1)
+                if self._tokens is not None:
+                    self._tokens.take(tokens)
+        finally:
+            self._queue_depth -= 1
+
+        waited = time.monotonic() - start
+        self._admitted += 1
+        self._total_wait += waited
+        self._max_wait = max(self._max_wait, waited)
+        if waited > 1:
+            logger.debug(f"Rate limiter held a request for {waited:.2f}s")
+        return waited
+
+    def on_success(self) -> None:
+        """Recover the rate after a request went through"""
+        self._scale = min(1.0, self._scale + self.recovery_step)
+
+    def on_rate_limited(self, retry_after: Optional[float] = None) -> None:
+        """Back off after a 429: halve the rate and pause admission"""
+        self._rate_limited += 1
+        self._scale = max(self.min_scale, self._scale / 2)
+        pause = retry_after if retry_after is not None else self.default_retry_after
+        self._blocked_until = max(self._blocked_until, time.monotonic() + pause)
+        # The server says the budget is spent; don't let the buckets burst right after
+        for bucket in (self._requests, self._tokens):
+            if bucket is not None:
+                bucket.level = min(bucket.level, 0.0)
+        logger.warning(
+            f"Rate limited by server: pausing {pause:.1f}s, rate scaled to {self._scale:.2f}"
+        )
+
+    def metrics(self) -> Dict[str, Any]:
+        """Queue depth, wait time and adaptation state"""
+        return {
+            "queue_depth": self._queue_depth,
+            "max_queue_depth": self._max_queue_depth,
+            "admitted": self._admitted,
+            "rate_limited": self._rate_limited,
+            "total_wait_seconds": self._total_wait,
+            "avg_wait_seconds": self._total_wait / self._admitted if self._admitted else 0.0,
+            "max_wait_seconds": self._max_wait,
+            "rate_scale": self._scale,
+        }
+
+
+def retry_after_seconds(error: Any) -> Optional[float]:
+    """Read `retry-after-ms` / `retry-after` (seconds) from an API error's response"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000.0
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except (TypeError, ValueError):
+        # HTTP-date values are rare for this API; fall back to the default pause
+        return None
+    return None
+
+
+_rate_limiter: Optional[RateLimiter] = None
+
+
+def get_rate_limiter() -> Optional[RateLimiter]:
+    """Process-wide rate limiter, or None if disabled in LLM_RATE_LIMIT_CONFIG"""
+    global _rate_limiter
+    if _rate_limiter is None and LLM_RATE_LIMIT_CONFIG["ENABLED"]:
+        _rate_limiter = RateLimiter.from_config()
+    return _rate_limiter
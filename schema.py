@@ -1,7 +1,9 @@
 from enum import Enum
-from typing import Any, List, Literal, Optional, Union
+from typing import Any, List, Literal, Optional, Set, Union
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr
+
+from SREgent.config import MEMORY_CONFIG
 
 
 class Role(str, Enum):
@@ -52,6 +54,28 @@ class ToolCall(BaseModel):
     function: Function
 
 
+class StreamEventType(str, Enum):
+    """Streamed tool-call completion event types"""
+
+    REASONING = "reasoning"
+    CONTENT = "content"
+    TOOL_CALL = "tool_call"
+    DONE = "done"
+
+
+class StreamEvent(BaseModel):
+    """An incremental event from `LLM.ask_tool_stream`"""
+
+    type: StreamEventType
+    content: Optional[str] = None
+    # A single completed call (tool_call events)
+    tool_call: Optional[ToolCall] = None
+    # Position of that call in the done event's tool_calls (tool_call events)
+    index: Optional[int] = None
+    # All calls of the message (done event)
+    tool_calls: Optional[List[ToolCall]] = None
+
+
 class Message(BaseModel):
     """Represents a chat message in the conversation"""
 
@@ -60,7 +84,11 @@ class Message(BaseModel):
     tool_calls: Optional[List[ToolCall]] = Field(default=None)
     name: Optional[str] = Field(default=None)
     tool_call_id: Optional[str] = Field(default=None)
+    # Set on the prompt an agent adds before each step; Memory does not take it for a user turn
+    step_prompt: bool = Field(default=False, exclude=True)
 
+    # Token count cached by TokenCounter.count_message; messages are not mutated after creation
+    _token_count: Optional[int] = PrivateAttr(default=None)
 
     def __add__(self, other) -> List["Message"]:
         """支持 Message + list 或 Message + Message 的操作"""
@@ -97,10 +125,10 @@ class Message(BaseModel):
 
     @classmethod
     def user_message(
-        cls, content: str
+        cls, content: str, step_prompt: bool = False
     ) -> "Message":
         """Create a user message"""
-        return cls(role=Role.USER, content=content)
+        return cls(role=Role.USER, content=content, step_prompt=step_prompt)
 
     @classmethod
     def system_message(cls, content: str) -> "Message":
@@ -153,25 +181,135 @@ class Message(BaseModel):
 
 class Memory(BaseModel):
     messages: List[Message] = Field(default_factory=list)
-    max_messages: int = Field(default=100)
+    max_messages: int = Field(default=MEMORY_CONFIG["MAX_MESSAGES"])
+    max_tokens: Optional[int] = Field(
+        default=MEMORY_CONFIG["MAX_TOKENS"],
+        description="Token budget for the stored history, None to disable",
+    )
+    # Object exposing `count_message(Message) -> int` (the LLM's TokenCounter).
+    # Without it only `max_messages` is enforced.
+    token_counter: Optional[Any] = Field(default=None, exclude=True)
+
+    _total_tokens: int = PrivateAttr(default=0)
+
+    @property
+    def total_tokens(self) -> int:
+        """Running token total of the stored messages"""
+        return self._total_tokens
+
+    def _count(self, message: Message) -> int:
+        return self.token_counter.count_message(message) if self.token_counter else 0
 
     def add_message(self, message: Message) -> None:
         """Add a message to memory"""
         self.messages.append(message)
-        # Optional: Implement message limit
-        if len(self.messages) > self.max_messages:
-            self.messages = self.messages[-self.max_messages :]
+        self._total_tokens += self._count(message)
+        self._trim()
 
     def add_messages(self, messages: List[Message]) -> None:
         """Add multiple messages to memory"""
         self.messages.extend(messages)
-        # Optional: Implement message limit
+        self._total_tokens += sum(self._count(message) for message in messages)
+        self._trim()
+
+    def set_messages(self, messages: List[Message]) -> None:
+        """Replace all messages, recomputing the total from cached counts"""
+        self.messages = list(messages)
+        self._total_tokens = sum(self._count(message) for message in self.messages)
+        self._trim()
+
+    def set_token_counter(self, token_counter: Any) -> None:
+        """Attach a token counter and account for messages already stored"""
+        self.token_counter = token_counter
+        self.set_messages(self.messages)
+
+    def _over_budget(self) -> bool:
         if len(self.messages) > self.max_messages:
-            self.messages = self.messages[-self.max_messages :]
+            return True
+        return (
+            self.max_tokens is not None
+            and self.token_counter is not None
+            and self._total_tokens > self.max_tokens
+        )
+
+    def _pinned(self) -> Set[int]:
+        """Indices of the first and the latest user requests (step prompts don't count)"""
+        requests = [
+            i for i, msg in enumerate(self.messages) if msg.role == Role.USER and not msg.step_prompt
+        ]
+        return {requests[0], requests[-1]} if requests else set()
+
+    def _current_step(self) -> int:
+        """Index of the last user message (step prompt or not); it and what follows are kept"""
+        return max(
+            (i for i, msg in enumerate(self.messages) if msg.role == Role.USER),
+            default=len(self.messages),
+        )
+
+    def _evictable_groups(self, pinned: Set[int], current_step: int) -> List[List[int]]:
+        """Group message indices into units that are evicted together, oldest first.
+
+        An assistant message with tool calls and the tool results that follow it form
+        one unit. System messages, the `pinned` requests and the current step are
+        never evicted.
+        """
+        groups: List[List[int]] = []
+        for i, msg in enumerate(self.messages[:current_step]):
+            if msg.role == Role.SYSTEM or i in pinned:
+                continue
+            follows_tool_call = (
+                groups
+                and groups[-1][-1] == i - 1
+                and self.messages[groups[-1][0]].tool_calls
+            )
+            if msg.role == Role.TOOL and follows_tool_call:
+                groups[-1].append(i)
+            else:
+                groups.append([i])
+        return groups
+
+    def _trim(self) -> None:
+        """Evict the oldest message units until within `max_messages` and `max_tokens`.
+
+        Eviction continues past the budget while the history would otherwise start
+        with an assistant or tool message.
+        """
+        if not self._over_budget():
+            return
+
+        pinned = self._pinned()
+        current_step = self._current_step()
+        groups = self._evictable_groups(pinned, current_step)
+        # the first message kept ahead of the evictable ones; without any user message
+        # there is no user turn to start the history with
+        floor = min([*pinned, current_step])
+        has_user = current_step < len(self.messages)
+        evicted = set()
+        count = len(self.messages)
+        total = self._total_tokens
+        for group in groups:
+            within = count <= self.max_messages and (
+                self.max_tokens is None
+                or self.token_counter is None
+                or total <= self.max_tokens
+            )
+            starts_with_user = self.messages[min(group[0], floor)].role == Role.USER
+            if within and (not evicted or not has_user or starts_with_user):
+                break
+            evicted.update(group)
+            count -= len(group)
+            total -= sum(self._count(self.messages[i]) for i in group)
+
+        if evicted:
+            self.messages = [
+                msg for i, msg in enumerate(self.messages) if i not in evicted
+            ]
+            self._total_tokens = total
 
     def clear(self) -> None:
         """Clear all messages"""
         self.messages.clear()
+        self._total_tokens = 0
 
     def get_recent_messages(self, n: int) -> List[Message]:
         """Get n most recent messages"""
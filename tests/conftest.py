@@ -0,0 +1,36 @@
+import pytest
+
+
+class _WordEncoding:
+    """Stands in for a tiktoken encoding, which would be downloaded on first use"""
+
+    name = "test-words"
+
+    def encode(self, text, **kwargs):
+        return text.split()
+
+
+@pytest.fixture
+def make_llm(monkeypatch):
+    """Builds LLMs that need neither network access for the tokenizer nor a real API key"""
+    import tiktoken
+
+    from SREgent.llm import LLM
+
+    monkeypatch.setattr(tiktoken, "encoding_for_model", lambda model: _WordEncoding())
+    monkeypatch.setattr(tiktoken, "get_encoding", lambda name: _WordEncoding())
+    monkeypatch.setattr(LLM, "_instances", {})
+
+    def make(base_url="http://127.0.0.1:9/v1"):
+        llm = LLM(model="test-model", base_url=base_url, api_key="test")
+        # the process-wide limiter and cache stay out of tests unless a test sets them
+        llm.rate_limiter = None
+        llm.cache = None
+        return llm
+
+    return make
+
+
+@pytest.fixture
+def llm(make_llm):
+    return make_llm()
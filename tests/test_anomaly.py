@@ -0,0 +1,99 @@
+import numpy as np
+import pytest
+
+from SREgent.tool.anomaly import (
+    changepoints,
+    detect,
+    ewma_scores,
+    mad_scores,
+    stack_series,
+    zscore_scores,
+)
+
+
+def _noise(n, seed=0):
+    return np.random.default_rng(seed).normal(10.0, 1.0, n)
+
+
+def _spike(n=200, at=150, height=20.0):
+    x = _noise(n)
+    x[at] += height
+    return x
+
+
+@pytest.mark.parametrize(
+    "scores",
+    [
+        lambda x: zscore_scores(x, 30, 15),
+        lambda x: ewma_scores(x, 30, 15),
+        mad_scores,
+    ],
+    ids=["zscore", "ewma", "mad"],
+)
+def test_point_detectors_flag_only_the_spike(scores):
+    s = scores(_spike()[None, :])
+    assert s.shape == (1, 200)
+    assert int(np.argmax(s[0])) == 150
+    assert s[0, 150] > 10
+    assert np.all(np.delete(s[0], 150) < 5)
+
+
+def test_constant_baseline_scores_any_change_as_max():
+    x = np.full((1, 40), 5.0)
+    x[0, 30] = 6.0
+    s = zscore_scores(x, 10, 5)
+    assert s[0, 30] == s.max() > 1e5
+    assert not s[0, :30].any()
+
+
+def test_nan_points_and_warmup_score_zero():
+    x = _spike()[None, :].copy()
+    x[0, 100] = np.nan
+    for s in (zscore_scores(x, 30, 15), ewma_scores(x, 30, 15), mad_scores(x)):
+        assert s[0, 100] == 0
+    assert np.all(zscore_scores(x, 30, 15)[0, :15] == 0)
+
+
+def test_changepoint_finds_the_shift_per_series():
+    shifted = _noise(120, seed=1)
+    shifted[80:] += 8
+    x = np.vstack((shifted, _noise(120, seed=2)))
+    split, effect, t_stat = changepoints(x, 5)
+    assert split[0] == 80
+    assert effect[0] > 5
+    assert t_stat[0] > t_stat[1]
+    assert effect[1] < 1
+
+
+def test_stack_series_right_aligns():
+    times, values = stack_series([(np.array([1.0, 2.0, 3.0]), np.array([4.0, 5.0, 6.0])),
+                                  (np.array([3.0]), np.array([7.0]))])
+    assert values.shape == (2, 3)
+    assert np.isnan(values[1, :2]).all() and values[1, 2] == 7.0
+    assert times[1, 2] == 3.0
+
+
+def test_detect_ranks_windows_across_series():
+    n = 200
+    times = np.tile(np.arange(n, dtype=float), (3, 1))
+    values = np.vstack((_spike(height=30.0), _noise(n, seed=3), _noise(n, seed=4)))
+    values[2, 120:] += 10
+
+    windows, total = detect(times, values, window=30, threshold=6.0)
+    assert total == len(windows) == 3
+    assert [w["score"] for w in windows] == sorted((w["score"] for w in windows), reverse=True)
+    # the quiet series has none; the step is both a point anomaly and a changepoint
+    spike, step, shift = sorted(windows, key=lambda w: (w["row"], len(w["detectors"]) == 1))
+    assert spike["row"] == 0 and spike["peak_ts"] == 150.0
+    assert set(spike["detectors"]) >= {"zscore", "mad"}
+    assert step["row"] == 2 and step["start"] == 120.0
+    assert shift["row"] == 2 and shift["detectors"] == ["changepoint"]
+    assert (shift["start"], shift["end"]) == (120.0, 199.0)
+
+    limited, total = detect(times, values, detectors=["changepoint"], window=30, threshold=6.0, limit=1)
+    assert total == 1 and limited[0]["row"] == 2
+
+
+def test_detect_rejects_unknown_detectors():
+    with pytest.raises(ValueError):
+        detect(np.zeros((1, 1)), np.zeros((1, 1)), detectors=["prophet"])
@@ -0,0 +1,39 @@
+import asyncio
+import os
+
+from SREgent.agents.toolcall import ToolCallAgent
+from SREgent.tool import ToolCollection
+from SREgent.tool.base import tool_session_id
+from SREgent.tool.bash import Bash, get_bash_manager
+
+
+def test_shell_state_outlives_a_run_until_the_agent_is_closed(llm, tmp_path):
+    agent = ToolCallAgent(llm=llm, available_tools=ToolCollection(Bash()))
+    bash = agent.available_tools.get_tool("bash")
+
+    async def pwd():
+        token = tool_session_id.set(agent.session_id)
+        try:
+            return (await bash.execute(command="pwd")).output.strip()
+        finally:
+            tool_session_id.reset(token)
+
+    async def scenario():
+        token = tool_session_id.set(agent.session_id)
+        try:
+            await bash.execute(command=f"cd {tmp_path}")
+        finally:
+            tool_session_id.reset(token)
+        # what run() does when it finishes
+        await agent.cleanup()
+        after_run = await pwd()
+        await agent.close()
+        closed = agent.session_id not in get_bash_manager().session_ids
+        after_close = await pwd()
+        await get_bash_manager().close()
+        return after_run, closed, after_close
+
+    after_run, closed, after_close = asyncio.run(scenario())
+    assert after_run == str(tmp_path)
+    assert closed
+    assert after_close == os.getcwd()
@@ -0,0 +1,80 @@
+import time
+
+from SREgent.cache import ResponseCache
+
+
+def _params(question, temperature=0, context="you are an SRE agent"):
+    return {
+        "model": "test-model",
+        "temperature": temperature,
+        "messages": [
+            {"role": "system", "content": context},
+            {"role": "user", "content": question},
+        ],
+        "timeout": 30,
+    }
+
+
+def test_exact_hit_ignores_fields_that_do_not_shape_the_request():
+    cache = ResponseCache()
+    cache.put("ask", _params("why is disk full"), "logs")
+    assert cache.get("ask", {**_params("why is disk full"), "timeout": 5}) == "logs"
+    assert cache.get("ask", _params("why is disk full", temperature=0.7)) is None
+    assert cache.get("ask_tool", _params("why is disk full")) is None
+    assert cache.stats() == {"hits": 1, "similar_hits": 0, "misses": 2, "hit_rate": 1 / 3, "entries": 1}
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    cache = ResponseCache(ttl=60)
+    now = [1000.0]
+    monkeypatch.setattr(time, "time", lambda: now[0])
+    cache.put("ask", _params("q"), "a")
+    now[0] += 59
+    assert cache.get("ask", _params("q")) == "a"
+    now[0] += 2
+    assert cache.get("ask", _params("q")) is None
+    # expired rows are dropped on the next insert
+    cache.put("ask", _params("other"), "b")
+    assert cache.stats()["entries"] == 1
+
+
+def test_least_recently_used_entries_are_evicted(monkeypatch):
+    cache = ResponseCache(max_entries=2)
+    now = [1000.0]
+    monkeypatch.setattr(time, "time", lambda: now[0])
+    for question in ("first", "second"):
+        cache.put("ask", _params(question), question)
+        now[0] += 1
+    assert cache.get("ask", _params("first")) == "first"
+    now[0] += 1
+    cache.put("ask", _params("third"), "third")
+
+    assert cache.get("ask", _params("second")) is None
+    assert cache.get("ask", _params("first")) == "first"
+    assert cache.get("ask", _params("third")) == "third"
+
+
+def test_similar_questions_hit_only_at_temperature_zero():
+    cache = ResponseCache(similarity_threshold=0.7)
+    cache.put("ask", _params("why is the disk on web-1 full"), "logs")
+    cache.put("ask", _params("why is the disk on web-1 full", temperature=0.5), "warm")
+
+    assert cache.get("ask", _params("why is the disk on web-1 full now")) == "logs"
+    # a different context or a sampled call never matches by similarity
+    assert cache.get("ask", _params("why is the disk on web-1 full now", context="other")) is None
+    assert cache.get("ask", _params("why is the disk on web-1 full now", temperature=0.5)) is None
+    assert cache.get("ask", _params("restart nginx")) is None
+    assert cache.stats()["similar_hits"] == 1
+
+
+def test_entries_survive_a_restart(tmp_path):
+    path = str(tmp_path / "cache" / "responses.db")
+    cache = ResponseCache(path=path)
+    cache.put("ask", _params("q"), "a")
+    cache.close()
+
+    reopened = ResponseCache(path=path)
+    try:
+        assert reopened.get("ask", _params("q")) == "a"
+    finally:
+        reopened.close()
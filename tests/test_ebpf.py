@@ -0,0 +1,104 @@
+from SREgent.tool import ebpf
+from SREgent.tool.ebpf import BpftraceOutputParser, Histogram, record_metrics
+from SREgent.tool.metric_store import MetricStore
+
+
+BPFTRACE_OUTPUT = """Attaching 2 probes...
+@bytes[sshd]: 1024
+@bytes[nginx]: 4096
+@bytes[cron]: 8
+@usecs:
+[0]                    3 |@@@@                  |
+[1]                    0 |                      |
+[2, 4)                 5 |@@@@@@@@              |
+[4, 8)                 2 |@@                    |
+
+@stack[
+    do_sys_open+1
+    __x64_sys_openat+20
+]: 7
+@s: count 3, average 10, total 30
+open /etc/hosts
+open /etc/hosts
+open /etc/passwd
+Lost 5 events
+"""
+
+BCC_OUTPUT = """Tracing block device I/O... Hit Ctrl-C to end.
+     usecs               : count     distribution
+         0 -> 1          : 0        |                                        |
+         2 -> 3          : 4        |****************************************|
+         4 -> 7          : 4        |****************************************|
+"""
+
+
+def _parse(text, **kwargs):
+    return BpftraceOutputParser(**kwargs).feed_lines(text.splitlines(keepends=True))
+
+
+def test_bpftrace_output_is_summarized():
+    summary = _parse(BPFTRACE_OUTPUT, max_keys=2).summary()
+
+    assert (summary["probes"], summary["lost_events"]) == (2, 5)
+    # keys beyond max_keys are counted, not kept
+    assert summary["maps"]["@bytes"] == {
+        "keys": 2,
+        "sum": 5120,
+        "top": [["nginx", 4096], ["sshd", 1024]],
+        "dropped_keys": 1,
+    }
+    # a multi-line stack key is folded into one string
+    assert summary["maps"]["@stack"]["top"] == [["do_sys_open+1;__x64_sys_openat+20", 7]]
+    assert summary["stats"] == {"@s": {"count": 3, "average": 10, "total": 30}}
+    assert summary["events"]["count"] == 3
+    assert summary["events"]["most_common"] == [["open /etc/hosts", 2]]
+
+    usecs = summary["histograms"]["@usecs"]
+    assert (usecs["kind"], usecs["count"], usecs["p50"]) == ("log2", 10, 2.8)
+    # empty buckets are left out
+    assert usecs["buckets"] == [[0, 1, 3], [2, 4, 5], [4, 8, 2]]
+
+
+def test_bcc_histogram_is_parsed():
+    summary = _parse(BCC_OUTPUT).summary()
+    usecs = summary["histograms"]["usecs"]
+    assert usecs["buckets"] == [[2, 4, 4], [4, 8, 4]]
+    assert usecs["p50"] == 4
+    assert summary["events"]["first"] == ["Tracing block device I/O... Hit Ctrl-C to end."]
+
+
+def test_reprinted_map_keeps_the_latest_values():
+    parser = _parse("@calls[read]: 1\n@calls[write]: 2\n\n@calls[read]: 10\n")
+    assert parser.maps["@calls"] == {"read": 10, "write": 2}
+
+
+def test_histogram_ending_with_the_output_is_kept():
+    parser = _parse("@lat:\n[16, 32)  1 |@|\n[32, 64)  3 |@@@|")
+    parser.close()
+    assert parser.histograms["@lat"].count == 4
+
+
+def test_histogram_percentiles_and_compaction():
+    hist = Histogram()
+    for lo in range(0, 100, 10):
+        hist.add(lo, lo + 10, 10)
+    assert hist.kind == "linear"
+    assert hist.percentile(0.5) == 50
+    assert hist.percentile(0.95) == 95
+    assert Histogram().percentile(0.5) is None
+    assert hist.compact(4) == [[0, 40, 40], [40, 80, 40], [80, 100, 20]]
+
+
+def test_record_metrics_stores_maps_histograms_and_stats(monkeypatch):
+    store = MetricStore()
+    monkeypatch.setattr(ebpf, "get_metric_store", lambda: store)
+    assert record_metrics(_parse(BPFTRACE_OUTPUT), prefix="t", ts=1000.0) > 0
+
+    def last(name, **labels):
+        (series,) = store.select(name, labels or None)
+        return store.slice(series, 0, 2000)[1][-1]
+
+    assert last("t.bytes", key="nginx") == 4096
+    assert last("t.usecs.p50") == 2.8
+    assert last("t.s.total") == 30
+    assert last("t.lost_events") == 5
@@ -0,0 +1,49 @@
+import asyncio
+
+from SREgent.tool.edit_history import EditHistory
+from SREgent.tool.str_replace_editor import StrReplaceEditor
+
+
+def _edit(history, path, contents):
+    for before, after in zip(contents, contents[1:]):
+        history.record(path, before, after)
+
+
+def test_journal_replays_to_the_same_stack(tmp_path):
+    history = EditHistory(persist_dir=str(tmp_path), max_steps_per_file=3)
+    versions = [f"line {i}\n" * 3 for i in range(6)]
+    _edit(history, "/srv/app.conf", versions)
+    content, undone = history.undo("/srv/app.conf", versions[-1])
+    assert (content, undone) == (versions[-2], 1)
+
+    # appended, not rewritten: a push per edit plus the trims and the undo
+    (journal,) = tmp_path.glob("*.jsonl")
+    assert len(journal.read_text().splitlines()) > history.steps("/srv/app.conf")
+
+    reloaded = EditHistory(persist_dir=str(tmp_path), max_steps_per_file=3)
+    assert reloaded.steps("/srv/app.conf") == 2
+    assert reloaded.undo("/srv/app.conf", versions[-2], steps=5) == (versions[-4], 2)
+    assert not list(tmp_path.glob("*.jsonl"))
+
+
+def test_journal_is_compacted(tmp_path):
+    history = EditHistory(persist_dir=str(tmp_path), max_steps_per_file=2)
+    versions = [f"v{i}" for i in range(100)]
+    _edit(history, "/srv/app.conf", versions)
+    (journal,) = tmp_path.glob("*.jsonl")
+    assert len(journal.read_text().splitlines()) <= 2 * 2 + 32
+    assert EditHistory(persist_dir=str(tmp_path)).steps("/srv/app.conf") == 2
+
+
+def test_editors_share_one_history(tmp_path):
+    path = tmp_path / "app.conf"
+    path.write_text("a=1\n")
+    first, second = StrReplaceEditor(), StrReplaceEditor()
+
+    async def scenario():
+        await first.execute(command="str_replace", path=str(path), old_str="a=1", new_str="a=2")
+        return await second.execute(command="undo_edit", path=str(path))
+
+    assert "undone successfully" in asyncio.run(scenario())
+    assert path.read_text() == "a=1\n"
+    assert first._file_history is second._file_history
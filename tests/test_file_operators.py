@@ -0,0 +1,32 @@
+import asyncio
+
+import pytest
+
+from SREgent.tool.file_operators import LocalFileOperator, SandboxFileOperator
+
+
+TEXT = "alpha\nbeta gamma\n\ntimeout\n123\nretry timeout 30\nlast"
+
+
+@pytest.mark.parametrize(
+    "pattern, max_matches",
+    [(r"\s", 100), (r"timeout\s+\d+", 100), (r"^\w+$", 100), (r"a", 2), (r"a", 3)],
+)
+def test_local_and_sandbox_search_agree(tmp_path, pattern, max_matches):
+    path = tmp_path / "app.log"
+    path.write_text(TEXT)
+
+    async def both():
+        # an empty sandbox command runs the helper on this machine
+        sandbox = SandboxFileOperator(command=[])
+        try:
+            return (
+                await LocalFileOperator().search(path, pattern, max_matches),
+                await sandbox.search(path, pattern, max_matches),
+            )
+        finally:
+            await sandbox.close()
+
+    local, remote = asyncio.run(both())
+    assert local == remote
+    assert all("\n" not in text for _, text in local[0])
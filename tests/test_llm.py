@@ -0,0 +1,75 @@
+import asyncio
+import json
+
+from SREgent.benchmarks.mock_server import MockOpenAIServer
+from SREgent.cache import ResponseCache
+from SREgent.llm import LLM, _JsonObjectScanner
+from SREgent.schema import Message, StreamEventType
+
+
+def test_scanner_finds_the_end_of_the_object_once():
+    scanner = _JsonObjectScanner()
+    chunks = ['{"command": "echo ', '\\"}{\\" ', '[1]"', ', "n": {"a": [1', ", 2]}", "}"]
+    closed = [scanner.feed(chunk) for chunk in chunks]
+    assert closed == [False, False, False, False, False, True]
+    assert json.loads("".join(chunks)) == {"command": 'echo "}{" [1]', "n": {"a": [1, 2]}}
+
+
+def _stream(make_llm, script, chunk_size=7):
+    async def scenario():
+        async with MockOpenAIServer(script, chunk_size=chunk_size) as server:
+            llm = make_llm(server.base_url)
+            try:
+                return [
+                    event
+                    async for event in llm.ask_tool_stream([Message.user_message("go")], tools=[])
+                ]
+            finally:
+                await LLM.aclose()
+
+    return asyncio.run(scenario())
+
+
+def test_streamed_tool_calls_keep_their_arguments(make_llm):
+    arguments = {"command": "printf '%s\\n' \"{\" '}'" + " x" * 500}
+    script = [
+        {
+            "content": "checking",
+            "tool_calls": [
+                {"name": "bash", "arguments": arguments},
+                {"name": "terminate", "arguments": {"status": "success"}},
+            ],
+        }
+    ]
+    events = _stream(make_llm, script)
+
+    calls = [e for e in events if e.type == StreamEventType.TOOL_CALL]
+    assert [(e.index, e.tool_call.function.name) for e in calls] == [(0, "bash"), (1, "terminate")]
+    assert json.loads(calls[0].tool_call.function.arguments) == arguments
+    done = events[-1]
+    assert done.type == StreamEventType.DONE
+    assert [c.function.arguments for c in done.tool_calls] == [
+        c.tool_call.function.arguments for c in calls
+    ]
+
+
+def test_cache_hit_gets_fresh_tool_call_ids(make_llm):
+    script = [{"content": "", "tool_calls": [{"name": "bash", "arguments": {"command": "uptime"}}]}]
+
+    async def scenario():
+        async with MockOpenAIServer(script) as server:
+            llm = make_llm(server.base_url)
+            llm.cache = ResponseCache()
+            messages = [Message.user_message("check the load")]
+            try:
+                first = await llm.ask_tool(messages, tools=[], temperature=0)
+                second = await llm.ask_tool(messages, tools=[], temperature=0)
+            finally:
+                llm.cache.close()
+                await LLM.aclose()
+            return first, second, server.requests
+
+    first, second, requests = asyncio.run(scenario())
+    assert requests == 1
+    assert second.tool_calls[0].function == first.tool_calls[0].function
+    assert second.tool_calls[0].id != first.tool_calls[0].id
@@ -0,0 +1,63 @@
+from SREgent.schema import Memory, Message, Role, ToolCall
+
+
+class _WordCounter:
+    def count_message(self, message):
+        return 4 + len((message.content or "").split())
+
+
+def _step(memory, n):
+    """One agent step: step prompt, a tool call and its result"""
+    memory.add_message(Message.user_message("Decide the next step.", step_prompt=True))
+    call = ToolCall(id=f"call_{n}", function={"name": "bash", "arguments": "{}"})
+    memory.add_message(Message(role=Role.ASSISTANT, content=f"step {n}", tool_calls=[call]))
+    memory.add_message(Message.tool_message("output " * 20, name="bash", tool_call_id=f"call_{n}"))
+
+
+def _check_history(memory):
+    messages = [m for m in memory.messages if m.role != Role.SYSTEM]
+    assert messages[0].role == Role.USER
+    for previous, message in zip(messages, messages[1:]):
+        if message.role == Role.TOOL:
+            assert previous.role == Role.TOOL or previous.tool_calls
+    counter = _WordCounter()
+    assert memory.total_tokens == sum(counter.count_message(m) for m in memory.messages)
+
+
+def test_task_survives_step_prompts():
+    memory = Memory(max_tokens=300, token_counter=_WordCounter())
+    memory.add_message(Message.system_message("You are an SRE agent."))
+    memory.add_message(Message.user_message("Find why checkout latency doubled"))
+    for n in range(20):
+        _step(memory, n)
+        _check_history(memory)
+
+    assert memory.total_tokens <= 300
+    assert memory.messages[1].content == "Find why checkout latency doubled"
+    # the latest step is complete, older ones went first
+    assert [m.content for m in memory.messages[-2:-1]] == ["step 19"]
+    assert "step 0" not in [m.content for m in memory.messages]
+
+
+def test_latest_request_is_kept_with_the_first():
+    memory = Memory(max_messages=8, token_counter=_WordCounter())
+    memory.add_message(Message.user_message("first task"))
+    for n in range(3):
+        _step(memory, n)
+    memory.add_message(Message.user_message("the answer to your question"))
+    for n in range(3, 6):
+        _step(memory, n)
+        _check_history(memory)
+
+    contents = [m.content for m in memory.messages]
+    assert len(contents) <= 8
+    assert contents[:2] == ["first task", "the answer to your question"]
+
+
+def test_history_never_starts_with_a_tool_result():
+    # no real request yet: only step prompts, the first of which may go
+    memory = Memory(max_messages=5, token_counter=_WordCounter())
+    for n in range(4):
+        _step(memory, n)
+        _check_history(memory)
+    assert len(memory.messages) <= 5
@@ -0,0 +1,25 @@
+from SREgent.tool.metric_store import MetricStore
+
+
+def test_stale_series_make_room_at_the_limit(tmp_path):
+    store = MetricStore(max_series=2, persist_dir=str(tmp_path), series_ttl=60)
+    store.append("proc.cpu_pct", 1.0, {"comm": "old"}, ts=0)
+    store.append("proc.cpu_pct", 1.0, {"comm": "live"}, ts=100)
+    assert store.append("proc.cpu_pct", 1.0, {"comm": "new"}, ts=110)
+    assert [s.label_dict["comm"] for s in store.select("proc.*")] == ["live", "new"]
+    assert store.evicted_series == 1
+
+    # nothing is stale yet: the new series is refused, not the live ones evicted
+    assert not store.append("proc.cpu_pct", 1.0, {"comm": "other"}, ts=120)
+    assert store.dropped_series == 1
+
+    store.flush()
+    reloaded = MetricStore(persist_dir=str(tmp_path))
+    assert sorted(s.label_dict["comm"] for s in reloaded.select("proc.*")) == ["live", "new"]
+
+
+def test_series_ttl_none_never_evicts():
+    store = MetricStore(max_series=1, series_ttl=None)
+    store.append("a", 1.0, ts=0)
+    assert not store.append("b", 1.0, ts=10_000)
+    assert [s.name for s in store.select()] == ["a"]
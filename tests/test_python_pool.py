@@ -0,0 +1,83 @@
+import asyncio
+
+import pytest
+
+from SREgent.tool.python_pool import PythonWorkerPool
+
+
+def _with_pool(scenario, **kwargs):
+    async def run():
+        pool = PythonWorkerPool(size=1, preload=[], **kwargs)
+        try:
+            return await scenario(pool)
+        finally:
+            await pool.close()
+
+    return asyncio.run(run())
+
+
+def test_runs_code_on_a_reused_worker(tmp_path):
+    async def scenario(pool):
+        first = await pool.run(
+            "import sys; print('hi', sys.argv[1:]); print('oops', file=sys.stderr)", args=["a", 1]
+        )
+        second = await pool.run(
+            "import os; print(os.getcwd(), os.environ['POOL_TEST']); raise SystemExit(3)",
+            workdir=str(tmp_path),
+            env={"POOL_TEST": "yes"},
+        )
+        third = await pool.run("import os; print('POOL_TEST' in os.environ)")
+        return first, second, third
+
+    first, second, third = _with_pool(scenario)
+    assert (first["returncode"], first["stdout"], first["stderr"]) == (0, "hi ['a', '1']\n", "oops\n")
+    assert second["returncode"] == 3
+    assert second["stdout"] == f"{tmp_path} yes\n"
+    # the environment is restored after each call
+    assert third["stdout"] == "False\n"
+    assert first["worker_pid"] == second["worker_pid"] == third["worker_pid"]
+
+
+def test_namespace_is_reset_unless_disabled():
+    async def scenario(pool):
+        await pool.run("counter = 41")
+        kept = await pool.run("print(counter + 1)")
+        reset = await pool.run("print('counter' in globals())", reset=True)
+        return kept, reset
+
+    kept, reset = _with_pool(scenario, reset_namespace=False)
+    assert kept["stdout"] == "42\n"
+    assert reset["stdout"] == "False\n"
+
+
+def test_timeout_and_crash_replace_the_worker():
+    async def scenario(pool):
+        before = await pool.run("print('warm')")
+        slow = await pool.run("import time; print('started', flush=True); time.sleep(30)", timeout=0.5)
+        crashed = await pool.run("import os; os._exit(7)")
+        after = await pool.run("print('ok')")
+        return before, slow, crashed, after
+
+    before, slow, crashed, after = _with_pool(scenario)
+    assert slow["timed_out"] and slow["stdout"] == "started\n"
+    assert slow["worker_pid"] == before["worker_pid"]
+    assert crashed["returncode"] == 7 and "crashed" in crashed["stderr"]
+    assert after["stdout"] == "ok\n"
+    assert len({slow["worker_pid"], crashed["worker_pid"], after["worker_pid"]}) == 3
+
+
+def test_workers_are_recycled_after_max_runs():
+    async def scenario(pool):
+        return [(await pool.run("pass"))["worker_pid"] for _ in range(4)]
+
+    pids = _with_pool(scenario, max_runs=2)
+    assert pids[0] == pids[1] != pids[2] == pids[3]
+
+
+def test_closed_pool_refuses_work():
+    async def scenario(pool):
+        await pool.close()
+        with pytest.raises(RuntimeError):
+            await pool.run("pass")
+
+    _with_pool(scenario)
@@ -0,0 +1,38 @@
+import gzip
+
+from SREgent.tool.search import search_files
+
+
+def _lines(result):
+    return [(m["line"], m["column"], m["text"]) for m in result["matches"]]
+
+
+def _write(tmp_path, name, text):
+    path = tmp_path / name
+    if name.endswith(".gz"):
+        with gzip.open(path, "wt") as f:
+            f.write(text)
+    else:
+        path.write_text(text)
+    return str(path)
+
+
+TEXT = "alpha\nbeta gamma\n\ntimeout\n123\nretry timeout 30\n"
+
+
+def test_whitespace_does_not_match_newline(tmp_path):
+    for name in ("app.log", "app.log.gz"):
+        result = search_files(r"\s", _write(tmp_path, name, TEXT))
+        assert _lines(result) == [(2, 5, "beta gamma"), (6, 6, "retry timeout 30")]
+
+
+def test_match_does_not_continue_on_next_line(tmp_path):
+    for name in ("app.log", "app.log.gz"):
+        result = search_files(r"timeout\s+\d+", _write(tmp_path, name, TEXT))
+        assert _lines(result) == [(6, 7, "retry timeout 30")]
+
+
+def test_line_anchors(tmp_path):
+    path = _write(tmp_path, "app.log", TEXT)
+    assert _lines(search_files(r"^\d+$", path)) == [(5, 1, "123")]
+    assert _lines(search_files(r"a$", path)) == [(1, 5, "alpha"), (2, 10, "beta gamma")]
@@ -0,0 +1,65 @@
+import asyncio
+import threading
+
+import pytest
+
+from SREgent.tool import tool
+
+
+def test_process_slots_are_shared_across_event_loops():
+    slots = tool._SharedSemaphore(2)
+    lock = threading.Lock()
+    running, peak = [0], [0]
+
+    async def job():
+        async with slots:
+            with lock:
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+            await asyncio.sleep(0.02)
+            with lock:
+                running[0] -= 1
+
+    def loop():
+        async def jobs():
+            await asyncio.gather(*(job() for _ in range(4)))
+
+        asyncio.run(jobs())
+
+    threads = [threading.Thread(target=loop) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert peak[0] == 2
+    assert slots._value == 2
+
+
+def test_cancelled_waiter_does_not_keep_a_slot():
+    async def scenario():
+        slots = tool._SharedSemaphore(1)
+        await slots.acquire()
+        waiter = asyncio.create_task(slots.acquire())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        slots.release()
+        return slots._value
+
+    assert asyncio.run(scenario()) == 1
+
+
+def test_blocking_wrapper_fails_fast_on_the_tool_loop():
+    async def call_blocking():
+        with pytest.raises(RuntimeError):
+            tool.exec_shell("true")
+
+    asyncio.run_coroutine_threadsafe(call_blocking(), tool._background_loop()).result(timeout=10)
+    assert tool.exec_shell("echo ok")["stdout"].strip() == "ok"
+
+
+def test_default_tools_are_async():
+    by_name = {t["name"]: t["function"] for t in tool.DEFAULT_TOOLS}
+    assert by_name["exec_shell"] is tool.aexec_shell
+    assert by_name["exec_python"] is tool.aexec_python
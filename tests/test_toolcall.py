@@ -0,0 +1,95 @@
+import asyncio
+import json
+
+from SREgent.agents.toolcall import ToolCallAgent
+from SREgent.schema import Role, ToolCall
+from SREgent.tool import ToolCollection
+from SREgent.tool.base import BaseTool, ToolResult
+from SREgent.tool.str_replace_editor import StrReplaceEditor
+
+
+class _Recorder(BaseTool):
+    """Sleeps, then returns its tag; logs when each call starts and ends"""
+
+    name: str = "recorder"
+    description: str = "test tool"
+    parameters: dict = {"type": "object", "properties": {"tag": {"type": "string"}}}
+    events: list = []
+
+    async def execute(self, tag: str, delay: float = 0.01) -> ToolResult:
+        self.events.append(("start", tag))
+        await asyncio.sleep(delay)
+        self.events.append(("end", tag))
+        return ToolResult(output=tag)
+
+
+class _StatefulRecorder(_Recorder):
+    name: str = "stateful_recorder"
+    stateful: bool = True
+
+
+def _call(position, name, **arguments):
+    return ToolCall(
+        id=f"call_{position}",
+        function={"name": name, "arguments": json.dumps(arguments)},
+    )
+
+
+def _agent(llm, *tools, **kwargs):
+    return ToolCallAgent(llm=llm, available_tools=ToolCollection(*tools), **kwargs)
+
+
+def _tool_results(agent):
+    return [(m.tool_call_id, m.content) for m in agent.memory.messages if m.role == Role.TOOL]
+
+
+def test_concurrent_edits_of_one_file_are_not_lost(llm, tmp_path):
+    path = tmp_path / "settings.conf"
+    path.write_text("a=1\nb=2\nc=3\n")
+    agent = _agent(llm, StrReplaceEditor())
+    agent.tool_calls = [
+        _call(0, "str_replace_editor", command="str_replace", path=str(path), old_str="a=1", new_str="a=10"),
+        _call(1, "str_replace_editor", command="str_replace", path=str(path), old_str="c=3", new_str="c=30"),
+        _call(2, "str_replace_editor", command="view", path=str(path)),
+    ]
+
+    asyncio.run(agent.act())
+
+    assert path.read_text() == "a=10\nb=2\nc=30\n"
+    results = _tool_results(agent)
+    assert [call_id for call_id, _ in results] == ["call_0", "call_1", "call_2"]
+    assert all("Error" not in content for _, content in results)
+
+
+def test_stateful_calls_run_in_order_others_overlap(llm):
+    stateful, plain = _StatefulRecorder(events=[]), _Recorder(events=[])
+    agent = _agent(llm, stateful, plain)
+    agent.tool_calls = [
+        _call(0, "stateful_recorder", tag="s1", delay=0.05),
+        _call(1, "recorder", tag="p1", delay=0.05),
+        _call(2, "stateful_recorder", tag="s2"),
+        _call(3, "recorder", tag="p2", delay=0.05),
+    ]
+
+    asyncio.run(agent.act())
+
+    assert stateful.events == [("start", "s1"), ("end", "s1"), ("start", "s2"), ("end", "s2")]
+    assert plain.events[:2] == [("start", "p1"), ("start", "p2")]
+    results = _tool_results(agent)
+    assert [call_id for call_id, _ in results] == ["call_0", "call_1", "call_2", "call_3"]
+    assert [content.rsplit("\n", 1)[-1] for _, content in results] == ["s1", "p1", "s2", "p2"]
+
+
+def test_concurrency_limit_works_on_each_event_loop(llm):
+    plain = _Recorder(events=[])
+    agent = _agent(llm, plain, max_concurrent_tools=1)
+
+    for run in range(2):
+        agent.tool_calls = [_call(i, "recorder", tag=f"{run}-{i}") for i in range(3)]
+        # a separate asyncio.run: the semaphore of the first loop must not be reused
+        asyncio.run(agent.act())
+
+    starts = [event for event in plain.events if event[0] == "start"]
+    assert len(starts) == 6
+    # with one slot, every call ends before the next one starts
+    assert all(plain.events[i][0] != plain.events[i + 1][0] for i in range(len(plain.events) - 1))
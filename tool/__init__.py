@@ -1,10 +1,15 @@
+from SREgent.tool.anomaly import DetectAnomalies
 from SREgent.tool.base import BaseTool
 from SREgent.tool.bash import Bash
 # from app.tool.browser_use_tool import BrowserUseTool
 # from app.tool.crawl4ai import Crawl4aiTool
 from SREgent.tool.create_chat_completion import CreateChatCompletion
+from SREgent.tool.ebpf import EbpfTrace
+from SREgent.tool.flamegraph import StackProfile
+from SREgent.tool.metrics_query import MetricsQuery
+from SREgent.tool.proc_collector import ProcSnapshot
 # from app.tool.planning import PlanningTool
-# from SREgent.tool.str_replace_editor import StrReplaceEditor
+from SREgent.tool.str_replace_editor import StrReplaceEditor
 from SREgent.tool.terminate import Terminate
 from SREgent.tool.tool_collection import ToolCollection
 from SREgent.tool.ask_user import AskUser
@@ -16,10 +21,15 @@ __all__ = [
     "Bash",
     # "BrowserUseTool",
     "Terminate",
-    # "StrReplaceEditor",
+    "StrReplaceEditor",
     # "WebSearch",
     "ToolCollection",
     "CreateChatCompletion",
+    "EbpfTrace",
+    "DetectAnomalies",
+    "MetricsQuery",
+    "ProcSnapshot",
+    "StackProfile",
     "AskUser"
     # "PlanningTool",
     # "Crawl4aiTool",
@@ -0,0 +1,381 @@
+"""Anomaly detection over metric store series, vectorized across series.
+
+Series are stacked into one matrix (one row per series, right-aligned and
+padded with NaN on the left) so every detector runs as a handful of NumPy
+operations over all series at once:
+
+- zscore: distance from the mean of the trailing `window` points, in standard deviations
+- ewma: distance from an exponentially weighted mean, in EW standard deviations
+- mad: modified z-score against the series median and median absolute deviation
+- changepoint: the single best mean shift per series (effect size in pooled std)
+"""
+
+import asyncio
+import json
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from SREgent.config import ANOMALY_CONFIG
+from SREgent.exceptions import ToolError
+from SREgent.tool.base import BaseTool, ToolResult
+from SREgent.tool.metric_store import MetricStore, Series, downsample, get_metric_store
+
+
+DETECTORS = ("zscore", "ewma", "mad", "changepoint")
+_POINT_DETECTORS = ("zscore", "ewma", "mad")
+_MAX_SCORE = 1e6  # score of any change from a constant baseline
+
+_DETECT_ANOMALIES_DESCRIPTION = """Find anomalies in the metrics recorded by the other tools (see `metrics_query`) and return only the ranked anomalous windows.
+* Detectors, run over all matching series at once: `zscore` (rolling mean/std over `window` points), `ewma` (exponentially weighted mean/variance), `mad` (robust median/MAD), `changepoint` (largest mean shift)
+* `score` is in standard deviations (robust ones for mad, pooled ones for changepoint), 1e6 for any change from a constant baseline; points scoring at least `threshold` are flagged and neighbouring flagged points form one window
+* Select series with `name` (glob) and `labels`, and the time range with `since` or `start`/`end`
+"""
+
+
+def stack_series(
+    columns: Sequence[Tuple[np.ndarray, np.ndarray]]
+) -> Tuple[np.ndarray, np.ndarray]:
+    """(timestamps, values) pairs -> two (n_series, max_len) matrices, right-aligned, NaN-padded"""
+    width = max((len(values) for _, values in columns), default=0)
+    times = np.full((len(columns), width), np.nan)
+    values = np.full((len(columns), width), np.nan)
+    for row, (ts, vs) in enumerate(columns):
+        if len(vs):
+            times[row, width - len(vs) :] = ts
+            values[row, width - len(vs) :] = vs
+    return times, values
+
+
+def _trailing_sums(x: np.ndarray, window: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Count, sum and sum of squares of the `window` valid-or-NaN points before each point"""
+    valid = ~np.isnan(x)
+    filled = np.where(valid, x, 0.0)
+    pad = np.zeros((x.shape[0], 1))
+    counts = np.concatenate((pad, np.cumsum(valid, axis=1)), axis=1)
+    sums = np.concatenate((pad, np.cumsum(filled, axis=1)), axis=1)
+    squares = np.concatenate((pad, np.cumsum(filled * filled, axis=1)), axis=1)
+    idx = np.arange(x.shape[1])
+    lo = np.maximum(idx - window, 0)
+    return (
+        counts[:, idx] - counts[:, lo],
+        sums[:, idx] - sums[:, lo],
+        squares[:, idx] - squares[:, lo],
+    )
+
+
+def _ratio(num: np.ndarray, den: np.ndarray) -> np.ndarray:
+    """|num| / den; with no spread in the baseline any change gets _MAX_SCORE"""
+    out = np.zeros_like(num)
+    np.divide(np.abs(num), den, out=out, where=den > 0)
+    out[(den <= 0) & (np.abs(num) > 0)] = _MAX_SCORE
+    return np.minimum(out, _MAX_SCORE)
+
+
+def zscore_scores(x: np.ndarray, window: int, min_periods: int) -> np.ndarray:
+    count, total, squares = _trailing_sums(x, window)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = total / count
+        std = np.sqrt(np.maximum(squares / count - mean * mean, 0.0))
+    scores = _ratio(x - mean, std)
+    scores[(count < min_periods) | np.isnan(x)] = 0.0
+    return scores
+
+
+def ewma_scores(x: np.ndarray, window: int, min_periods: int) -> np.ndarray:
+    """One pass over time, vectorized over series"""
+    alpha = 2.0 / (window + 1)
+    n_series, width = x.shape
+    mean = np.full(n_series, np.nan)
+    var = np.zeros(n_series)
+    seen = np.zeros(n_series, dtype=np.int64)
+    scores = np.zeros_like(x)
+    for t in range(width):
+        column = x[:, t]
+        valid = ~np.isnan(column)
+        started = valid & ~np.isnan(mean)
+        diff = np.where(started, column - mean, 0.0)
+        ready = started & (seen >= min_periods)
+        scores[ready, t] = _ratio(diff[ready], np.sqrt(var[ready]))
+        increment = alpha * diff
+        var = np.where(started, (1 - alpha) * (var + diff * increment), var)
+        mean = np.where(started, mean + increment, np.where(valid, column, mean))
+        seen += valid
+    return scores
+
+
+def mad_scores(x: np.ndarray) -> np.ndarray:
+    with np.errstate(all="ignore"):
+        median = np.nanmedian(x, axis=1, keepdims=True)
+        deviation = np.abs(x - median)
+        # 1.4826 * MAD estimates the standard deviation of normal data; when more
+        # than half the points are equal MAD is 0 and the mean absolute deviation is used
+        spread = 1.4826 * np.nanmedian(deviation, axis=1, keepdims=True)
+        spread = np.where(spread > 0, spread, 1.2533 * np.nanmean(deviation, axis=1, keepdims=True))
+    scores = _ratio(x - median, np.broadcast_to(spread, x.shape))
+    scores[np.isnan(x)] = 0.0
+    return scores
+
+
+def changepoints(x: np.ndarray, min_segment: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Best single mean shift per series.
+
+    Returns the split column (first point after the shift), the effect size
+    (|mean after - mean before| / pooled std) and the two-sample t statistic.
+    """
+    valid = ~np.isnan(x)
+    filled = np.where(valid, x, 0.0)
+    n = valid.sum(axis=1, keepdims=True).astype(np.float64)
+    n_left = np.cumsum(valid, axis=1) - valid
+    s_left = np.cumsum(filled, axis=1) - filled
+    q_left = np.cumsum(filled * filled, axis=1) - filled * filled
+    n_right = n - n_left
+    s_right = filled.sum(axis=1, keepdims=True) - s_left
+    q_right = (filled * filled).sum(axis=1, keepdims=True) - q_left
+    with np.errstate(invalid="ignore", divide="ignore"):
+        m_left = s_left / n_left
+        m_right = s_right / n_right
+        within = (q_left - n_left * m_left**2) + (q_right - n_right * m_right**2)
+        pooled = np.sqrt(np.maximum(within, 0.0) / np.maximum(n - 2, 1))
+        effect = _ratio(m_right - m_left, pooled)
+        t_stat = effect * np.sqrt(n_left * n_right / n)
+    allowed = valid & (n_left >= min_segment) & (n_right >= min_segment)
+    t_stat = np.where(allowed, np.nan_to_num(t_stat, posinf=np.finfo(np.float64).max), -1.0)
+    split = np.argmax(t_stat, axis=1)
+    rows = np.arange(x.shape[0])
+    return split, effect[rows, split], t_stat[rows, split]
+
+
+def _runs(flagged: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(row, first column, last column) of every run of True in each row"""
+    padded = np.zeros((flagged.shape[0], flagged.shape[1] + 2), dtype=np.int8)
+    padded[:, 1:-1] = flagged
+    edges = np.diff(padded, axis=1)
+    start_rows, starts = np.nonzero(edges == 1)
+    _, ends = np.nonzero(edges == -1)
+    return start_rows, starts, ends - 1
+
+
+def detect(
+    times: np.ndarray,
+    values: np.ndarray,
+    detectors: Sequence[str] = DETECTORS,
+    window: int = 60,
+    threshold: float = 4.0,
+    limit: Optional[int] = None,
+) -> Tuple[List[Dict[str, Any]], int]:
+    """Anomalous windows of stacked series (see `stack_series`), strongest first.
+
+    Each window: row, detectors, start/end/peak timestamps, points, peak value,
+    score (std units) and the series median as baseline. Returns at most
+    `limit` windows and the total number found.
+    """
+    unknown = set(detectors) - set(DETECTORS)
+    if unknown:
+        raise ValueError(f"unknown detectors: {', '.join(sorted(unknown))}")
+    if not values.size:
+        return [], 0
+    min_periods = max(3, window // 2)
+    # too short to have a baseline
+    values = np.where(
+        (np.count_nonzero(~np.isnan(values), axis=1) >= 2 * min_periods)[:, None], values, np.nan
+    )
+    point_detectors = [d for d in _POINT_DETECTORS if d in detectors]
+    with np.errstate(all="ignore"):
+        baseline = np.nanmedian(values, axis=1)
+    # centered so running sums of squares keep their precision on large values
+    centered = values - baseline[:, None]
+
+    candidates: List[Tuple[float, int, Dict[str, Any]]] = []
+    if point_detectors:
+        scores = np.zeros_like(values)
+        which = np.zeros(values.shape, dtype=np.int64)
+        for bit, name in enumerate(point_detectors):
+            if name == "zscore":
+                s = zscore_scores(centered, window, min_periods)
+            elif name == "ewma":
+                s = ewma_scores(centered, window, min_periods)
+            else:
+                s = mad_scores(centered)
+            which |= (s >= threshold).astype(np.int64) << bit
+            np.maximum(scores, s, out=scores)
+        rows, starts, ends = _runs(scores >= threshold)
+        if len(rows):
+            # points between runs score below threshold, so each reduceat segment peaks inside its run
+            flat_starts = rows * scores.shape[1] + starts
+            peaks = np.maximum.reduceat(scores.ravel(), flat_starts)
+            for i in np.argsort(-peaks, kind="stable"):
+                candidates.append((float(peaks[i]), 0, (int(rows[i]), int(starts[i]), int(ends[i]))))
+
+    if "changepoint" in detectors:
+        split, effect, t_stat = changepoints(centered, max(3, min_periods))
+        # a shift must be large (effect) and not a fluke of a few points (t statistic)
+        for row in np.flatnonzero((effect >= 1.0) & (t_stat >= threshold)):
+            candidates.append((float(effect[row]), 1, (int(row), int(split[row]), None)))
+
+    candidates.sort(key=lambda c: c[0], reverse=True)
+    total = len(candidates)
+    windows: List[Dict[str, Any]] = []
+    for score, kind, (row, start, end) in candidates[:limit]:
+        if kind == 0:
+            peak = start + int(np.argmax(scores[row, start : end + 1]))
+            mask = int(np.bitwise_or.reduce(which[row, start : end + 1]))
+            windows.append({
+                "row": row,
+                "detectors": [name for bit, name in enumerate(point_detectors) if mask >> bit & 1],
+                "start": float(times[row, start]),
+                "end": float(times[row, end]),
+                "peak_ts": float(times[row, peak]),
+                "points": end - start + 1,
+                "peak_value": float(values[row, peak]),
+                "score": score,
+                "baseline": float(baseline[row]),
+            })
+        else:
+            after = values[row, start:]
+            windows.append({
+                "row": row,
+                "detectors": ["changepoint"],
+                "start": float(times[row, start]),
+                "end": float(np.nanmax(times[row])),
+                "peak_ts": float(times[row, start]),
+                "points": int(np.count_nonzero(~np.isnan(after))),
+                "peak_value": float(np.nanmean(after)),
+                "score": score,
+                "baseline": float(np.nanmean(values[row, :start])),
+            })
+    return windows, total
+
+
+def _collect_and_detect(
+    store: MetricStore,
+    selected: List[Series],
+    lo: float,
+    hi: float,
+    step: Optional[float],
+    detectors: List[str],
+    window: int,
+    threshold: float,
+    limit: int,
+) -> Tuple[List[Dict[str, Any]], int, int, int]:
+    """Slice (and downsample long) series, stack them and run `detect`"""
+    max_points = ANOMALY_CONFIG["MAX_POINTS_PER_SERIES"]
+    columns = []
+    for series in selected:
+        ts, values = store.slice(series, lo, hi)
+        bucket = step
+        if not bucket and len(ts) > max_points:
+            bucket = float(ts[-1] - ts[0]) / (max_points - 1) or None
+        if bucket:
+            ts, values = downsample(ts, values, float(bucket), "mean")
+        columns.append((ts, values))
+    times, matrix = stack_series(columns)
+    points = int(np.count_nonzero(~np.isnan(matrix)))
+    windows, total = detect(times, matrix, detectors, window, threshold, limit)
+    return windows, total, points, len(columns)
+
+
+def _round(value: Any) -> Any:
+    if isinstance(value, float):
+        return round(value, 6) if np.isfinite(value) else None
+    return value
+
+
+class DetectAnomalies(BaseTool):
+    """A tool for finding anomalous windows across many metric series"""
+
+    name: str = "detect_anomalies"
+    description: str = _DETECT_ANOMALIES_DESCRIPTION
+    parameters: dict = {
+        "type": "object",
+        "properties": {
+            "name": {
+                "type": "string",
+                "description": "Metric name glob, e.g. `proc.*` or `ebpf.*.p99` (default `*`)",
+            },
+            "labels": {
+                "type": "object",
+                "description": "Label filters; values may be globs",
+            },
+            "since": {"type": "number", "description": "Only the last N seconds"},
+            "start": {"type": "number", "description": "Range start, epoch seconds"},
+            "end": {"type": "number", "description": "Range end, epoch seconds"},
+            "detectors": {
+                "type": "array",
+                "items": {"type": "string", "enum": list(DETECTORS)},
+                "description": "Detectors to run (default: all)",
+            },
+            "window": {
+                "type": "integer",
+                "description": "Trailing points for zscore / EWMA span (default 60)",
+                "minimum": 3,
+            },
+            "threshold": {
+                "type": "number",
+                "description": "Score (in standard deviations) that flags a point (default 4)",
+            },
+            "step": {
+                "type": "number",
+                "description": "Average points into buckets of this many seconds first (default: only long series are downsampled)",
+            },
+            "limit": {
+                "type": "integer",
+                "description": "Maximum windows returned (default 20)",
+                "minimum": 1,
+            },
+        },
+    }
+
+    async def execute(
+        self,
+        name: str = "*",
+        labels: Optional[Dict[str, Any]] = None,
+        since: Optional[float] = None,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        detectors: Optional[List[str]] = None,
+        window: Optional[int] = None,
+        threshold: Optional[float] = None,
+        step: Optional[float] = None,
+        limit: int = 20,
+        **kwargs,
+    ) -> ToolResult:
+        detectors = list(detectors or DETECTORS)
+        unknown = set(detectors) - set(DETECTORS)
+        if unknown:
+            raise ToolError(f"Unknown detectors: {', '.join(sorted(unknown))}; use {', '.join(DETECTORS)}")
+        window = max(3, int(window or ANOMALY_CONFIG["WINDOW"]))
+        threshold = float(threshold or ANOMALY_CONFIG["THRESHOLD"])
+
+        store = get_metric_store()
+        selected = store.select(name or "*", labels)
+        truncated = len(selected) > ANOMALY_CONFIG["MAX_SERIES"]
+        selected = selected[: ANOMALY_CONFIG["MAX_SERIES"]]
+        if since is not None:
+            end = time.time() if end is None else end
+            start = end - float(since)
+        lo = -np.inf if start is None else float(start)
+        hi = np.inf if end is None else float(end)
+
+        windows, total, points, scanned = await asyncio.to_thread(
+            _collect_and_detect, store, selected, lo, hi, step, detectors, window, threshold, limit
+        )
+        result: Dict[str, Any] = {
+            "ok": True,
+            "series_scanned": scanned,
+            "points": points,
+            "anomalies": total,
+            "windows": [],
+        }
+        if truncated:
+            result["truncated_series"] = True
+        for item in windows:
+            series = selected[item.pop("row")]
+            result["windows"].append({
+                "name": series.name,
+                "labels": series.label_dict,
+                **{k: _round(v) for k, v in item.items()},
+                "direction": "up" if item["peak_value"] >= item["baseline"] else "down",
+            })
+        return ToolResult(output=json.dumps(result, ensure_ascii=False))
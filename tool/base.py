@@ -1,5 +1,6 @@
 import json
 from abc import ABC, abstractmethod
+from contextvars import ContextVar
 from typing import Any, Dict, Optional, Union
 
 from pydantic import BaseModel, Field
@@ -7,6 +8,11 @@ from pydantic import BaseModel, Field
 from SREgent.logger import logger
 
 
+# Agent/session a tool call runs for; set by the agent around each call so
+# stateful tools (e.g. Bash) keep separate state per agent
+tool_session_id: ContextVar[Optional[str]] = ContextVar("tool_session_id", default=None)
+
+
 class ToolResult(BaseModel):
     """Represents the result of a tool execution."""
 
@@ -60,12 +66,15 @@ class BaseTool(ABC, BaseModel):
         name (str): Tool name
         description (str): Tool description
         parameters (dict): Tool parameters schema
+        stateful (bool): Whether calls must be serialized
         _schemas (Dict[str, List[ToolSchema]]): Registered method schemas
     """
 
     name: str
     description: str
     parameters: Optional[dict] = None
+    # Stateful tools share state across calls and must not run concurrently
+    stateful: bool = False
     # _schemas: Dict[str, List[ToolSchema]] = {}
 
     class Config:
@@ -148,6 +157,8 @@ class BaseTool(ABC, BaseModel):
 class CLIResult(ToolResult):
     """A ToolResult that can be rendered as a CLI output."""
 
+    exit_code: Optional[int] = Field(default=None)
+
 
 class ToolFailure(ToolResult):
     """A ToolResult that represents a failure."""
@@ -1,9 +1,19 @@
 import asyncio
 import os
-from typing import Optional
+import re
+import signal
+import time
+import uuid
+import weakref
+from collections import OrderedDict
+from typing import List, Optional, Set, Tuple
 
+from SREgent.config import BASH_SESSION_CONFIG
 from SREgent.exceptions import ToolError
-from SREgent.tool.base import BaseTool, CLIResult
+from SREgent.logger import logger
+from SREgent.tool.base import BaseTool, CLIResult, tool_session_id
+from SREgent.tool.metric_store import get_metric_store
+from SREgent.tool.output_capture import OutputCapture
 
 
 _BASH_DESCRIPTION = """Execute a bash command in the terminal.
@@ -20,13 +30,21 @@ class _BashSession:
     _process: asyncio.subprocess.Process
 
     command: str = "/bin/bash"
-    _output_delay: float = 0.2  # seconds
+    _read_size: int = 64 * 1024  # bytes per stream read
     _timeout: float = 120.0  # seconds
     _sentinel: str = "<<exit>>"
 
     def __init__(self):
         self._started = False
         self._timed_out = False
+        # used by BashSessionManager: one command at a time, idle tracking
+        self.lock = asyncio.Lock()
+        self.last_used = time.monotonic()
+        self.retired = False
+        # sentinel line: `<<exit>>` followed by the exit code (stdout) or nothing (stderr)
+        self._sentinel_re = re.compile(re.escape(self._sentinel.encode()) + rb"(\d*)\n")
+        # longest possible sentinel line, used to rescan chunk boundaries
+        self._sentinel_window = len(self._sentinel) + 4
 
     async def start(self):
         if self._started:
@@ -44,13 +62,73 @@ class _BashSession:
 
         self._started = True
 
+    @property
+    def usable(self) -> bool:
+        """Started, still running and not stuck in a timed-out command"""
+        return (
+            self._started
+            and not self.retired
+            and not self._timed_out
+            and self._process.returncode is None
+        )
+
     def stop(self):
-        """Terminate the bash shell."""
+        """Terminate the bash shell and anything it started."""
         if not self._started:
             raise ToolError("Session has not started.")
         if self._process.returncode is not None:
             return
-        self._process.terminate()
+        try:
+            os.killpg(self._process.pid, signal.SIGTERM)
+        except (ProcessLookupError, PermissionError):
+            self._process.terminate()
+
+    async def close(self, grace: float = 2.0) -> None:
+        """stop() and wait for the shell, killing it if it lingers"""
+        self.retired = True
+        if not self._started:
+            return
+        self.stop()
+        try:
+            async with asyncio.timeout(grace):
+                await self._process.wait()
+        except asyncio.TimeoutError:
+            try:
+                os.killpg(self._process.pid, signal.SIGKILL)
+            except (ProcessLookupError, PermissionError):
+                pass
+            await self._process.wait()
+
+    async def _read_until_sentinel(
+        self, stream: asyncio.StreamReader, prefix: str
+    ) -> Optional[Tuple[OutputCapture, bytes]]:
+        """Read from `stream` until the sentinel line arrives.
+
+        Output goes into a bounded OutputCapture as it is read; only a small
+        overlap is held back for sentinels split across chunks, so large outputs
+        are processed in linear time and constant memory.
+
+        Returns:
+            (capture of the output before the sentinel, text after the sentinel),
+            or None if the stream hit EOF first.
+        """
+        capture = OutputCapture(prefix=prefix)
+        pending = bytearray()
+        try:
+            while True:
+                chunk = await stream.read(self._read_size)
+                if not chunk:
+                    return None
+                pending += chunk
+                match = self._sentinel_re.search(pending)
+                if match:
+                    capture.write(pending[: match.start()])
+                    return capture, match.group(1)
+                if len(pending) > self._sentinel_window:
+                    capture.write(pending[: -self._sentinel_window])
+                    del pending[: -self._sentinel_window]
+        finally:
+            capture.close()
 
     async def run(self, command: str):
         """Execute a command in the bash shell."""
@@ -71,46 +149,244 @@ class _BashSession:
         assert self._process.stdout
         assert self._process.stderr
 
-        # send command to the process
+        # send command to the process, followed by a sentinel on both streams.
+        # stdout carries the exit status of the command so it can be reported back.
         self._process.stdin.write(
-            command.encode() + f"; echo '{self._sentinel}'\n".encode()
+            command.encode()
+            + f"\necho '{self._sentinel}'$?; echo '{self._sentinel}' >&2\n".encode()
         )
         await self._process.stdin.drain()
 
-        # read output from the process, until the sentinel is found
+        # read both streams concurrently, until each sentinel is found
         try:
             async with asyncio.timeout(self._timeout):
-                while True:
-                    await asyncio.sleep(self._output_delay)
-                    # if we read directly from stdout/stderr, it will wait forever for
-                    # EOF. use the StreamReader buffer directly instead.
-                    output = (
-                        self._process.stdout._buffer.decode()
-                    )  # pyright: ignore[reportAttributeAccessIssue]
-                    if self._sentinel in output:
-                        # strip the sentinel and break
-                        output = output[: output.index(self._sentinel)]
-                        break
+                stdout, stderr = await asyncio.gather(
+                    self._read_until_sentinel(self._process.stdout, "bash-stdout"),
+                    self._read_until_sentinel(self._process.stderr, "bash-stderr"),
+                )
         except asyncio.TimeoutError:
             self._timed_out = True
             raise ToolError(
                 f"timed out: bash has not returned in {self._timeout} seconds and must be restarted",
             ) from None
 
+        if stdout is None or stderr is None:
+            returncode = await self._process.wait()
+            return CLIResult(
+                system="tool must be restarted",
+                error=f"bash has exited with returncode {returncode}",
+            )
+
+        output = stdout[0].text()
         if output.endswith("\n"):
             output = output[:-1]
 
-        error = (
-            self._process.stderr._buffer.decode()
-        )  # pyright: ignore[reportAttributeAccessIssue]
+        error = stderr[0].text()
         if error.endswith("\n"):
             error = error[:-1]
 
-        # clear the buffers so that the next output can be read correctly
-        self._process.stdout._buffer.clear()  # pyright: ignore[reportAttributeAccessIssue]
-        self._process.stderr._buffer.clear()  # pyright: ignore[reportAttributeAccessIssue]
+        exit_code = int(stdout[1]) if stdout[1] else None
+
+        return CLIResult(output=output, error=error, exit_code=exit_code)
+
+
+class BashSessionManager:
+    """Bash shells keyed by session id, usually one per agent.
+
+    Every session is its own bash process, so working directory, environment
+    and shell variables never leak between agents, and different sessions run
+    commands in parallel while commands within a session are serialized.
+    `spares` shells are started ahead of time so a new session starts
+    instantly. Sessions idle for more than `idle_timeout` seconds are closed;
+    past `max_sessions` the least recently used idle session makes room. A shell
+    that exited or timed out is replaced on its session's next command.
+    """
+
+    def __init__(
+        self,
+        spares: Optional[int] = None,
+        idle_timeout: Optional[float] = None,
+        max_sessions: Optional[int] = None,
+    ):
+        self.spares = BASH_SESSION_CONFIG["SPARES"] if spares is None else spares
+        self.idle_timeout = (
+            BASH_SESSION_CONFIG["IDLE_TIMEOUT"] if idle_timeout is None else idle_timeout
+        )
+        self.max_sessions = max_sessions or BASH_SESSION_CONFIG["MAX_SESSIONS"]
+
+        self._sessions: "OrderedDict[str, _BashSession]" = OrderedDict()
+        self._spares: List[_BashSession] = []
+        self._warming: Set[asyncio.Task] = set()
+        self._reaper: Optional[asyncio.Task] = None
+        self._create_lock = asyncio.Lock()
+        self._closed = False
+
+    @property
+    def session_ids(self) -> List[str]:
+        return list(self._sessions)
+
+    async def start(self) -> None:
+        """Start the spare shells up front instead of on first use"""
+        missing = self.spares - len(self._spares) - len(self._warming)
+        self._spares.extend(await asyncio.gather(*(self._spawn() for _ in range(missing))))
+        self._ensure_reaper()
 
-        return CLIResult(output=output, error=error)
+    async def _spawn(self) -> _BashSession:
+        session = _BashSession()
+        await session.start()
+        return session
+
+    def _refill(self) -> None:
+        """Warm up spares in the background"""
+        missing = self.spares - len(self._spares) - len(self._warming)
+        for _ in range(max(0, missing)):
+            task = asyncio.create_task(self._spawn())
+            self._warming.add(task)
+            task.add_done_callback(self._on_warmed)
+
+    def _on_warmed(self, task: asyncio.Task) -> None:
+        self._warming.discard(task)
+        if task.cancelled():
+            return
+        if task.exception() is not None:
+            logger.warning(f"Failed to start spare bash session: {task.exception()}")
+            return
+        if self._closed:
+            # close() is waiting for this task and closes the shell itself
+            return
+        session = task.result()
+        if len(self._spares) >= self.spares:
+            asyncio.create_task(session.close())
+        else:
+            self._spares.append(session)
+
+    def _take_spare(self) -> Optional[_BashSession]:
+        while self._spares:
+            session = self._spares.pop()
+            if session.usable:
+                return session
+        return None
+
+    async def _make_room(self) -> None:
+        while len(self._sessions) >= self.max_sessions:
+            idle = next(
+                (sid for sid, session in self._sessions.items() if not session.lock.locked()),
+                None,
+            )
+            if idle is None:
+                raise ToolError(
+                    f"All {self.max_sessions} bash sessions are busy; try again later."
+                )
+            logger.debug(f"Closing least recently used bash session {idle}")
+            await self._sessions.pop(idle).close()
+
+    async def get(self, session_id: str) -> _BashSession:
+        """The session's shell, started (from a spare if possible) on first use"""
+        if self._closed:
+            raise ToolError("Bash session manager is closed.")
+        session = self._sessions.get(session_id)
+        if session is None or not session.usable:
+            async with self._create_lock:
+                session = self._sessions.get(session_id)
+                if session is None or not session.usable:
+                    if session is not None:
+                        # exited or timed out: replace it
+                        del self._sessions[session_id]
+                        await session.close()
+                    await self._make_room()
+                    session = self._take_spare() or await self._spawn()
+                    self._sessions[session_id] = session
+            self._refill()
+            self._ensure_reaper()
+        self._sessions.move_to_end(session_id)
+        session.last_used = time.monotonic()
+        return session
+
+    async def run(self, session_id: str, command: str) -> CLIResult:
+        """Run a command in the session's shell, after any command already running there"""
+        while True:
+            session = await self.get(session_id)
+            async with session.lock:
+                if session.retired:
+                    # closed while we waited for it
+                    continue
+                try:
+                    return await session.run(command)
+                finally:
+                    session.last_used = time.monotonic()
+
+    async def close_session(self, session_id: str) -> None:
+        session = self._sessions.pop(session_id, None)
+        if session is not None:
+            await session.close()
+
+    async def reap_idle(self) -> int:
+        """Close sessions idle for longer than idle_timeout; returns how many"""
+        now = time.monotonic()
+        expired = [
+            sid
+            for sid, session in self._sessions.items()
+            if not session.lock.locked() and now - session.last_used > self.idle_timeout
+        ]
+        for sid in expired:
+            logger.debug(f"Closing idle bash session {sid}")
+            await self._sessions.pop(sid).close()
+        return len(expired)
+
+    def _ensure_reaper(self) -> None:
+        if self.idle_timeout > 0 and (self._reaper is None or self._reaper.done()):
+            self._reaper = asyncio.create_task(self._reap_loop())
+
+    async def _reap_loop(self) -> None:
+        interval = min(60.0, max(1.0, self.idle_timeout / 2))
+        while not self._closed:
+            await asyncio.sleep(interval)
+            try:
+                await self.reap_idle()
+            except Exception as e:
+                logger.warning(f"Failed to reap idle bash sessions: {e}")
+
+    async def close(self) -> None:
+        self._closed = True
+        if self._reaper is not None:
+            self._reaper.cancel()
+        # spares still starting are waited for, not cancelled: a subprocess start
+        # cancelled while its pipes are being connected can hang the event loop
+        warming = list(self._warming)
+        sessions = [*self._sessions.values(), *self._spares]
+        self._sessions.clear()
+        self._spares.clear()
+        started = await asyncio.gather(*warming, return_exceptions=True)
+        sessions += [session for session in started if isinstance(session, _BashSession)]
+        await asyncio.gather(*(session.close() for session in sessions), return_exceptions=True)
+
+
+_managers: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, BashSessionManager]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_bash_manager() -> BashSessionManager:
+    loop = asyncio.get_running_loop()
+    manager = _managers.get(loop)
+    if manager is None or manager._closed:
+        manager = _managers[loop] = BashSessionManager()
+    return manager
+
+
+def _record_command(command: str, elapsed: float, result: CLIResult) -> None:
+    """Command timings go to the metric store, labelled by program name"""
+    words = command.split()
+    if not words or result.exit_code is None:
+        return
+    labels = {"program": os.path.basename(words[0])[:64]}
+    get_metric_store().append_many(
+        [
+            ("bash.duration_s", labels, elapsed),
+            ("bash.exit_code", labels, result.exit_code),
+            ("bash.output_chars", labels, len(result.output or "") + len(result.error or "")),
+        ]
+    )
 
 
 class Bash(BaseTool):
@@ -128,29 +404,42 @@ class Bash(BaseTool):
         },
         "required": ["command"],
     }
+    stateful: bool = True
 
-    _session: Optional[_BashSession] = None
+    # session used when no agent session is set, e.g. when the tool is called directly
+    _default_session_id: Optional[str] = None
+
+    def _session_id(self) -> str:
+        session_id = tool_session_id.get()
+        if session_id is None:
+            if self._default_session_id is None:
+                self._default_session_id = f"bash-{uuid.uuid4().hex[:12]}"
+            session_id = self._default_session_id
+        return session_id
 
     async def execute(
         self, command: str | None = None, restart: bool = False, **kwargs
     ) -> CLIResult:
+        manager = get_bash_manager()
+        session_id = self._session_id()
         if restart:
-            if self._session:
-                self._session.stop()
-            self._session = _BashSession()
-            await self._session.start()
+            await manager.close_session(session_id)
+            await manager.get(session_id)
 
             return CLIResult(system="tool has been restarted.")
 
-        if self._session is None:
-            self._session = _BashSession()
-            await self._session.start()
-
         if command is not None:
-            return await self._session.run(command)
+            started = time.monotonic()
+            result = await manager.run(session_id, command)
+            _record_command(command, time.monotonic() - started, result)
+            return result
 
         raise ToolError("no command provided.")
 
+    async def close_session(self) -> None:
+        """Close the current session's shell; see `ToolCallAgent.close`"""
+        await get_bash_manager().close_session(self._session_id())
+
 
 if __name__ == "__main__":
     bash = Bash()
@@ -0,0 +1,149 @@
+import fnmatch
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from SREgent.config import TOOL_FS_CONFIG
+
+
+class DirEntryInfo:
+    """What a listing needs from one directory entry, filled from os.DirEntry.
+
+    `is_dir` follows symlinks (a link to a directory lists as a directory), but
+    walkers never descend through links. `mtime` of directories is looked up
+    only when requested.
+    """
+
+    __slots__ = ("name", "path", "is_dir", "is_link", "size", "mtime", "error")
+
+    def __init__(self, entry: os.DirEntry):
+        self.name = entry.name
+        self.path = entry.path
+        self.size: Optional[int] = None
+        self.mtime: Optional[float] = None
+        self.error: Optional[str] = None
+        try:
+            self.is_link = entry.is_symlink()
+            self.is_dir = entry.is_dir()
+            if not self.is_dir:
+                # one stat per file; DirEntry caches it
+                st = entry.stat()
+                self.size = st.st_size
+                self.mtime = st.st_mtime
+        except OSError as e:
+            self.is_dir = False
+            self.error = str(e)
+
+    def get_mtime(self) -> Optional[float]:
+        if self.mtime is None and self.error is None:
+            try:
+                self.mtime = os.stat(self.path).st_mtime
+            except OSError as e:
+                self.error = str(e)
+        return self.mtime
+
+
+_cache_lock = threading.Lock()
+_scan_cache: "OrderedDict[str, Tuple[float, List[DirEntryInfo]]]" = OrderedDict()
+
+
+def scan_dir(path: str, cache_ttl: Optional[float] = None) -> List[DirEntryInfo]:
+    """List one directory with os.scandir, reusing a recent scan within `cache_ttl`"""
+    ttl = TOOL_FS_CONFIG["STAT_CACHE_TTL"] if cache_ttl is None else cache_ttl
+    now = time.monotonic()
+    if ttl > 0:
+        with _cache_lock:
+            cached = _scan_cache.get(path)
+            if cached is not None and cached[0] > now:
+                _scan_cache.move_to_end(path)
+                return cached[1]
+
+    with os.scandir(path) as it:
+        entries = [DirEntryInfo(entry) for entry in it]
+
+    if ttl > 0:
+        with _cache_lock:
+            _scan_cache[path] = (now + ttl, entries)
+            _scan_cache.move_to_end(path)
+            while len(_scan_cache) > TOOL_FS_CONFIG["STAT_CACHE_MAX_DIRS"]:
+                _scan_cache.popitem(last=False)
+    return entries
+
+
+def clear_scan_cache() -> None:
+    with _cache_lock:
+        _scan_cache.clear()
+
+
+def matches_any(name: str, patterns: Sequence[str]) -> bool:
+    return any(fnmatch.fnmatch(name, pattern) for pattern in patterns)
+
+
+def walk(
+    root: str,
+    max_depth: Optional[int] = None,
+    include_hidden: bool = False,
+    exclude: Sequence[str] = (),
+    cache_ttl: Optional[float] = None,
+    errors: Optional[List[Dict[str, str]]] = None,
+) -> Iterator[Tuple[DirEntryInfo, int]]:
+    """Breadth-first (entry, depth) pairs below `root`; depth 1 = direct children.
+
+    Hidden and excluded entries are neither yielded nor descended into; symlinked
+    directories are yielded but not followed. Unreadable directories are
+    reported in `errors`.
+    """
+    queue = deque([(root, 1)])
+    while queue:
+        directory, depth = queue.popleft()
+        try:
+            entries = scan_dir(directory, cache_ttl)
+        except OSError as e:
+            if errors is not None:
+                errors.append({"path": directory, "error": str(e)})
+            continue
+        for entry in entries:
+            if not include_hidden and entry.name.startswith("."):
+                continue
+            if exclude and matches_any(entry.name, exclude):
+                continue
+            yield entry, depth
+            if entry.is_dir and not entry.is_link and (max_depth is None or depth < max_depth):
+                queue.append((entry.path, depth + 1))
+
+
+def disk_usage(
+    path: str, cache_ttl: Optional[float] = None, memo: Optional[Dict[str, Tuple[int, int]]] = None
+) -> Tuple[int, int]:
+    """(total bytes, file count) of every file below `path`, like `du -b`.
+
+    Symlinks are not followed; `memo` lets one listing reuse subtree totals.
+    """
+    memo = {} if memo is None else memo
+    if path in memo:
+        return memo[path]
+    total_size, total_files = 0, 0
+    stack = [path]
+    while stack:
+        directory = stack.pop()
+        if directory in memo and directory != path:
+            size, files = memo[directory]
+            total_size += size
+            total_files += files
+            continue
+        try:
+            entries = scan_dir(directory, cache_ttl)
+        except OSError:
+            continue
+        for entry in entries:
+            if entry.is_link:
+                continue
+            if entry.is_dir:
+                stack.append(entry.path)
+            elif entry.size is not None:
+                total_size += entry.size
+                total_files += 1
+    memo[path] = (total_size, total_files)
+    return memo[path]
@@ -0,0 +1,561 @@
+"""eBPF tracing with bpftrace / BCC tools, summarized from the streamed output."""
+
+import asyncio
+import gzip
+import json
+import math
+import os
+import re
+import shlex
+import signal
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from SREgent.config import EBPF_CONFIG, METRIC_STORE_CONFIG
+from SREgent.exceptions import ToolError
+from SREgent.tool.base import BaseTool, ToolResult
+from SREgent.tool.metric_store import get_metric_store
+
+
+_EBPF_TRACE_DESCRIPTION = """Run an eBPF probe for a bounded time and get a compact summary of its output.
+* `script` is a bpftrace program (run as `bpftrace -e`); `command` runs a BCC tool instead, e.g. `biolatency 1 5`
+* The probe is stopped after `duration` seconds with SIGINT, so bpftrace prints its maps as usual
+* Output is parsed while it streams: maps come back as top keys, hist()/lhist() and BCC histograms as buckets with percentile estimates, stats() as numbers, printf lines as counts and samples
+* `replay` parses a recorded output file instead of running anything; `record` saves the raw output for later replay
+* Results are also recorded in the metric store under `metric_prefix` (map keys, histogram percentiles, stats), see `metrics_query`
+"""
+
+_SUFFIXES = {"": 1, "K": 1024, "M": 1024**2, "G": 1024**3, "T": 1024**4, "P": 1024**5}
+
+_MAP_RE = re.compile(r"^@(?P<name>\w*)(?:\[(?P<key>.*)\])?:\s*(?P<value>.*)$")
+_MAP_OPEN_RE = re.compile(r"^@(?P<name>\w*)\[$")
+_KEY_CLOSE_RE = re.compile(r"^,?\s*(?P<extra>.*?)\]:\s*(?P<value>.*)$")
+_BUCKET_RE = re.compile(
+    r"^[\[(](?P<lo>[^,\])]+)(?:,\s*(?P<hi>[^)\]]+))?[)\]]\s+(?P<count>\d+)(?:\s*\||\s*$)"
+)
+_BCC_HEADER_RE = re.compile(r"^\s*(?P<unit>[\w/-]+)\s+:\s+count\s+distribution\s*$")
+_BCC_BUCKET_RE = re.compile(r"^\s*(?P<lo>\d+)\s*->\s*(?P<hi>\d+)\s*:\s*(?P<count>\d+)\s*(?:\||$)")
+_BCC_LABEL_RE = re.compile(r"^\s*(?P<label>\w[\w ]*?)\s*=\s*(?P<value>\S.*?)\s*$")
+_STATS_RE = re.compile(r"^count (?P<count>-?\d+), average (?P<average>-?\d+), total (?P<total>-?\d+)$")
+_INT_RE = re.compile(r"^-?\d+$")
+_NAME_RE = re.compile(r"^@?(?P<base>\w*)(?:\[(?P<key>.*)\])?$")
+_ATTACH_RE = re.compile(r"^Attaching (\d+) probes?")
+_LOST_RE = re.compile(r"^Lost (\d+) events")
+
+
+def _bucket_bound(text: str) -> float:
+    text = text.strip()
+    if text == "...":
+        return math.inf
+    number = re.match(r"^(-?\d+)\s*([KMGTP]?)$", text)
+    if number is None:
+        raise ValueError(text)
+    return int(number.group(1)) * _SUFFIXES[number.group(2)]
+
+
+def _number(value: float) -> Any:
+    if math.isinf(value):
+        return None
+    return int(value) if float(value).is_integer() else round(value, 3)
+
+
+class Histogram:
+    """Buckets [lo, hi) with counts, as printed by hist()/lhist() or a BCC tool"""
+
+    def __init__(self):
+        self.buckets: List[Tuple[float, float, int]] = []
+
+    def add(self, lo: float, hi: float, count: int) -> None:
+        self.buckets.append((lo, hi, count))
+
+    @property
+    def count(self) -> int:
+        return sum(count for _, _, count in self.buckets)
+
+    @property
+    def kind(self) -> str:
+        sized = [(lo, hi) for lo, hi, _ in self.buckets if 0 < lo and not math.isinf(hi)]
+        log2 = all(hi == 2 * lo and int(lo) & (int(lo) - 1) == 0 for lo, hi in sized)
+        return "log2" if sized and log2 else "linear"
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Estimate, interpolating linearly inside the bucket"""
+        total = self.count
+        if not total:
+            return None
+        rank = q * total
+        seen = 0
+        for lo, hi, count in self.buckets:
+            if count and seen + count >= rank:
+                if math.isinf(hi) or math.isinf(lo):
+                    return lo if not math.isinf(lo) else hi
+                return lo + (hi - lo) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1][0]
+
+    def compact(self, max_buckets: int) -> List[List[Any]]:
+        """Non-empty buckets, neighbours merged until at most `max_buckets` are left"""
+        buckets = [list(b) for b in self.buckets if b[2]]
+        while len(buckets) > max_buckets:
+            merged = []
+            for i in range(0, len(buckets), 2):
+                pair = buckets[i : i + 2]
+                merged.append([pair[0][0], pair[-1][1], sum(b[2] for b in pair)])
+            buckets = merged
+        return [[_number(lo), _number(hi), count] for lo, hi, count in buckets]
+
+    def summary(self, max_buckets: int = 32) -> Dict[str, Any]:
+        nonzero = [b for b in self.buckets if b[2]]
+        return {
+            "kind": self.kind,
+            "count": self.count,
+            "p50": _number(self.percentile(0.5)) if nonzero else None,
+            "p90": _number(self.percentile(0.9)) if nonzero else None,
+            "p99": _number(self.percentile(0.99)) if nonzero else None,
+            "max_bucket": [_number(nonzero[-1][0]), _number(nonzero[-1][1])] if nonzero else None,
+            "buckets": self.compact(max_buckets),
+        }
+
+
+class BpftraceOutputParser:
+    """Incremental parser for bpftrace and BCC tool output.
+
+    Feed lines as they arrive; memory stays bounded by `max_keys` per map and
+    for distinct event lines. A map or histogram printed more than once (e.g.
+    by an interval probe) keeps the latest printed values. Multi-line keys
+    (kstack/ustack) are folded into one `frame;frame;...` string, innermost first
+    as printed.
+    """
+
+    def __init__(self, max_keys: Optional[int] = None, event_samples: int = 20):
+        self.max_keys = max_keys or EBPF_CONFIG["MAX_KEYS"]
+        self.event_samples = event_samples
+
+        self.maps: Dict[str, Dict[str, Any]] = {}
+        self.dropped_keys: Counter = Counter()
+        self.histograms: Dict[str, Histogram] = {}
+        self.stats: Dict[str, Dict[str, int]] = {}
+        self.events = 0
+        self.event_lines: Counter = Counter()
+        self.event_first: List[str] = []
+        self.probes: Optional[int] = None
+        self.lost_events = 0
+        self.lines = 0
+
+        self._hist: Optional[Histogram] = None
+        self._hist_name: Optional[str] = None
+        self._stack: Optional[Tuple[str, List[str]]] = None
+        self._bcc_label: Optional[str] = None
+
+    # -------- feeding --------
+
+    def feed(self, line: str) -> None:
+        self.lines += 1
+        line = line.rstrip("\r\n")
+
+        if self._stack is not None:
+            self._feed_stack_line(line)
+            return
+        if self._hist is not None:
+            if self._feed_bucket(line):
+                return
+            self._end_hist()
+
+        stripped = line.strip()
+        if not stripped:
+            return
+        if stripped[0] == "@":
+            self._feed_map_line(stripped)
+            return
+        header = _BCC_HEADER_RE.match(line)
+        if header:
+            name = header.group("unit")
+            if self._bcc_label:
+                name = f"{name}[{self._bcc_label}]"
+            self._start_hist(name)
+            return
+        attach = _ATTACH_RE.match(stripped)
+        if attach:
+            self.probes = int(attach.group(1))
+            return
+        lost = _LOST_RE.match(stripped)
+        if lost:
+            self.lost_events += int(lost.group(1))
+            return
+        label = _BCC_LABEL_RE.match(line)
+        if label:
+            self._bcc_label = f"{label.group('label')}={label.group('value')}"
+        self._feed_event(stripped)
+
+    def feed_lines(self, lines) -> "BpftraceOutputParser":
+        for line in lines:
+            self.feed(line)
+        return self
+
+    def close(self) -> None:
+        if self._hist is not None:
+            self._end_hist()
+        if self._stack is not None:
+            # output ended inside a stack key; keep what we have without a value
+            self._stack = None
+
+    def _feed_map_line(self, line: str) -> None:
+        opened = _MAP_OPEN_RE.match(line)
+        if opened:
+            self._stack = ("@" + opened.group("name"), [])
+            return
+        match = _MAP_RE.match(line)
+        if match is None:
+            self._feed_event(line)
+            return
+        name = "@" + match.group("name")
+        self._map_value(name, match.group("key"), match.group("value").strip())
+
+    def _feed_stack_line(self, line: str) -> None:
+        name, frames = self._stack
+        stripped = line.strip()
+        if stripped == ",":
+            frames.append("--")
+            return
+        if stripped.startswith(("]", ",")):
+            close = _KEY_CLOSE_RE.match(stripped)
+            if close:
+                self._stack = None
+                key = ";".join(frames)
+                if close.group("extra"):
+                    key = f"{key}, {close.group('extra')}" if key else close.group("extra")
+                self._map_value(name, key, close.group("value").strip())
+                return
+        if stripped:
+            frames.append(stripped)
+
+    def _map_value(self, name: str, key: Optional[str], value: str) -> None:
+        full = name if key is None else f"{name}[{key}]"
+        if not value:
+            # hist()/lhist() buckets follow
+            self._start_hist(full)
+            return
+        stats = _STATS_RE.match(value)
+        if stats:
+            self.stats[full] = {k: int(v) for k, v in stats.groupdict().items()}
+            return
+        entries = self.maps.setdefault(name, {})
+        map_key = "" if key is None else key
+        if map_key not in entries and len(entries) >= self.max_keys:
+            self.dropped_keys[name] += 1
+            return
+        entries[map_key] = int(value) if _INT_RE.match(value) else value
+
+    def _start_hist(self, name: str) -> None:
+        self._hist = Histogram()
+        self._hist_name = name
+
+    def _end_hist(self) -> None:
+        if self._hist.buckets:
+            self.histograms[self._hist_name] = self._hist
+        self._hist = None
+        self._hist_name = None
+
+    def _feed_bucket(self, line: str) -> bool:
+        stripped = line.strip()
+        bucket = _BUCKET_RE.match(stripped)
+        if bucket:
+            try:
+                lo = bucket.group("lo").strip()
+                low = -math.inf if lo == "..." else _bucket_bound(lo)
+                hi = bucket.group("hi")
+                high = _bucket_bound(hi) if hi is not None else low + 1
+            except ValueError:
+                return False
+            self._hist.add(low, high, int(bucket.group("count")))
+            return True
+        bcc = _BCC_BUCKET_RE.match(line)
+        if bcc:
+            self._hist.add(int(bcc.group("lo")), int(bcc.group("hi")) + 1, int(bcc.group("count")))
+            return True
+        return False
+
+    def _feed_event(self, line: str) -> None:
+        self.events += 1
+        if len(self.event_first) < self.event_samples:
+            self.event_first.append(line)
+        if line in self.event_lines or len(self.event_lines) < self.max_keys:
+            self.event_lines[line] += 1
+
+    # -------- results --------
+
+    def summary(self, top_n: int = 10, max_buckets: int = 32) -> Dict[str, Any]:
+        self.close()
+        maps = {}
+        for name, entries in self.maps.items():
+            numeric = [(k, v) for k, v in entries.items() if isinstance(v, int)]
+            top = sorted(numeric, key=lambda kv: kv[1], reverse=True)[:top_n]
+            info: Dict[str, Any] = {"keys": len(entries)}
+            if numeric:
+                info["sum"] = sum(v for _, v in numeric)
+            info["top"] = [[k, v] for k, v in top] or [
+                [k, v] for k, v in list(entries.items())[:top_n]
+            ]
+            if self.dropped_keys[name]:
+                info["dropped_keys"] = self.dropped_keys[name]
+            maps[name] = info
+
+        repeated = [[line, n] for line, n in self.event_lines.most_common(top_n) if n > 1]
+        return {
+            "probes": self.probes,
+            "lost_events": self.lost_events,
+            "lines": self.lines,
+            "maps": maps,
+            "histograms": {
+                name: hist.summary(max_buckets) for name, hist in self.histograms.items()
+            },
+            "stats": self.stats,
+            "events": {
+                "count": self.events,
+                "first": self.event_first,
+                "most_common": repeated,
+            },
+        }
+
+
+# -------- running probes --------
+
+
+async def _read_lines(stream: asyncio.StreamReader, on_line: Callable[[str], None]) -> None:
+    while True:
+        try:
+            line = await stream.readline()
+        except ValueError:
+            # line longer than the stream limit; its bytes were dropped
+            continue
+        if not line:
+            return
+        on_line(line.decode("utf-8", errors="replace"))
+
+
+def _signal_group(proc: asyncio.subprocess.Process, sig: int) -> None:
+    try:
+        os.killpg(proc.pid, sig)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+async def stream_probe(
+    argv: List[str],
+    duration: float,
+    on_line: Callable[[str], None],
+    input_text: Optional[str] = None,
+    grace: Optional[float] = None,
+) -> Dict[str, Any]:
+    """Run `argv`, passing stdout lines to `on_line`, and stop it after `duration`.
+
+    The process group gets SIGINT at the deadline (bpftrace then prints its
+    maps and exits) and SIGKILL if it is still running `grace` seconds later.
+    """
+    # imported here: tool.tool pulls in the whole tool registry
+    from SREgent.tool.tool import _process_slot
+
+    grace = EBPF_CONFIG["GRACE"] if grace is None else grace
+    stderr_lines: List[str] = []
+
+    def on_stderr(line: str) -> None:
+        if len(stderr_lines) < 20:
+            stderr_lines.append(line.rstrip())
+
+    async with _process_slot():
+        started = time.monotonic()
+        proc = await asyncio.create_subprocess_exec(
+            *argv,
+            stdin=asyncio.subprocess.PIPE if input_text is not None else asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            start_new_session=True,
+            limit=1024 * 1024,
+        )
+        if input_text is not None:
+            proc.stdin.write(input_text.encode())
+            await proc.stdin.drain()
+            proc.stdin.close()
+
+        readers = asyncio.gather(
+            _read_lines(proc.stdout, on_line), _read_lines(proc.stderr, on_stderr)
+        )
+        interrupted = killed = False
+        try:
+            await asyncio.wait_for(asyncio.shield(readers), duration)
+        except asyncio.TimeoutError:
+            interrupted = True
+            _signal_group(proc, signal.SIGINT)
+            try:
+                await asyncio.wait_for(asyncio.shield(readers), grace)
+            except asyncio.TimeoutError:
+                killed = True
+                _signal_group(proc, signal.SIGKILL)
+                await readers
+        except asyncio.CancelledError:
+            _signal_group(proc, signal.SIGKILL)
+            readers.cancel()
+            raise
+        returncode = await proc.wait()
+
+    return {
+        "returncode": returncode,
+        "elapsed_s": round(time.monotonic() - started, 3),
+        "interrupted": interrupted,
+        "killed": killed,
+        "stderr": stderr_lines,
+    }
+
+
+def _replay(path: str, parser: BpftraceOutputParser) -> None:
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            parser.feed(line)
+
+
+def _series_name(prefix: str, printed: str) -> Tuple[str, Optional[Dict[str, str]]]:
+    """`@lat[sda]` -> (`<prefix>.lat`, {"key": "sda"})"""
+    match = _NAME_RE.match(printed)
+    if match is None:
+        return f"{prefix}.{printed}", None
+    name = f"{prefix}.{match.group('base') or 'map'}"
+    return name, {"key": match.group("key")} if match.group("key") else None
+
+
+def record_metrics(parser: BpftraceOutputParser, prefix: str = "ebpf", ts: Optional[float] = None) -> int:
+    """Store the parsed results as series in the metric store; returns the points stored"""
+    keys_per_map = METRIC_STORE_CONFIG["EBPF_KEYS_PER_MAP"]
+    points: List[Tuple[str, Optional[Dict[str, str]], float]] = []
+    for printed, entries in parser.maps.items():
+        numeric = [(k, v) for k, v in entries.items() if isinstance(v, int)]
+        name, _ = _series_name(prefix, printed)
+        for key, value in sorted(numeric, key=lambda kv: kv[1], reverse=True)[:keys_per_map]:
+            points.append((name, {"key": key} if key else None, value))
+    for printed, hist in parser.histograms.items():
+        name, labels = _series_name(prefix, printed)
+        points.append((f"{name}.count", labels, hist.count))
+        for q in (0.5, 0.9, 0.99):
+            value = hist.percentile(q)
+            if value is not None and not math.isinf(value):
+                points.append((f"{name}.p{int(q * 100)}", labels, value))
+    for printed, stats in parser.stats.items():
+        name, labels = _series_name(prefix, printed)
+        points.extend((f"{name}.{field}", labels, value) for field, value in stats.items())
+    points.append((f"{prefix}.events", None, parser.events))
+    points.append((f"{prefix}.lost_events", None, parser.lost_events))
+    return get_metric_store().append_many(points, ts)
+
+
+class EbpfTrace(BaseTool):
+    """A tool for running bpftrace / BCC probes and summarizing their output"""
+
+    name: str = "ebpf_trace"
+    description: str = _EBPF_TRACE_DESCRIPTION
+    parameters: dict = {
+        "type": "object",
+        "properties": {
+            "script": {
+                "type": "string",
+                "description": "bpftrace program, e.g. `tracepoint:syscalls:sys_enter_read { @[comm] = count(); }`",
+            },
+            "command": {
+                "type": "string",
+                "description": "BCC tool command line to run instead of a bpftrace script, e.g. `biolatency -D 1 5`",
+            },
+            "duration": {
+                "type": "number",
+                "description": "Seconds to trace before stopping the probe (default 10)",
+                "minimum": 0.1,
+            },
+            "replay": {
+                "type": "string",
+                "description": "Path of recorded bpftrace/BCC output (.gz allowed) to parse instead of running a probe",
+            },
+            "record": {
+                "type": "string",
+                "description": "Optional path to save the raw output to",
+            },
+            "top_n": {
+                "type": "integer",
+                "description": "Keys per map and repeated event lines to return (default 10)",
+                "minimum": 1,
+            },
+            "use_sudo": {
+                "type": "boolean",
+                "description": "Run the probe through sudo (password from SUDO_PASSWORD)",
+            },
+            "metric_prefix": {
+                "type": "string",
+                "description": "Metric name prefix the results are recorded under (default `ebpf`), e.g. `biolatency`",
+            },
+        },
+    }
+
+    async def execute(
+        self,
+        script: Optional[str] = None,
+        command: Optional[str] = None,
+        duration: float = 10.0,
+        replay: Optional[str] = None,
+        record: Optional[str] = None,
+        top_n: int = 10,
+        use_sudo: bool = False,
+        metric_prefix: str = "ebpf",
+        **kwargs,
+    ) -> ToolResult:
+        parser = BpftraceOutputParser()
+        if replay:
+            try:
+                await asyncio.to_thread(_replay, replay, parser)
+            except OSError as e:
+                raise ToolError(f"Cannot read recorded output {replay}: {e}") from None
+            result: Dict[str, Any] = {"ok": True, "source": "replay", "path": replay}
+            result.update(parser.summary(top_n))
+            result["metrics_recorded"] = record_metrics(parser, metric_prefix or "ebpf")
+            return ToolResult(output=json.dumps(result, ensure_ascii=False))
+
+        if bool(script) == bool(command):
+            raise ToolError("Provide exactly one of `script`, `command` or `replay`.")
+        argv = [EBPF_CONFIG["BPFTRACE"], "-e", script] if script else shlex.split(command)
+        input_text = None
+        if use_sudo:
+            password = os.getenv("SUDO_PASSWORD")
+            if not password:
+                raise ToolError("SUDO_PASSWORD not set in environment")
+            argv = ["sudo", "-S", "-p", "", *argv]
+            input_text = password + "\n"
+        duration = min(max(0.1, float(duration)), EBPF_CONFIG["MAX_DURATION"])
+
+        recording = None
+        if record:
+            try:
+                recording = await asyncio.to_thread(open, record, "w", encoding="utf-8")
+            except OSError as e:
+                raise ToolError(f"Cannot write recording {record}: {e}") from None
+
+        def on_line(line: str) -> None:
+            if recording is not None:
+                recording.write(line)
+            parser.feed(line)
+
+        try:
+            run = await stream_probe(argv, duration, on_line, input_text=input_text)
+        except FileNotFoundError:
+            raise ToolError(f"{argv[0]} not found; is it installed and on PATH?") from None
+        finally:
+            if recording is not None:
+                recording.close()
+
+        # bpftrace exits with 0 (or -SIGINT) after an interrupt; anything else failed
+        ok = run["returncode"] in (0, -signal.SIGINT) or (
+            run["interrupted"] and not run["killed"] and parser.lines > 0
+        )
+        result = {"ok": ok, "source": "bpftrace" if script else "command", **run}
+        if record:
+            result["record"] = record
+        result.update(parser.summary(top_n))
+        if ok:
+            result["metrics_recorded"] = record_metrics(parser, metric_prefix or "ebpf")
+        return ToolResult(output=json.dumps(result, ensure_ascii=False))
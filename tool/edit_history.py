@@ -0,0 +1,319 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict, deque
+from pathlib import Path
+from typing import Deque, Dict, List, NamedTuple, Optional, Tuple
+
+from SREgent.config import EDITOR_HISTORY_CONFIG
+from SREgent.logger import logger
+
+
+_BLOCK = 4096
+
+
+_DIGEST_CHUNK = 1024 * 1024
+
+
+def _digest(text: str) -> str:
+    # hashed in slices so a large file is never encoded in one piece
+    h = hashlib.blake2b(digest_size=16)
+    for pos in range(0, len(text), _DIGEST_CHUNK):
+        h.update(text[pos : pos + _DIGEST_CHUNK].encode("utf-8", errors="surrogatepass"))
+    return h.hexdigest()
+
+
+def _common_prefix(a: str, b: str) -> int:
+    n = min(len(a), len(b))
+    pos = 0
+    while pos < n:
+        end = min(n, pos + _BLOCK)
+        if a[pos:end] != b[pos:end]:
+            while a[pos] == b[pos]:
+                pos += 1
+            return pos
+        pos = end
+    return n
+
+
+def _common_suffix(a: str, b: str, limit: int) -> int:
+    """Length of the common suffix, not reaching into the first `limit` chars"""
+    n = min(len(a), len(b)) - limit
+    length = 0
+    while length < n:
+        step = min(_BLOCK, n - length)
+        if a[len(a) - length - step : len(a) - length] != b[len(b) - length - step : len(b) - length]:
+            while a[len(a) - length - 1] == b[len(b) - length - 1]:
+                length += 1
+            return length
+        length += step
+    return n
+
+
+class ReverseDiff(NamedTuple):
+    """Turns the content after an edit back into the content before it.
+
+    Only the changed span is stored: the newer content's span
+    [start, start + new_length) is replaced by `old_text`. `new_digest`
+    identifies the newer content, so an undo on a file changed elsewhere is refused.
+    """
+
+    start: int
+    new_length: int
+    old_text: str
+    new_digest: str
+
+    @classmethod
+    def between(cls, before: str, after: str) -> "ReverseDiff":
+        prefix = _common_prefix(before, after)
+        suffix = _common_suffix(before, after, prefix)
+        return cls(
+            start=prefix,
+            new_length=len(after) - prefix - suffix,
+            old_text=before[prefix : len(before) - suffix],
+            new_digest=_digest(after),
+        )
+
+    @property
+    def cost(self) -> int:
+        """Approximate bytes held by this diff"""
+        return len(self.old_text.encode("utf-8", errors="surrogatepass")) + 96
+
+    def apply(self, current: str) -> str:
+        if _digest(current) != self.new_digest:
+            raise ValueError("the file was changed outside the editor since this edit")
+        return current[: self.start] + self.old_text + current[self.start + self.new_length :]
+
+
+class EditHistory:
+    """Per-file undo stacks of reverse diffs with byte budgets.
+
+    Each file keeps at most `max_steps_per_file` diffs and `max_bytes_per_file`
+    bytes (oldest dropped first). Past `max_bytes` in total, the least recently
+    edited file gives up its oldest diffs; with `persist_dir` set it is instead
+    dropped from memory only and reloaded from disk when needed.
+
+    With `persist_dir`, each file's changes are appended to a journal
+    (`<sha1>.jsonl`) that is rewritten only once it holds much more than the
+    stack. Methods are thread-safe; they do file I/O, so async callers run
+    them in a worker thread.
+    """
+
+    def __init__(
+        self,
+        max_bytes_per_file: int = 8 * 1024 * 1024,
+        max_bytes: int = 64 * 1024 * 1024,
+        max_steps_per_file: int = 100,
+        persist_dir: Optional[str] = None,
+    ):
+        self.max_bytes_per_file = max_bytes_per_file
+        self.max_bytes = max_bytes
+        self.max_steps_per_file = max_steps_per_file
+        self.persist_dir = persist_dir
+
+        self._stacks: "OrderedDict[str, Deque[ReverseDiff]]" = OrderedDict()
+        self._file_bytes: Dict[str, int] = {}
+        self._total_bytes = 0
+        # entries in each loaded file's journal, to know when to compact it
+        self._journal_lines: Dict[str, int] = {}
+        self._lock = threading.RLock()
+
+    @classmethod
+    def from_config(cls) -> "EditHistory":
+        return cls(
+            max_bytes_per_file=EDITOR_HISTORY_CONFIG["MAX_BYTES_PER_FILE"],
+            max_bytes=EDITOR_HISTORY_CONFIG["MAX_BYTES"],
+            max_steps_per_file=EDITOR_HISTORY_CONFIG["MAX_STEPS_PER_FILE"],
+            persist_dir=EDITOR_HISTORY_CONFIG["PERSIST_DIR"],
+        )
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total_bytes
+
+    def steps(self, path) -> int:
+        """Number of edits that can be undone for `path`"""
+        with self._lock:
+            return len(self._stack(str(path)))
+
+    def record(self, path, before: str, after: str) -> None:
+        """Remember how to get from `after` back to `before`"""
+        key = str(path)
+        diff = ReverseDiff.between(before, after)
+        with self._lock:
+            stack = self._stack(key)
+            if diff.cost > self.max_bytes_per_file:
+                # cannot be kept; older steps would not apply on top of it either
+                logger.debug(f"Edit of {key} is too large for the undo history")
+                self._drop(key)
+                return
+            stack.append(diff)
+            self._file_bytes[key] = self._file_bytes.get(key, 0) + diff.cost
+            self._total_bytes += diff.cost
+
+            dropped = 0
+            while len(stack) > self.max_steps_per_file or self._file_bytes[key] > self.max_bytes_per_file:
+                self._pop_oldest(key)
+                dropped += 1
+            self._journal(key, ["push", *diff], *([["shift", dropped]] if dropped else []))
+            self._enforce_total(keep=key)
+
+    def undo(self, path, current: str, steps: int = 1) -> Tuple[str, int]:
+        """Apply up to `steps` reverse diffs to `current`.
+
+        Returns the restored content and the number of steps undone.
+
+        Raises:
+            KeyError: no history for `path`
+            ValueError: the file no longer matches the recorded edit
+        """
+        key = str(path)
+        with self._lock:
+            stack = self._stack(key)
+            if not stack:
+                raise KeyError(key)
+            content, undone = current, 0
+            while undone < steps and stack:
+                try:
+                    content = stack[-1].apply(content)
+                except ValueError:
+                    if not undone:
+                        raise
+                    break
+                diff = stack.pop()
+                self._file_bytes[key] -= diff.cost
+                self._total_bytes -= diff.cost
+                undone += 1
+            self._journal(key, ["pop", undone])
+            return content, undone
+
+    def _stack(self, key: str) -> Deque[ReverseDiff]:
+        stack = self._stacks.get(key)
+        if stack is None:
+            stack = deque(self._load(key))
+            self._stacks[key] = stack
+            cost = sum(diff.cost for diff in stack)
+            self._file_bytes[key] = cost
+            self._total_bytes += cost
+        self._stacks.move_to_end(key)
+        return stack
+
+    def _pop_oldest(self, key: str) -> None:
+        diff = self._stacks[key].popleft()
+        self._file_bytes[key] -= diff.cost
+        self._total_bytes -= diff.cost
+
+    def _drop(self, key: str) -> None:
+        stack = self._stacks.pop(key, None)
+        if stack is not None:
+            self._total_bytes -= self._file_bytes.pop(key, 0)
+        self._rewrite(key, [])
+
+    def _enforce_total(self, keep: str) -> None:
+        while self._total_bytes > self.max_bytes:
+            victim = next((k for k in self._stacks if k != keep), None)
+            if victim is not None and not self._stacks[victim]:
+                self._stacks.pop(victim)
+                self._file_bytes.pop(victim, None)
+                continue
+            if victim is None:
+                # only the current file is left: trim its own oldest steps
+                self._pop_oldest(keep)
+                self._journal(keep, ["shift", 1])
+                continue
+            if self.persist_dir:
+                # already on disk; just unload it
+                self._stacks.pop(victim)
+                self._total_bytes -= self._file_bytes.pop(victim, 0)
+                continue
+            self._pop_oldest(victim)
+            if not self._stacks[victim]:
+                self._stacks.pop(victim)
+                self._file_bytes.pop(victim, None)
+
+    # -------- persistence --------
+
+    def _file_for(self, key: str) -> Optional[Path]:
+        if not self.persist_dir:
+            return None
+        name = hashlib.sha1(key.encode("utf-8", errors="surrogatepass")).hexdigest()
+        return Path(self.persist_dir) / f"{name}.jsonl"
+
+    def _load(self, key: str) -> List[ReverseDiff]:
+        """Replay the file's journal: `push` a diff, `pop` the newest n, `shift` the oldest n"""
+        file = self._file_for(key)
+        if file is None or not file.exists():
+            return []
+        stack: Deque[ReverseDiff] = deque()
+        lines = 0
+        try:
+            with file.open(encoding="utf-8") as f:
+                for line in f:
+                    op, *args = json.loads(line)
+                    if op == "push":
+                        stack.append(ReverseDiff(*args))
+                    elif op == "pop":
+                        for _ in range(min(args[0], len(stack))):
+                            stack.pop()
+                    elif op == "shift":
+                        for _ in range(min(args[0], len(stack))):
+                            stack.popleft()
+                    lines += 1
+        except (OSError, ValueError, KeyError, TypeError, IndexError) as e:
+            # a torn last line (crash mid-append) loses that step only
+            logger.warning(f"Ignoring the rest of unreadable edit history {file}: {e}")
+        self._journal_lines[key] = lines
+        return list(stack)
+
+    def _journal(self, key: str, *ops: list) -> None:
+        """Append `ops` to the file's journal, compacting it once it is mostly dead entries"""
+        file = self._file_for(key)
+        if file is None:
+            return
+        stack = self._stacks.get(key, ())
+        lines = self._journal_lines.get(key, 0) + len(ops)
+        if not stack or lines > 2 * len(stack) + 32:
+            self._rewrite(key, list(stack))
+            return
+        try:
+            file.parent.mkdir(parents=True, exist_ok=True)
+            with file.open("a", encoding="utf-8") as f:
+                f.write("".join(json.dumps(op, ensure_ascii=False) + "\n" for op in ops))
+            self._journal_lines[key] = lines
+        except OSError as e:
+            logger.warning(f"Could not persist edit history for {key}: {e}")
+
+    def _rewrite(self, key: str, diffs: List[ReverseDiff]) -> None:
+        """Replace the file's journal with one `push` per diff"""
+        file = self._file_for(key)
+        if file is None:
+            return
+        try:
+            if not diffs:
+                file.unlink(missing_ok=True)
+                self._journal_lines.pop(key, None)
+                return
+            file.parent.mkdir(parents=True, exist_ok=True)
+            tmp = file.with_suffix(".tmp")
+            tmp.write_text(
+                "".join(json.dumps(["push", *d], ensure_ascii=False) + "\n" for d in diffs),
+                encoding="utf-8",
+            )
+            os.replace(tmp, file)
+            self._journal_lines[key] = len(diffs)
+        except OSError as e:
+            logger.warning(f"Could not persist edit history for {key}: {e}")
+
+
+_history: Optional[EditHistory] = None
+_history_lock = threading.Lock()
+
+
+def get_edit_history() -> EditHistory:
+    """The undo history shared by all editors in this process, so its budget is global"""
+    global _history
+    with _history_lock:
+        if _history is None:
+            _history = EditHistory.from_config()
+        return _history
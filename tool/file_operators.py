@@ -0,0 +1,492 @@
+"""File operations for StrReplaceEditor, on the local machine or inside a sandbox."""
+
+import asyncio
+import json
+import os
+import signal
+import stat
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from SREgent.config import FILE_OPERATOR_CONFIG, SANDBOX_CONFIG, TOOL_OUTPUT_CONFIG
+from SREgent.exceptions import ToolError
+from SREgent.logger import logger
+from SREgent.tool import line_index
+from SREgent.tool.search import search_files
+
+
+PathLike = Union[str, Path]
+
+_WRITE_CHUNK = 1024 * 1024
+
+
+class FileOperator(ABC):
+    """File access used by StrReplaceEditor"""
+
+    @abstractmethod
+    async def read_file(self, path: PathLike) -> str:
+        """Read a whole text file"""
+
+    @abstractmethod
+    async def read_lines(
+        self, path: PathLike, start: int = 1, end: Optional[int] = None, max_bytes: Optional[int] = None
+    ) -> Tuple[str, Dict[str, Any]]:
+        """Lines start..end (1-based, inclusive; None reads to the end), cut after max_bytes.
+
+        Returns the text and start_line, end_line, total_lines and truncated.
+        """
+
+    @abstractmethod
+    async def search(
+        self, path: PathLike, pattern: str, max_matches: int = 100
+    ) -> Tuple[List[Tuple[int, str]], bool]:
+        """(line number, line) for lines matching a regex, and whether the list was capped"""
+
+    @abstractmethod
+    async def write_file(self, path: PathLike, content: str) -> None:
+        """Replace the file's content"""
+
+    @abstractmethod
+    async def is_directory(self, path: PathLike) -> bool:
+        """Check if path points to a directory"""
+
+    @abstractmethod
+    async def exists(self, path: PathLike) -> bool:
+        """Check if path exists"""
+
+    @abstractmethod
+    async def run_command(self, cmd: str, timeout: Optional[float] = 120.0) -> Tuple[int, str, str]:
+        """Run a shell command and return (return code, stdout, stderr)"""
+
+
+def _read_text(path: PathLike, encoding: str, max_bytes: int) -> str:
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size > max_bytes:
+            raise ToolError(
+                f"{path} is {size} bytes, larger than the {max_bytes} bytes the editor reads at once. "
+                "View it in ranges or search it instead."
+            )
+        return f.read().decode(encoding)
+
+
+def _create_temp(directory: str, name: str) -> Tuple[int, str]:
+    """Create a hidden temp file next to ``name``; the kernel applies the umask to 0o666"""
+    while True:
+        tmp = os.path.join(directory, f".{name}.{os.urandom(6).hex()}.tmp")
+        try:
+            return os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666), tmp
+        except FileExistsError:
+            continue
+
+
+def _atomic_write(path: PathLike, content: str, encoding: str, fsync: bool) -> None:
+    """Write to a temp file next to `path`, then rename it over `path`.
+
+    Readers see either the old or the new content, never a partial file. The
+    mode of an existing file is kept; symlinks are written through.
+    """
+    target = os.path.realpath(path)
+    directory, name = os.path.split(target)
+    fd, tmp = _create_temp(directory, name)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            # encoded in slices: no second full copy of a large file
+            for pos in range(0, len(content), _WRITE_CHUNK):
+                f.write(content[pos : pos + _WRITE_CHUNK].encode(encoding))
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        try:
+            os.chmod(tmp, stat.S_IMODE(os.stat(target).st_mode))
+        except FileNotFoundError:
+            pass
+        os.replace(tmp, target)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+class LocalFileOperator(FileOperator):
+    """Local file access; blocking I/O runs in worker threads"""
+
+    encoding: str = "utf-8"
+
+    async def read_file(self, path: PathLike) -> str:
+        try:
+            return await asyncio.to_thread(
+                _read_text, path, self.encoding, FILE_OPERATOR_CONFIG["MAX_READ_BYTES"]
+            )
+        except ToolError:
+            raise
+        except Exception as e:
+            raise ToolError(f"Failed to read {path}: {str(e)}") from None
+
+    async def read_lines(
+        self, path: PathLike, start: int = 1, end: Optional[int] = None, max_bytes: Optional[int] = None
+    ) -> Tuple[str, Dict[str, Any]]:
+        limit = None if end is None else max(0, end - start + 1)
+        try:
+            data, info = await asyncio.to_thread(
+                line_index.read_lines, str(path), max(1, start), limit, max_bytes
+            )
+        except Exception as e:
+            raise ToolError(f"Failed to read {path}: {str(e)}") from None
+        info.setdefault("truncated", False)
+        return data.decode(self.encoding, errors="replace"), info
+
+    async def search(
+        self, path: PathLike, pattern: str, max_matches: int = 100
+    ) -> Tuple[List[Tuple[int, str]], bool]:
+        # one extra match tells whether the list was really capped, as in the sandbox helper
+        result = await asyncio.to_thread(
+            search_files,
+            pattern,
+            str(path),
+            include_hidden=True,
+            max_matches=max_matches + 1,
+            max_matches_per_file=max_matches + 1,
+            max_workers=1,
+        )
+        if not result["ok"]:
+            raise ToolError(f"Failed to search {path}: {result['error']}")
+        matches = result["matches"]
+        return [(m["line"], m["text"]) for m in matches[:max_matches]], len(matches) > max_matches
+
+    async def write_file(self, path: PathLike, content: str) -> None:
+        try:
+            await asyncio.to_thread(
+                _atomic_write, path, content, self.encoding, FILE_OPERATOR_CONFIG["FSYNC"]
+            )
+        except Exception as e:
+            raise ToolError(f"Failed to write to {path}: {str(e)}") from None
+
+    async def is_directory(self, path: PathLike) -> bool:
+        return await asyncio.to_thread(os.path.isdir, path)
+
+    async def exists(self, path: PathLike) -> bool:
+        return await asyncio.to_thread(os.path.exists, path)
+
+    async def run_command(self, cmd: str, timeout: Optional[float] = 120.0) -> Tuple[int, str, str]:
+        # imported here: tool.tool pulls in the whole tool registry
+        from SREgent.tool.tool import aexec_shell
+
+        result = await aexec_shell(cmd, shell="sh", timeout=timeout)
+        if "returncode" not in result:
+            raise ToolError(f"Command '{cmd}' failed: {result.get('error')}")
+        return result["returncode"], result["stdout"], result["stderr"]
+
+
+# Runs inside the sandbox (python -c). Requests and replies are JSON lines with an
+# id; each request is handled on a thread so a long command does not hold up
+# file operations.
+_HELPER_SOURCE = r"""
+import json, os, re, signal, stat, subprocess, sys, threading
+from concurrent.futures import ThreadPoolExecutor
+
+options = json.loads(sys.argv[1])
+requests = os.fdopen(os.dup(0), "r", encoding="utf-8")
+replies = os.fdopen(os.dup(1), "w", encoding="utf-8")
+null = os.open(os.devnull, os.O_RDWR)
+for fd in (0, 1):
+    os.dup2(null, fd)
+reply_lock = threading.Lock()
+
+def clip(data):
+    limit = options["max_output"]
+    if len(data) > limit:
+        half = limit // 2
+        data = data[:half] + b"\n... [output truncated] ...\n" + data[-half:]
+    return data.decode("utf-8", errors="replace")
+
+def read(path):
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size > options["max_read"]:
+            raise ValueError(f"file is {size} bytes, larger than the {options['max_read']} bytes the editor reads at once")
+        return f.read().decode("utf-8")
+
+def read_lines(path, start, end, max_bytes):
+    parts, size, truncated = [], 0, False
+    line_no, last = 0, start - 1
+    with open(path, "rb") as f:
+        for line in f:
+            line_no += 1
+            if line_no < start or truncated:
+                continue
+            if end is not None and line_no > end:
+                break
+            if max_bytes is not None and size + len(line) > max_bytes:
+                line, truncated = line[: max_bytes - size], True
+            parts.append(line)
+            size += len(line)
+            last = line_no
+        # count the remaining lines without splitting them
+        rest, tail = 0, b""
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            rest += chunk.count(b"\n")
+            tail = chunk
+        line_no += rest + (1 if tail and not tail.endswith(b"\n") else 0)
+    text = b"".join(parts).decode("utf-8", errors="replace")
+    return {"text": text, "start_line": start, "end_line": last, "total_lines": line_no, "truncated": truncated}
+
+def search(path, pattern, max_matches):
+    regex = re.compile(pattern.encode("utf-8"))
+    found = []
+    with open(path, "rb") as f:
+        for line_no, line in enumerate(f, 1):
+            # matched without the newline, like search_files
+            if regex.search(line[:-1] if line.endswith(b"\n") else line):
+                if len(found) >= max_matches:
+                    return {"matches": found, "truncated": True}
+                text = line.rstrip(b"\r\n").decode("utf-8", errors="replace")
+                found.append([line_no, text if len(text) <= 500 else text[:500] + "..."])
+    return {"matches": found, "truncated": False}
+
+def create_temp(directory, name):
+    while True:
+        tmp = os.path.join(directory, "." + name + "." + os.urandom(6).hex() + ".tmp")
+        try:
+            return os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666), tmp
+        except FileExistsError:
+            continue
+
+def write(path, content):
+    target = os.path.realpath(path)
+    directory, name = os.path.split(target)
+    fd, tmp = create_temp(directory, name)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(content.encode("utf-8"))
+            if options["fsync"]:
+                f.flush()
+                os.fsync(f.fileno())
+        try:
+            os.chmod(tmp, stat.S_IMODE(os.stat(target).st_mode))
+        except FileNotFoundError:
+            pass
+        os.replace(tmp, target)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+def run(command, timeout):
+    proc = subprocess.Popen(["sh", "-c", command], stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                            stderr=subprocess.PIPE, start_new_session=True)
+    try:
+        out, err = proc.communicate(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        os.killpg(proc.pid, signal.SIGKILL)
+        out, err = proc.communicate()
+        return {"timed_out": True, "returncode": proc.returncode, "stdout": clip(out), "stderr": clip(err)}
+    return {"timed_out": False, "returncode": proc.returncode, "stdout": clip(out), "stderr": clip(err)}
+
+def handle(job):
+    op = job["op"]
+    try:
+        if op == "read":
+            result = read(job["path"])
+        elif op == "read_lines":
+            result = read_lines(job["path"], job["start"], job["end"], job["max_bytes"])
+        elif op == "search":
+            result = search(job["path"], job["pattern"], job["max_matches"])
+        elif op == "write":
+            result = write(job["path"], job["content"])
+        elif op == "exists":
+            result = os.path.exists(job["path"])
+        elif op == "is_dir":
+            result = os.path.isdir(job["path"])
+        elif op == "run":
+            result = run(job["command"], job["command_timeout"])
+        else:
+            raise ValueError("unknown op " + op)
+        reply = {"id": job["id"], "result": result}
+    except Exception as e:
+        reply = {"id": job["id"], "error": f"{type(e).__name__}: {e}"}
+    line = json.dumps(reply, ensure_ascii=False) + "\n"
+    with reply_lock:
+        replies.write(line)
+        replies.flush()
+
+replies.write(json.dumps({"ready": True}) + "\n")
+replies.flush()
+with ThreadPoolExecutor(max_workers=8) as pool:
+    for line in requests:
+        pool.submit(handle, json.loads(line))
+"""
+
+
+class SandboxFileOperator(FileOperator):
+    """File access inside a sandbox through one persistent helper process.
+
+    The helper is started lazily with SANDBOX_CONFIG["COMMAND"] (e.g.
+    `docker exec -i <container>` or `chroot <dir>`) and serves every later
+    operation over its stdin/stdout, so no process is spawned per operation.
+    Requests carry ids and may overlap. A helper that died or hung is replaced
+    on the next call.
+    """
+
+    def __init__(
+        self,
+        command: Optional[List[str]] = None,
+        python: Optional[str] = None,
+        timeout: Optional[float] = None,
+    ):
+        self.command = SANDBOX_CONFIG["COMMAND"] if command is None else command
+        self.python = python or SANDBOX_CONFIG["PYTHON"]
+        self.timeout = timeout or SANDBOX_CONFIG["TIMEOUT"]
+
+        self._process: Optional[asyncio.subprocess.Process] = None
+        self._reader: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._start_lock: Optional[asyncio.Lock] = None
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._next_id = 0
+
+    async def _ensure_channel(self) -> asyncio.subprocess.Process:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # the helper's pipes belong to the loop that started it
+            self._discard()
+            self._loop = loop
+            self._start_lock = asyncio.Lock()
+        async with self._start_lock:
+            if self._process is None or self._process.returncode is not None:
+                self._discard()
+                await self._spawn()
+        return self._process
+
+    async def _spawn(self) -> None:
+        options = {
+            "max_read": FILE_OPERATOR_CONFIG["MAX_READ_BYTES"],
+            "fsync": FILE_OPERATOR_CONFIG["FSYNC"],
+            "max_output": TOOL_OUTPUT_CONFIG["MAX_BYTES"],
+        }
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *self.command,
+                self.python,
+                "-c",
+                _HELPER_SOURCE,
+                json.dumps(options),
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.DEVNULL,
+                start_new_session=True,
+                # a reply carries a whole file, JSON-escaped
+                limit=FILE_OPERATOR_CONFIG["MAX_READ_BYTES"] * 6 + 1024 * 1024,
+            )
+        except OSError as e:
+            raise ToolError(f"Failed to start the sandbox helper: {e}") from None
+        if not await process.stdout.readline():
+            await process.wait()
+            raise ToolError(
+                f"Sandbox helper exited during startup ({process.returncode}); "
+                f"check SANDBOX_COMMAND {self.command}"
+            )
+        self._process = process
+        self._reader = asyncio.create_task(self._read_replies(process))
+        logger.debug(f"Started sandbox helper pid {process.pid}")
+
+    async def _read_replies(self, process: asyncio.subprocess.Process) -> None:
+        try:
+            while True:
+                line = await process.stdout.readline()
+                if not line:
+                    break
+                reply = json.loads(line)
+                future = self._pending.pop(reply["id"], None)
+                if future is not None and not future.done():
+                    future.set_result(reply)
+        except (ValueError, asyncio.LimitOverrunError) as e:
+            logger.warning(f"Bad reply from sandbox helper: {e}")
+        finally:
+            if process is self._process:
+                self._discard()
+
+    def _discard(self) -> None:
+        """Kill the helper (if any) and fail the calls waiting on it"""
+        process, self._process = self._process, None
+        if process is not None and process.returncode is None:
+            try:
+                os.killpg(process.pid, signal.SIGKILL)
+            except (ProcessLookupError, PermissionError):
+                pass
+        if self._reader is not None and self._reader is not asyncio.current_task():
+            self._reader.cancel()
+        self._reader = None
+        pending, self._pending = self._pending, {}
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(ToolError("Sandbox helper exited"))
+
+    async def _call(self, op: str, timeout: Optional[float] = None, **fields: Any) -> Any:
+        process = await self._ensure_channel()
+        self._next_id += 1
+        request_id = self._next_id
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        try:
+            process.stdin.write(json.dumps({"id": request_id, "op": op, **fields}).encode() + b"\n")
+            await process.stdin.drain()
+            reply = await asyncio.wait_for(future, timeout or self.timeout)
+        except asyncio.TimeoutError:
+            self._pending.pop(request_id, None)
+            # a file operation that hangs means the helper is stuck
+            self._discard()
+            raise ToolError(f"Sandbox {op} timed out") from None
+        except (BrokenPipeError, ConnectionResetError):
+            self._pending.pop(request_id, None)
+            self._discard()
+            raise ToolError("Sandbox helper exited") from None
+        if "error" in reply:
+            target = fields.get("path") or fields.get("command")
+            raise ToolError(f"Failed to {op} {target}: {reply['error']}")
+        return reply["result"]
+
+    async def read_file(self, path: PathLike) -> str:
+        return await self._call("read", path=str(path))
+
+    async def read_lines(
+        self, path: PathLike, start: int = 1, end: Optional[int] = None, max_bytes: Optional[int] = None
+    ) -> Tuple[str, Dict[str, Any]]:
+        info = await self._call(
+            "read_lines", path=str(path), start=max(1, start), end=end, max_bytes=max_bytes
+        )
+        return info.pop("text"), info
+
+    async def search(
+        self, path: PathLike, pattern: str, max_matches: int = 100
+    ) -> Tuple[List[Tuple[int, str]], bool]:
+        result = await self._call("search", path=str(path), pattern=pattern, max_matches=max_matches)
+        return [tuple(m) for m in result["matches"]], result["truncated"]
+
+    async def write_file(self, path: PathLike, content: str) -> None:
+        await self._call("write", path=str(path), content=content)
+
+    async def is_directory(self, path: PathLike) -> bool:
+        return await self._call("is_dir", path=str(path))
+
+    async def exists(self, path: PathLike) -> bool:
+        return await self._call("exists", path=str(path))
+
+    async def run_command(self, cmd: str, timeout: Optional[float] = 120.0) -> Tuple[int, str, str]:
+        result = await self._call(
+            "run", timeout=(timeout or self.timeout) + 5, command=cmd, command_timeout=timeout
+        )
+        if result["timed_out"]:
+            raise ToolError(f"Command '{cmd}' timed out after {timeout} seconds")
+        return result["returncode"], result["stdout"], result["stderr"]
+
+    async def close(self) -> None:
+        process = self._process
+        self._discard()
+        if process is not None:
+            await process.wait()
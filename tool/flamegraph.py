@@ -0,0 +1,653 @@
+"""Stack-sample folding: perf script / bpftrace stack output into a bounded call tree.
+
+Samples are folded into a trie while the output streams, so neither the raw
+text nor the list of distinct stacks is ever held in memory; the tree is
+capped at `PROFILE_CONFIG["MAX_NODES"]` nodes. From the tree come the hot
+functions and paths with self/inclusive shares, folded-stack files
+(`root;...;leaf count`, as consumed by flamegraph.pl / speedscope), SVG flame
+graphs, and differences between two profiles.
+"""
+
+import asyncio
+import json
+import os
+import re
+import shlex
+import signal
+import zlib
+from typing import Any, Dict, List, Optional, Sequence, TextIO, Tuple
+from xml.sax.saxutils import escape
+
+from SREgent.config import PROFILE_CONFIG
+from SREgent.exceptions import ToolError
+from SREgent.tool.base import BaseTool, ToolResult
+from SREgent.tool.ebpf import _replay, stream_probe
+from SREgent.tool.metric_store import get_metric_store
+
+
+_STACK_PROFILE_DESCRIPTION = """Fold stack samples into a call tree and return the hot functions and paths instead of the raw stacks.
+* Input is `perf script` output, bpftrace maps keyed by stacks (`@[kstack, ustack] = count()`, e.g. from `profile:hz:99`) or folded stacks (`a;b;c 12`); read from `path` (.gz allowed) or streamed from `command` (stopped with SIGINT after `duration` seconds, like `ebpf_trace`)
+* Returns the functions with the most self time (and their inclusive share) and the hottest call paths, as percentages of all samples
+* `output` writes the whole profile to disk: an SVG flame graph if it ends in `.svg`, folded stacks otherwise
+* `baseline` (another profile file) switches to differential mode: the functions and paths whose share changed most; the SVG is colored red where the share grew and blue where it shrank
+* The top functions are recorded in the metric store under `metric_prefix`
+"""
+
+_ROOT = "all"
+_NAME_CACHE = 65536
+_PENDING_STACKS = 4096
+_TRUNCATED = "[truncated]"
+_OFFSET_RE = re.compile(r"\+(?:0x[0-9a-fA-F]+|\d+)(?:/0x[0-9a-fA-F]+)?$")
+_ADDRESS_RE = re.compile(r"^(?:0x)?[0-9a-fA-F]+$")
+_FRAME_RE = re.compile(r"^(?:(?P<address>[0-9a-fA-F]+)\s+)?(?P<symbol>.*?)(?:\s+\((?P<module>[^()]*)\))?$")
+_PERF_HEADER_RE = re.compile(r"^(?P<comm>\S.*?)\s+(?:-?\d+/)?-?\d+\s+(?:\[\d+\]\s+)?\d+\.\d+:")
+_FOLDED_RE = re.compile(r"^(?P<stack>\S.*?)\s+(?P<count>\d+)$")
+_BPF_OPEN_RE = re.compile(r"^@\w*\[(?P<extra>[^\]]*)$")
+_BPF_CLOSE_RE = re.compile(r"^,?\s*(?P<extra>.*?)\]:\s*(?P<value>.*)$")
+
+
+def frame_name(text: str) -> str:
+    """Normalize one printed frame: drop addresses and `+0x1a` offsets, name unknown frames by module"""
+    match = _FRAME_RE.match(text.strip())
+    symbol, module = match.group("symbol"), match.group("module")
+    if not symbol or symbol == "[unknown]" or _ADDRESS_RE.match(symbol):
+        symbol = f"[{os.path.basename(module)}]" if module else "[unknown]"
+    else:
+        symbol = _OFFSET_RE.sub("", symbol)
+    # `;` separates frames in folded stacks
+    return symbol.replace(";", ":")
+
+
+class StackTrie:
+    """Call tree of stack samples, bounded to `max_nodes` nodes.
+
+    Node 0 is the root; every other node is a (parent, frame) pair with its
+    self and inclusive sample counts, kept in parallel lists. A parent's id is
+    always smaller than its children's. When the node budget is used up, the
+    rest of a new path is counted on one `[truncated]` child of the deepest
+    existing node, so totals stay exact and only detail below it is lost.
+    """
+
+    def __init__(self, max_nodes: Optional[int] = None):
+        self.max_nodes = max_nodes or PROFILE_CONFIG["MAX_NODES"]
+        self.frames: List[str] = [_ROOT]
+        self.parent: List[int] = [-1]
+        self.frame: List[int] = [0]
+        self.self_count: List[int] = [0]
+        self.total: List[int] = [0]
+        self.truncated = 0
+        self._frame_ids: Dict[str, int] = {}
+        self._children: Dict[Tuple[int, int], int] = {}
+
+    @property
+    def samples(self) -> int:
+        return self.total[0]
+
+    @property
+    def nodes(self) -> int:
+        return len(self.parent)
+
+    def _node(self, parent: int, name: str) -> int:
+        fid = self._frame_ids.get(name)
+        if fid is None:
+            fid = self._frame_ids[name] = len(self.frames)
+            self.frames.append(name)
+        node = self._children.get((parent, fid))
+        if node is None:
+            node = self._children[(parent, fid)] = len(self.parent)
+            self.parent.append(parent)
+            self.frame.append(fid)
+            self.self_count.append(0)
+            self.total.append(0)
+        return node
+
+    def add(self, frames: Sequence[str], count: int = 1) -> None:
+        """Count a stack given root first"""
+        if count <= 0:
+            return
+        total, children, frame_ids = self.total, self._children, self._frame_ids
+        node = 0
+        total[0] += count
+        for name in frames:
+            fid = frame_ids.get(name)
+            child = None if fid is None else children.get((node, fid))
+            if child is None:
+                if len(self.parent) >= self.max_nodes:
+                    node = self._node(node, _TRUNCATED)
+                    self.truncated += count
+                    total[node] += count
+                    break
+                child = self._node(node, name)
+            node = child
+            total[node] += count
+        self.self_count[node] += count
+
+    def path(self, node: int) -> List[str]:
+        frames = []
+        while node > 0:
+            frames.append(self.frames[self.frame[node]])
+            node = self.parent[node]
+        frames.reverse()
+        return frames
+
+    def children(self) -> List[List[int]]:
+        kids: List[List[int]] = [[] for _ in self.parent]
+        for node in range(1, len(self.parent)):
+            kids[self.parent[node]].append(node)
+        return kids
+
+    def function_counts(self) -> Tuple[List[int], List[int]]:
+        """Self and inclusive samples per frame id; recursive frames count once per stack"""
+        self_counts = [0] * len(self.frames)
+        inclusive = [0] * len(self.frames)
+        on_path = [0] * len(self.frames)
+        kids = self.children()
+        stack = list(kids[0])
+        while stack:
+            node = stack.pop()
+            if node < 0:
+                on_path[self.frame[~node]] -= 1
+                continue
+            fid = self.frame[node]
+            self_counts[fid] += self.self_count[node]
+            if not on_path[fid]:
+                inclusive[fid] += self.total[node]
+            on_path[fid] += 1
+            stack.append(~node)
+            stack.extend(kids[node])
+        return self_counts, inclusive
+
+    def write_folded(self, f: TextIO) -> int:
+        """Write `root;...;leaf count` lines; returns the number of lines"""
+        kids = self.children()
+        stack = [(child, self.frames[self.frame[child]]) for child in kids[0]]
+        lines = 0
+        while stack:
+            node, path = stack.pop()
+            if self.self_count[node]:
+                f.write(f"{path} {self.self_count[node]}\n")
+                lines += 1
+            stack.extend((child, f"{path};{self.frames[self.frame[child]]}") for child in kids[node])
+        return lines
+
+
+class StackCollapser:
+    """Streaming parser feeding stack samples into a StackTrie.
+
+    `perf script` prints a header line per sample and then one indented
+    frame per line, leaf first; bpftrace prints maps keyed by stacks as
+    `@[` + frames (leaf first, kernel stack before user stack) + `]: count`.
+    Folded lines (`root;...;leaf count`) are added as they are. With
+    `fmt="auto"` each line is recognized on its own. The process name of
+    perf samples and the non-stack parts of bpftrace keys (`@[comm, kstack]`)
+    become the root frames. Up to `_PENDING_STACKS` distinct stacks are
+    counted before being walked into the trie; `close()` flushes them.
+    """
+
+    def __init__(self, trie: StackTrie, fmt: str = "auto"):
+        self.trie = trie
+        self.fmt = fmt
+        self.lines = 0
+        self.skipped_lines = 0
+        self._perf_comm: Optional[str] = None
+        self._frames: List[str] = []
+        self._bpf_extra: Optional[List[str]] = None
+        # normalized names by printed frame; bounded, cleared when full
+        self._names: Dict[str, str] = {}
+        # identical stacks are counted here and walked into the trie once per flush
+        self._pending: Dict[Tuple[str, ...], int] = {}
+
+    def _frame(self, text: str) -> str:
+        # cached by the whole line (the same return address recurs) and without the address
+        head, _, rest = text.partition(" ")
+        key = rest if rest and _ADDRESS_RE.match(head) else text
+        name = self._names.get(key)
+        if name is None:
+            name = frame_name(key)
+        if len(self._names) >= _NAME_CACHE:
+            self._names.clear()
+        self._names[text] = self._names[key] = name
+        return name
+
+    def _add(self, frames: Tuple[str, ...], count: int = 1) -> None:
+        pending = self._pending
+        pending[frames] = pending.get(frames, 0) + count
+        if len(pending) >= _PENDING_STACKS:
+            self.flush()
+
+    def flush(self) -> None:
+        for frames, count in self._pending.items():
+            self.trie.add(frames, count)
+        self._pending.clear()
+
+    def feed(self, line: str) -> None:
+        self.lines += 1
+        if self._bpf_extra is not None:
+            self._feed_bpf_line(line)
+            return
+        stripped = line.strip()
+        if not stripped:
+            self._end_perf_sample()
+            return
+        if self._perf_comm is not None and line[0] in " \t":
+            self._frames.append(self._names.get(stripped) or self._frame(stripped))
+            return
+        if stripped[0] == "@" and self.fmt in ("auto", "bpftrace"):
+            opened = _BPF_OPEN_RE.match(stripped)
+            if opened:
+                self._end_perf_sample()
+                self._bpf_extra = [p.strip() for p in opened.group("extra").split(",") if p.strip()]
+            else:
+                self.skipped_lines += 1
+            return
+        if self.fmt in ("auto", "perf") and not line[0].isspace():
+            header = _PERF_HEADER_RE.match(stripped)
+            if header or self.fmt == "perf":
+                self._end_perf_sample()
+                self._perf_comm = header.group("comm") if header else stripped.split()[0]
+                return
+        if self.fmt in ("auto", "folded"):
+            folded = _FOLDED_RE.match(stripped)
+            if folded:
+                self._end_perf_sample()
+                self._add(tuple(folded.group("stack").split(";")), int(folded.group("count")))
+                return
+        self.skipped_lines += 1
+
+    def feed_lines(self, lines) -> "StackCollapser":
+        for line in lines:
+            self.feed(line)
+        return self
+
+    def close(self) -> None:
+        self._end_perf_sample()
+        # output ended inside a bpftrace key: the sample has no count
+        self._bpf_extra = None
+        self._frames = []
+        self.flush()
+
+    def _end_perf_sample(self) -> None:
+        if self._perf_comm is None:
+            return
+        frames = self._frames
+        frames.append(self._perf_comm)
+        frames.reverse()
+        self._add(tuple(frames))
+        self._perf_comm = None
+        self._frames = []
+
+    def _feed_bpf_line(self, line: str) -> None:
+        stripped = line.strip()
+        if stripped == ",":
+            # kstack / ustack boundary
+            return
+        if stripped.startswith(("]", ",")):
+            close = _BPF_CLOSE_RE.match(stripped)
+            if close:
+                extra = self._bpf_extra + [p.strip() for p in close.group("extra").split(",") if p.strip()]
+                frames = self._frames
+                frames.reverse()
+                value = close.group("value").strip()
+                if value.isdigit():
+                    self._add(tuple(extra + frames), int(value))
+                else:
+                    # not a count (e.g. a hist() keyed by stack)
+                    self.skipped_lines += 1
+                self._bpf_extra = None
+                self._frames = []
+                return
+        if stripped:
+            self._frames.append(self._frame(stripped))
+
+
+# -------- summaries --------
+
+
+def _pct(count: float, samples: int) -> float:
+    return round(100.0 * count / samples, 2) if samples else 0.0
+
+
+def _display_path(frames: List[str], head: int = 3, tail: int = 12) -> str:
+    if len(frames) > head + tail + 1:
+        frames = frames[:head] + [f"...{len(frames) - head - tail} frames..."] + frames[-tail:]
+    return ";".join(frames)
+
+
+def profile_summary(trie: StackTrie, top_n: int = 15) -> Dict[str, Any]:
+    samples = trie.samples
+    self_counts, inclusive = trie.function_counts()
+    ranked = sorted(range(1, len(trie.frames)), key=self_counts.__getitem__, reverse=True)
+    functions = [
+        {
+            "frame": trie.frames[fid],
+            "self_pct": _pct(self_counts[fid], samples),
+            "total_pct": _pct(inclusive[fid], samples),
+            "self_samples": self_counts[fid],
+        }
+        for fid in ranked[:top_n]
+        if self_counts[fid]
+    ]
+    hot = sorted(range(1, trie.nodes), key=trie.self_count.__getitem__, reverse=True)
+    paths = []
+    for node in hot[:top_n]:
+        if not trie.self_count[node]:
+            break
+        frames = trie.path(node)
+        paths.append({
+            "path": _display_path(frames),
+            "depth": len(frames),
+            "self_pct": _pct(trie.self_count[node], samples),
+            "samples": trie.self_count[node],
+        })
+    return {"functions": functions, "paths": paths}
+
+
+def _node_mapping(trie: StackTrie, other: StackTrie) -> List[int]:
+    """For every node of `trie` the node with the same path in `other`, or -1"""
+    mapping = [-1] * trie.nodes
+    mapping[0] = 0
+    for node in range(1, trie.nodes):
+        parent = mapping[trie.parent[node]]
+        if parent >= 0:
+            fid = other._frame_ids.get(trie.frames[trie.frame[node]])
+            if fid is not None:
+                mapping[node] = other._children.get((parent, fid), -1)
+    return mapping
+
+
+def diff_summary(base: StackTrie, current: StackTrie, top_n: int = 15) -> Dict[str, Any]:
+    """Functions and paths whose share of samples changed most from `base` to `current`"""
+    base_samples, samples = base.samples, current.samples
+    base_self, base_incl = base.function_counts()
+    cur_self, cur_incl = current.function_counts()
+    shares: Dict[str, List[float]] = {}
+    for trie, self_counts, inclusive, n, offset in (
+        (base, base_self, base_incl, base_samples, 0),
+        (current, cur_self, cur_incl, samples, 2),
+    ):
+        for fid in range(1, len(trie.frames)):
+            if inclusive[fid]:
+                share = shares.setdefault(trie.frames[fid], [0.0, 0.0, 0.0, 0.0])
+                share[offset] = _pct(self_counts[fid], n)
+                share[offset + 1] = _pct(inclusive[fid], n)
+    ranked = sorted(
+        shares.items(), key=lambda kv: (abs(kv[1][2] - kv[1][0]), abs(kv[1][3] - kv[1][1])), reverse=True
+    )
+    functions = [
+        {
+            "frame": name,
+            "self_pct": cur_s,
+            "self_change": round(cur_s - base_s, 2),
+            "total_pct": cur_t,
+            "total_change": round(cur_t - base_t, 2),
+        }
+        for name, (base_s, base_t, cur_s, cur_t) in ranked[:top_n]
+        if cur_s != base_s or cur_t != base_t
+    ]
+
+    mapping = _node_mapping(current, base)
+    changes: List[Tuple[float, List[str], float]] = []
+    matched = set()
+    for node in range(1, current.nodes):
+        other = mapping[node]
+        base_pct = 0.0
+        if other >= 0:
+            matched.add(other)
+            base_pct = _pct(base.self_count[other], base_samples)
+        cur_pct = _pct(current.self_count[node], samples)
+        if cur_pct != base_pct:
+            changes.append((cur_pct - base_pct, current.path(node), cur_pct))
+    for node in range(1, base.nodes):
+        if base.self_count[node] and node not in matched:
+            changes.append((-_pct(base.self_count[node], base_samples), base.path(node), 0.0))
+    changes.sort(key=lambda change: abs(change[0]), reverse=True)
+    paths = [
+        {"path": _display_path(frames), "self_pct": cur_pct, "self_change": round(delta, 2)}
+        for delta, frames, cur_pct in changes[:top_n]
+    ]
+    return {"baseline_samples": base_samples, "functions": functions, "paths": paths}
+
+
+# -------- flame graph --------
+
+
+def _color(name: str) -> str:
+    # flamegraph.pl's "hot" palette, stable per frame name
+    h = zlib.crc32(name.encode("utf-8", errors="replace"))
+    return f"rgb({205 + h % 50},{(h >> 8) % 230},{(h >> 16) % 55})"
+
+
+def _diff_color(change: float) -> str:
+    # change in [-1, 1]: red where the share grew, blue where it shrank
+    fade = int(255 * (1 - min(1.0, abs(change))))
+    return f"rgb(255,{fade},{fade})" if change > 0 else f"rgb({fade},{fade},255)"
+
+
+def render_svg(trie: StackTrie, title: str, base: Optional[StackTrie] = None) -> str:
+    """SVG flame graph of `trie`; with `base`, colored by the change of each frame's inclusive share"""
+    width, frame_height, font_size, pad_x, pad_top, pad_bottom = (
+        PROFILE_CONFIG["SVG_WIDTH"], 16, 12, 10, 40, 10,
+    )
+    samples = max(1, trie.samples)
+    scale = (width - 2 * pad_x) / samples
+    # frames narrower than 0.1px are not drawn
+    min_samples = 0.1 / scale
+
+    changes: Optional[List[float]] = None
+    if base is not None:
+        mapping = _node_mapping(trie, base)
+        base_samples = max(1, base.samples)
+        changes = [
+            trie.total[node] / samples - (base.total[other] / base_samples if other >= 0 else 0.0)
+            for node, other in enumerate(mapping)
+        ]
+        largest = max((abs(c) for c in changes), default=0.0) or 1.0
+        changes = [c / largest for c in changes]
+
+    kids = trie.children()
+    frames, frame = trie.frames, trie.frame
+    rects: List[Tuple[int, int, int]] = []
+    depth_max = 0
+    stack = [(0, 0, 0)]
+    while stack:
+        node, depth, x = stack.pop()
+        rects.append((node, depth, x))
+        depth_max = max(depth_max, depth)
+        offset = x
+        for child in sorted(kids[node], key=lambda c: frames[frame[c]]):
+            if trie.total[child] >= min_samples:
+                stack.append((child, depth + 1, offset))
+            offset += trie.total[child]
+
+    height = pad_top + (depth_max + 1) * frame_height + pad_bottom
+    out = [
+        '<?xml version="1.0" standalone="no"?>',
+        f'<svg version="1.1" width="{width}" height="{height}" viewBox="0 0 {width} {height}" '
+        'xmlns="http://www.w3.org/2000/svg">',
+        f'<rect x="0" y="0" width="{width}" height="{height}" fill="#f8f8f8"/>',
+        f'<text x="{width / 2:.0f}" y="24" font-size="17" font-family="Verdana" text-anchor="middle">'
+        f"{escape(title)}</text>",
+        f'<g font-size="{font_size}" font-family="Verdana">',
+    ]
+    char_width = font_size * 0.59
+    for node, depth, x in rects:
+        name = frames[frame[node]]
+        w = trie.total[node] * scale
+        left = pad_x + x * scale
+        top = height - pad_bottom - (depth + 1) * frame_height
+        tip = f"{name} ({trie.total[node]:,} samples, {100.0 * trie.total[node] / samples:.2f}%"
+        if changes is not None:
+            fill = _diff_color(changes[node])
+            tip += f", {'+' if changes[node] >= 0 else ''}{changes[node] * largest * 100:.2f} pts"
+        else:
+            fill = _color(name)
+        out.append(
+            f"<g><title>{escape(tip)})</title>"
+            f'<rect x="{left:.1f}" y="{top}" width="{w:.1f}" height="{frame_height - 1}" fill="{fill}" rx="2"/>'
+        )
+        chars = int((w - 6) / char_width)
+        if chars >= 3:
+            label = name if len(name) <= chars else name[: chars - 2] + ".."
+            out.append(f'<text x="{left + 3:.1f}" y="{top + frame_height - 4.5}">{escape(label)}</text>')
+        out.append("</g>")
+    out.append("</g>\n</svg>\n")
+    return "\n".join(out)
+
+
+def write_profile(trie: StackTrie, path: str, title: str, base: Optional[StackTrie] = None) -> None:
+    """Folded stacks, or an SVG flame graph when `path` ends in .svg"""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        if path.endswith(".svg"):
+            f.write(render_svg(trie, title, base))
+        else:
+            trie.write_folded(f)
+
+
+def record_profile(summary: Dict[str, Any], samples: int, prefix: str = "profile") -> int:
+    """Store the top functions' shares in the metric store; returns the points stored"""
+    points: List[Tuple[str, Optional[Dict[str, str]], float]] = [(f"{prefix}.samples", None, samples)]
+    for item in summary["functions"]:
+        labels = {"frame": item["frame"]}
+        points.append((f"{prefix}.self_pct", labels, item["self_pct"]))
+        points.append((f"{prefix}.total_pct", labels, item["total_pct"]))
+    return get_metric_store().append_many(points)
+
+
+async def _load(path: str, fmt: str) -> StackCollapser:
+    collapser = StackCollapser(StackTrie(), fmt)
+    try:
+        await asyncio.to_thread(_replay, path, collapser)
+    except OSError as e:
+        raise ToolError(f"Cannot read profile {path}: {e}") from None
+    collapser.close()
+    return collapser
+
+
+class StackProfile(BaseTool):
+    """A tool for folding stack samples into hot paths and flame graphs"""
+
+    name: str = "stack_profile"
+    description: str = _STACK_PROFILE_DESCRIPTION
+    parameters: dict = {
+        "type": "object",
+        "properties": {
+            "path": {
+                "type": "string",
+                "description": "File with `perf script` output, bpftrace stack maps or folded stacks (.gz allowed)",
+            },
+            "command": {
+                "type": "string",
+                "description": "Command whose stdout is profiled instead, e.g. `perf script -i perf.data` or "
+                "`bpftrace -e 'profile:hz:99 { @[kstack, ustack] = count(); }'`",
+            },
+            "duration": {
+                "type": "number",
+                "description": "Seconds before `command` is stopped with SIGINT (default 10)",
+                "minimum": 0.1,
+            },
+            "baseline": {
+                "type": "string",
+                "description": "Profile file to compare against (differential mode)",
+            },
+            "format": {
+                "type": "string",
+                "enum": ["auto", "perf", "bpftrace", "folded"],
+                "description": "Input format (default `auto`)",
+            },
+            "output": {
+                "type": "string",
+                "description": "Write the profile to this path: SVG flame graph for `.svg`, folded stacks otherwise",
+            },
+            "top_n": {
+                "type": "integer",
+                "description": "Functions and paths to return (default 15)",
+                "minimum": 1,
+            },
+            "use_sudo": {
+                "type": "boolean",
+                "description": "Run `command` through sudo (password from SUDO_PASSWORD)",
+            },
+            "metric_prefix": {
+                "type": "string",
+                "description": "Metric name prefix the top functions are recorded under (default `profile`)",
+            },
+        },
+    }
+
+    async def execute(
+        self,
+        path: Optional[str] = None,
+        command: Optional[str] = None,
+        duration: float = 10.0,
+        baseline: Optional[str] = None,
+        format: str = "auto",
+        output: Optional[str] = None,
+        top_n: int = 15,
+        use_sudo: bool = False,
+        metric_prefix: str = "profile",
+        **kwargs,
+    ) -> ToolResult:
+        if bool(path) == bool(command):
+            raise ToolError("Provide exactly one of `path` or `command`.")
+        if format not in ("auto", "perf", "bpftrace", "folded"):
+            raise ToolError(f"Unknown format {format!r}; use auto, perf, bpftrace or folded.")
+
+        result: Dict[str, Any] = {"ok": True}
+        if path:
+            collapser = await _load(path, format)
+            result.update(source="file", path=path)
+        else:
+            collapser = StackCollapser(StackTrie(), format)
+            argv = shlex.split(command)
+            input_text = None
+            if use_sudo:
+                password = os.getenv("SUDO_PASSWORD")
+                if not password:
+                    raise ToolError("SUDO_PASSWORD not set in environment")
+                argv = ["sudo", "-S", "-p", "", *argv]
+                input_text = password + "\n"
+            duration = min(max(0.1, float(duration)), PROFILE_CONFIG["MAX_DURATION"])
+            try:
+                run = await stream_probe(argv, duration, collapser.feed, input_text=input_text)
+            except FileNotFoundError:
+                raise ToolError(f"{argv[0]} not found; is it installed and on PATH?") from None
+            collapser.close()
+            # a probe stopped by the deadline exits with 0 or -SIGINT after printing its maps
+            ok = run["returncode"] in (0, -signal.SIGINT) or (
+                run["interrupted"] and not run["killed"] and collapser.lines > 0
+            )
+            result.update(ok=ok, source="command", **run)
+
+        trie = collapser.trie
+        result.update(
+            samples=trie.samples,
+            nodes=trie.nodes,
+            distinct_frames=len(trie.frames) - 1,
+            lines=collapser.lines,
+            skipped_lines=collapser.skipped_lines,
+        )
+        if trie.truncated:
+            result["truncated_samples"] = trie.truncated
+        if not trie.samples:
+            result["hint"] = "No stack samples recognized; check `format` and that the profiler recorded call stacks (perf record -g)."
+
+        base = None
+        if baseline:
+            base = (await _load(baseline, format)).trie
+            summary = diff_summary(base, trie, top_n)
+        else:
+            summary = profile_summary(trie, top_n)
+        result.update(summary)
+
+        if output and trie.samples:
+            title = "Differential Flame Graph" if base is not None else "Flame Graph"
+            try:
+                await asyncio.to_thread(write_profile, trie, output, title, base)
+            except OSError as e:
+                raise ToolError(f"Cannot write {output}: {e}") from None
+            result["output"] = output
+        if result["ok"] and trie.samples and base is None:
+            result["metrics_recorded"] = record_profile(summary, trie.samples, metric_prefix or "profile")
+        return ToolResult(output=json.dumps(result, ensure_ascii=False))
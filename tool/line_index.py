@@ -0,0 +1,183 @@
+import mmap
+import os
+import threading
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+
+class LineIndex:
+    """Sparse line-offset index of one file.
+
+    One checkpoint (line number, byte offset of that line) is kept per
+    `block_size` bytes, so seeking to any line scans at most one block. The index
+    remembers the inode, mtime and size it was built for plus a fingerprint of
+    the last indexed bytes; when a file only grew (appended logs) it is extended
+    from where it stopped instead of being rebuilt.
+    """
+
+    block_size: int = 64 * 1024
+    _fingerprint_size: int = 64
+
+    def __init__(self, stat: os.stat_result):
+        self.inode = stat.st_ino
+        self.mtime_ns = stat.st_mtime_ns
+        self.size = 0
+        self.newlines = 0
+        self._ends_with_newline = True
+        self._fingerprint = b""
+        self._lines = array("q")
+        self._offsets = array("q")
+
+    @property
+    def line_count(self) -> int:
+        if self.size == 0 or self._ends_with_newline:
+            return self.newlines
+        return self.newlines + 1
+
+    def is_current(self, stat: os.stat_result) -> bool:
+        return (
+            stat.st_ino == self.inode
+            and stat.st_mtime_ns == self.mtime_ns
+            and stat.st_size == self.size
+        )
+
+    def can_extend(self, stat: os.stat_result, mm: mmap.mmap) -> bool:
+        """True if the file looks appended to (same inode, grew, same last bytes)"""
+        if stat.st_ino != self.inode or stat.st_size <= self.size:
+            return False
+        start = self.size - len(self._fingerprint)
+        return mm[start : self.size] == self._fingerprint
+
+    def extend(self, mm: mmap.mmap, stat: os.stat_result) -> None:
+        """Index bytes from the current end up to the file's new size"""
+        size = stat.st_size
+        pos = self.size
+        while pos < size:
+            end = min(size, pos + self.block_size)
+            chunk = mm[pos:end]
+            # checkpoint at the first line starting in this block
+            if pos == 0 or mm[pos - 1] == 0x0A:
+                self._checkpoint(self.newlines, pos)
+            else:
+                newline = chunk.find(b"\n")
+                if newline >= 0 and pos + newline + 1 < size:
+                    self._checkpoint(self.newlines + 1, pos + newline + 1)
+            self.newlines += chunk.count(b"\n")
+            pos = end
+
+        if size:
+            self._ends_with_newline = mm[size - 1] == 0x0A
+            self._fingerprint = mm[max(0, size - self._fingerprint_size) : size]
+        self.size = size
+        self.mtime_ns = stat.st_mtime_ns
+
+    def _checkpoint(self, line: int, offset: int) -> None:
+        if not self._lines or line > self._lines[-1]:
+            self._lines.append(line)
+            self._offsets.append(offset)
+
+    def offset_of(self, mm: mmap.mmap, line: int) -> int:
+        """Byte offset where 0-based `line` starts (file size past the last line)"""
+        if line <= 0:
+            return 0
+        if line >= self.line_count:
+            return self.size
+        i = bisect_right(self._lines, line) - 1
+        pos = self._offsets[i]
+        for _ in range(line - self._lines[i]):
+            pos = mm.find(b"\n", pos, self.size) + 1
+        return pos
+
+
+_cache_lock = threading.Lock()
+_index_cache: "OrderedDict[str, LineIndex]" = OrderedDict()
+_MAX_CACHED_INDEXES = 64
+
+
+def get_line_index(path: str, stat: os.stat_result, mm: mmap.mmap) -> LineIndex:
+    """Cached index for (path, inode, mtime, size), extended or rebuilt as needed"""
+    with _cache_lock:
+        index = _index_cache.get(path)
+        if index is not None:
+            _index_cache.move_to_end(path)
+            if index.is_current(stat):
+                return index
+            if not index.can_extend(stat, mm):
+                index = None
+        if index is None:
+            index = LineIndex(stat)
+            _index_cache[path] = index
+            while len(_index_cache) > _MAX_CACHED_INDEXES:
+                _index_cache.popitem(last=False)
+        index.extend(mm, stat)
+        return index
+
+
+def _cached_index(path: str, stat: os.stat_result) -> Optional[LineIndex]:
+    with _cache_lock:
+        index = _index_cache.get(path)
+    return index if index is not None and index.is_current(stat) else None
+
+
+def _tail_start(mm: mmap.mmap, size: int, count: int) -> int:
+    """Offset of the first of the last `count` lines, scanning backwards"""
+    end = size - 1 if mm[size - 1] == 0x0A else size
+    start = end
+    for _ in range(count):
+        newline = mm.rfind(b"\n", 0, end)
+        if newline < 0:
+            return 0
+        start = newline + 1
+        end = newline
+    return start
+
+
+def _advance(mm: mmap.mmap, pos: int, size: int, lines: int) -> int:
+    """Offset after `lines` more lines starting at `pos`"""
+    for _ in range(lines):
+        newline = mm.find(b"\n", pos, size)
+        if newline < 0:
+            return size
+        pos = newline + 1
+    return pos
+
+
+def read_lines(
+    path: str, offset: int, limit: Optional[int], max_bytes: Optional[int] = None
+) -> Tuple[bytes, Dict[str, Any]]:
+    """Read lines [offset, offset + limit) of a file without loading all of it.
+
+    `offset` is 1-based; a negative offset counts from the end like `tail -n`.
+    Tail reads of files without a current index scan backwards from the end
+    instead of indexing the whole file. Returns the raw bytes and the line range
+    (plus total_lines when known). With `max_bytes` the window is cut after that
+    many bytes, `truncated` is set and end_line is the last line (partly) returned.
+    """
+    path = os.path.realpath(path)
+    with open(path, "rb") as f:
+        stat = os.fstat(f.fileno())
+        if stat.st_size == 0:
+            return b"", {"start_line": 1, "end_line": 0, "total_lines": 0}
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            size = stat.st_size
+            if offset < 0 and _cached_index(path, stat) is None:
+                start = _tail_start(mm, size, -offset)
+                end = size if limit is None else _advance(mm, start, size, limit)
+                data = mm[start:end]
+                return data, {"start_line": None, "end_line": None, "total_lines": None}
+
+            index = get_line_index(path, stat, mm)
+            total = index.line_count
+            first = max(0, total + offset) if offset < 0 else max(0, offset - 1)
+            last = total if limit is None else min(total, first + max(0, limit))
+            start = index.offset_of(mm, first)
+            end = index.offset_of(mm, last) if last > first else start
+            info = {"start_line": first + 1, "end_line": last, "total_lines": total}
+            if max_bytes is not None and end - start > max_bytes:
+                data = mm[start : start + max_bytes]
+                info["end_line"] = first + data.count(b"\n") + (0 if data.endswith(b"\n") else 1)
+                info["truncated"] = True
+                return data, info
+            return mm[start:end], info
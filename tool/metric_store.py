@@ -0,0 +1,457 @@
+"""In-process columnar store for numeric observations (metrics, probe results).
+
+Each series is identified by a metric name and a set of labels and holds
+(timestamp, value) pairs in fixed-size NumPy chunks. Only the newest chunk of
+a series is written to; full chunks are sealed and, with a persistence
+directory, saved as .npy files that are read back through mmap.
+"""
+
+import atexit
+import fnmatch
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from SREgent.config import METRIC_STORE_CONFIG
+from SREgent.logger import logger
+
+
+Labels = Tuple[Tuple[str, str], ...]
+
+AGGREGATIONS = ("mean", "sum", "min", "max", "count", "first", "last", "p50", "p90", "p99")
+
+
+def make_labels(labels: Optional[Dict[str, Any]]) -> Labels:
+    return tuple(sorted((str(k), str(v)) for k, v in (labels or {}).items()))
+
+
+def _series_id(name: str, labels: Labels) -> str:
+    raw = json.dumps([name, labels], ensure_ascii=False)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:20]
+
+
+def _save_npy(path: Path, data: np.ndarray) -> None:
+    """np.save through a temporary file and a rename, so readers never see half a file"""
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            np.save(f, data)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+class _Chunk:
+    """(timestamp, value) rows of one series; column 0 is the time"""
+
+    __slots__ = ("data", "size", "path")
+
+    def __init__(self, data: np.ndarray, size: int, path: Optional[Path] = None):
+        self.data = data
+        self.size = size
+        self.path = path
+
+    @classmethod
+    def empty(cls, capacity: int) -> "_Chunk":
+        return cls(np.empty((capacity, 2), dtype=np.float64), 0)
+
+    @property
+    def full(self) -> bool:
+        return self.size >= len(self.data)
+
+    @property
+    def first_ts(self) -> float:
+        return float(self.data[0, 0])
+
+    @property
+    def last_ts(self) -> float:
+        return float(self.data[self.size - 1, 0])
+
+    def rows(self, start: float, end: float) -> np.ndarray:
+        ts = self.data[: self.size, 0]
+        lo = int(np.searchsorted(ts, start, side="left"))
+        hi = int(np.searchsorted(ts, end, side="right"))
+        return self.data[lo:hi]
+
+
+class Series:
+    """Append-only time series. Timestamps never go backwards: an earlier one
+    is stored as the last timestamp seen."""
+
+    def __init__(self, name: str, labels: Labels, chunk_size: int):
+        self.name = name
+        self.labels = labels
+        self.id = _series_id(name, labels)
+        self.chunk_size = chunk_size
+        self.chunks: List[_Chunk] = []
+        self.points = 0
+        self._last_ts = -np.inf
+
+    @property
+    def label_dict(self) -> Dict[str, str]:
+        return dict(self.labels)
+
+    @property
+    def last(self) -> Optional[Tuple[float, float]]:
+        if not self.chunks or not self.chunks[-1].size:
+            return None
+        chunk = self.chunks[-1]
+        return float(chunk.data[chunk.size - 1, 0]), float(chunk.data[chunk.size - 1, 1])
+
+    @property
+    def first_ts(self) -> Optional[float]:
+        return self.chunks[0].first_ts if self.chunks and self.chunks[0].size else None
+
+    def append(self, ts: float, value: float) -> Optional[_Chunk]:
+        """Add one point; returns the chunk it sealed, if any"""
+        if ts < self._last_ts:
+            ts = self._last_ts
+        self._last_ts = ts
+        if not self.chunks or self.chunks[-1].full:
+            self.chunks.append(_Chunk.empty(self.chunk_size))
+        chunk = self.chunks[-1]
+        chunk.data[chunk.size] = (ts, value)
+        chunk.size += 1
+        self.points += 1
+        return chunk if chunk.full else None
+
+    def slice(self, start: float = -np.inf, end: float = np.inf) -> Tuple[np.ndarray, np.ndarray]:
+        """Copies of the timestamps and values in [start, end]"""
+        parts = [
+            chunk.rows(start, end)
+            for chunk in self.chunks
+            if chunk.size and chunk.last_ts >= start and chunk.first_ts <= end
+        ]
+        if not parts:
+            return np.empty(0), np.empty(0)
+        rows = np.concatenate(parts) if len(parts) > 1 else np.array(parts[0])
+        return rows[:, 0], rows[:, 1]
+
+    def drop_oldest(self) -> _Chunk:
+        chunk = self.chunks.pop(0)
+        self.points -= chunk.size
+        return chunk
+
+
+def downsample(
+    ts: np.ndarray, values: np.ndarray, step: float, agg: str = "mean"
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Aggregate sorted points into buckets of `step` seconds.
+
+    Returns the bucket start times and one value per non-empty bucket.
+    """
+    if agg not in AGGREGATIONS:
+        raise ValueError(f"unknown aggregation {agg!r}; expected one of {', '.join(AGGREGATIONS)}")
+    if not len(ts):
+        return np.empty(0), np.empty(0)
+    buckets = np.floor(ts / step).astype(np.int64)
+    starts = np.flatnonzero(np.concatenate(([True], buckets[1:] != buckets[:-1])))
+    counts = np.diff(np.append(starts, len(values)))
+    if agg == "mean":
+        out = np.add.reduceat(values, starts) / counts
+    elif agg == "sum":
+        out = np.add.reduceat(values, starts)
+    elif agg == "min":
+        out = np.minimum.reduceat(values, starts)
+    elif agg == "max":
+        out = np.maximum.reduceat(values, starts)
+    elif agg == "count":
+        out = counts.astype(np.float64)
+    elif agg == "first":
+        out = values[starts]
+    elif agg == "last":
+        out = values[starts + counts - 1]
+    else:
+        q = float(agg[1:])
+        out = np.array([np.percentile(part, q) for part in np.split(values, starts[1:])])
+    return buckets[starts] * step, out
+
+
+def summarize(ts: np.ndarray, values: np.ndarray) -> Dict[str, Any]:
+    """Summary statistics of one slice; `rate` is the change per second from first to last point"""
+    if not len(values):
+        return {"count": 0}
+    p50, p90, p99 = np.percentile(values, (50, 90, 99))
+    span = float(ts[-1] - ts[0])
+    return {
+        "count": int(len(values)),
+        "min": float(values.min()),
+        "max": float(values.max()),
+        "mean": float(values.mean()),
+        "p50": float(p50),
+        "p90": float(p90),
+        "p99": float(p99),
+        "first": float(values[0]),
+        "last": float(values[-1]),
+        "start": float(ts[0]),
+        "end": float(ts[-1]),
+        "rate": float(values[-1] - values[0]) / span if span > 0 else None,
+    }
+
+
+class MetricStore:
+    """Series keyed by (name, labels), with retention and optional persistence.
+
+    - `chunk_size`: points per chunk
+    - `max_points_per_series`: oldest chunks are dropped beyond it
+    - `max_series`: at the limit, series without a point in the last `series_ttl`
+      seconds are evicted; if none are, appends creating more series are dropped
+      (counted in `dropped_series`)
+    - `persist_dir`: sealed chunks are saved there and mmapped back; `flush()`
+      also saves the open chunks, and a new store on the same directory loads them
+    """
+
+    def __init__(
+        self,
+        chunk_size: int = 4096,
+        max_points_per_series: int = 1_000_000,
+        max_series: int = 10000,
+        persist_dir: Optional[str] = None,
+        series_ttl: Optional[float] = 3600.0,
+    ):
+        self.chunk_size = chunk_size
+        self.max_points_per_series = max_points_per_series
+        self.max_series = max_series
+        self.persist_dir = Path(persist_dir) if persist_dir else None
+        self.series_ttl = series_ttl
+        self.dropped_series = 0
+        self.evicted_series = 0
+        # no series can be stale before this time; saves a sweep per refused series
+        self._next_eviction = -np.inf
+
+        self._series: Dict[Tuple[str, Labels], Series] = {}
+        self._lock = threading.Lock()
+        self._index_dirty = False
+        if self.persist_dir is not None:
+            self._load()
+
+    @classmethod
+    def from_config(cls) -> "MetricStore":
+        return cls(
+            chunk_size=METRIC_STORE_CONFIG["CHUNK_SIZE"],
+            max_points_per_series=METRIC_STORE_CONFIG["MAX_POINTS_PER_SERIES"],
+            max_series=METRIC_STORE_CONFIG["MAX_SERIES"],
+            persist_dir=METRIC_STORE_CONFIG["PERSIST_DIR"],
+            series_ttl=METRIC_STORE_CONFIG["SERIES_TTL"],
+        )
+
+    def __len__(self) -> int:
+        return len(self._series)
+
+    # -------- writing --------
+
+    def append(
+        self,
+        name: str,
+        value: float,
+        labels: Optional[Dict[str, Any]] = None,
+        ts: Optional[float] = None,
+    ) -> bool:
+        """Add one point (at `ts`, default now); False if the series limit dropped it"""
+        return self.append_many([(name, labels, value)], ts) == 1
+
+    def append_many(
+        self,
+        points: Iterable[Tuple[str, Optional[Dict[str, Any]], float]],
+        ts: Optional[float] = None,
+    ) -> int:
+        """Add (name, labels, value) points sharing one timestamp; returns how many were stored"""
+        ts = time.time() if ts is None else float(ts)
+        stored = 0
+        with self._lock:
+            for name, labels, value in points:
+                series = self._get_or_create(name, make_labels(labels), ts)
+                if series is None:
+                    continue
+                sealed = series.append(ts, float(value))
+                stored += 1
+                if sealed is not None:
+                    self._seal(series, sealed)
+                while series.points > self.max_points_per_series and len(series.chunks) > 1:
+                    self._discard(series.drop_oldest())
+            self._write_index()
+        return stored
+
+    def _get_or_create(self, name: str, labels: Labels, ts: float) -> Optional[Series]:
+        series = self._series.get((name, labels))
+        if series is None:
+            if len(self._series) >= self.max_series and not self._evict_stale(ts):
+                self.dropped_series += 1
+                return None
+            series = Series(name, labels, self.chunk_size)
+            self._series[(name, labels)] = series
+            self._index_dirty = True
+        return series
+
+    def _evict_stale(self, now: float) -> int:
+        """Remove the series with no point since `now - series_ttl`; returns how many"""
+        if self.series_ttl is None or now < self._next_eviction:
+            return 0
+        cutoff = now - self.series_ttl
+        stale = [key for key, series in self._series.items() if series._last_ts < cutoff]
+        for key in stale:
+            series = self._series.pop(key)
+            for chunk in series.chunks:
+                self._discard(chunk)
+            if self.persist_dir is not None:
+                directory = self._series_dir(series)
+                (directory / "open.npy").unlink(missing_ok=True)
+                try:
+                    directory.rmdir()
+                except OSError:
+                    pass
+        if stale:
+            self.evicted_series += len(stale)
+            self._index_dirty = True
+            logger.info(f"Evicted {len(stale)} metric series with no points in the last {self.series_ttl:g}s")
+        oldest = min((series._last_ts for series in self._series.values()), default=now)
+        self._next_eviction = oldest + self.series_ttl
+        return len(stale)
+
+    # -------- reading --------
+
+    def select(self, name: str = "*", labels: Optional[Dict[str, Any]] = None) -> List[Series]:
+        """Series whose name matches the glob `name` and that carry all of `labels`
+        (label values are globs too)"""
+        wanted = make_labels(labels)
+        with self._lock:
+            candidates = list(self._series.values())
+        selected = []
+        for series in candidates:
+            if not fnmatch.fnmatchcase(series.name, name):
+                continue
+            have = series.label_dict
+            if all(k in have and fnmatch.fnmatchcase(have[k], v) for k, v in wanted):
+                selected.append(series)
+        return sorted(selected, key=lambda s: (s.name, s.labels))
+
+    def slice(
+        self, series: Series, start: float = -np.inf, end: float = np.inf
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        with self._lock:
+            return series.slice(start, end)
+
+    def names(self) -> List[str]:
+        with self._lock:
+            return sorted({name for name, _ in self._series})
+
+    # -------- persistence --------
+
+    def _series_dir(self, series: Series) -> Path:
+        return self.persist_dir / series.id
+
+    def _seal(self, series: Series, chunk: _Chunk) -> None:
+        if self.persist_dir is None:
+            return
+        directory = self._series_dir(series)
+        path = directory / f"{int(chunk.first_ts * 1e6):020d}.npy"
+        try:
+            directory.mkdir(parents=True, exist_ok=True)
+            _save_npy(path, chunk.data)
+            (directory / "open.npy").unlink(missing_ok=True)
+            # the in-memory copy is replaced by a read-only mapping of the file
+            chunk.data = np.load(path, mmap_mode="r")
+            chunk.path = path
+        except OSError as e:
+            logger.warning(f"Could not persist metric chunk for {series.name}: {e}")
+
+    def _discard(self, chunk: _Chunk) -> None:
+        if chunk.path is not None:
+            try:
+                chunk.path.unlink(missing_ok=True)
+            except OSError:
+                pass
+
+    def _write_index(self) -> None:
+        if self.persist_dir is None or not self._index_dirty:
+            return
+        index = {s.id: {"name": s.name, "labels": s.label_dict} for s in self._series.values()}
+        try:
+            self.persist_dir.mkdir(parents=True, exist_ok=True)
+            tmp = self.persist_dir / "index.json.tmp"
+            tmp.write_text(json.dumps(index, ensure_ascii=False), encoding="utf-8")
+            os.replace(tmp, self.persist_dir / "index.json")
+            self._index_dirty = False
+        except OSError as e:
+            logger.warning(f"Could not write metric index in {self.persist_dir}: {e}")
+
+    def flush(self) -> None:
+        """Save the open (not yet full) chunks too, so a restart loses nothing"""
+        if self.persist_dir is None:
+            return
+        with self._lock:
+            self._write_index()
+            for series in self._series.values():
+                if not series.chunks or series.chunks[-1].full or not series.chunks[-1].size:
+                    continue
+                chunk = series.chunks[-1]
+                directory = self._series_dir(series)
+                try:
+                    directory.mkdir(parents=True, exist_ok=True)
+                    _save_npy(directory / "open.npy", chunk.data[: chunk.size])
+                except OSError as e:
+                    logger.warning(f"Could not persist metric chunk for {series.name}: {e}")
+
+    def _load(self) -> None:
+        index_file = self.persist_dir / "index.json"
+        if not index_file.exists():
+            return
+        try:
+            index = json.loads(index_file.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable metric index {index_file}: {e}")
+            return
+        for series_id, meta in index.items():
+            series = Series(meta["name"], make_labels(meta["labels"]), self.chunk_size)
+            directory = self.persist_dir / series_id
+            for path in sorted(directory.glob("[0-9]*.npy")):
+                try:
+                    data = np.load(path, mmap_mode="r")
+                except (OSError, ValueError) as e:
+                    logger.warning(f"Ignoring unreadable metric chunk {path}: {e}")
+                    continue
+                series.chunks.append(_Chunk(data, len(data), path))
+                series.points += len(data)
+                series._last_ts = float(data[-1, 0])
+            open_file = directory / "open.npy"
+            if open_file.exists():
+                try:
+                    rows = np.load(open_file)
+                    chunk = _Chunk.empty(self.chunk_size)
+                    count = min(len(rows), self.chunk_size)
+                    chunk.data[:count] = rows[:count]
+                    chunk.size = count
+                    series.chunks.append(chunk)
+                    series.points += count
+                    if count:
+                        series._last_ts = float(chunk.data[count - 1, 0])
+                except (OSError, ValueError) as e:
+                    logger.warning(f"Ignoring unreadable metric chunk {open_file}: {e}")
+            if series.chunks:
+                self._series[(series.name, series.labels)] = series
+
+
+_store: Optional[MetricStore] = None
+_store_lock = threading.Lock()
+
+
+def get_metric_store() -> MetricStore:
+    """The store shared by all tools in this process"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = MetricStore.from_config()
+            if _store.persist_dir is not None:
+                atexit.register(_store.flush)
+        return _store
@@ -0,0 +1,160 @@
+import json
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from SREgent.exceptions import ToolError
+from SREgent.tool.base import BaseTool, ToolResult
+from SREgent.tool.metric_store import AGGREGATIONS, downsample, get_metric_store, summarize
+
+
+_METRICS_QUERY_DESCRIPTION = """Query the metrics recorded by the other tools (eBPF probe results, command timings, collector snapshots) instead of re-running commands.
+* `list`: series names and labels with their point counts and last values
+* `aggregate`: count/min/max/mean/p50/p90/p99/first/last/rate per series over a time range; with `compare_offset` the same range that many seconds earlier is summarized too, e.g. p99 now vs 5 minutes ago
+* `range`: the points downsampled into `step`-second buckets with `agg`
+* `name` is a glob (`ebpf.*`), `labels` values are globs too; times are epoch seconds, or use `since` for the last N seconds
+"""
+
+_MAX_SERIES = 50
+_MAX_POINTS = 200
+
+
+def _round(value: Any) -> Any:
+    if isinstance(value, float):
+        return round(value, 6) if np.isfinite(value) else None
+    return value
+
+
+class MetricsQuery(BaseTool):
+    """A tool for reading aggregates out of the shared metric store"""
+
+    name: str = "metrics_query"
+    description: str = _METRICS_QUERY_DESCRIPTION
+    parameters: dict = {
+        "type": "object",
+        "properties": {
+            "action": {
+                "type": "string",
+                "enum": ["list", "aggregate", "range"],
+                "description": "What to return (default `aggregate`)",
+            },
+            "name": {
+                "type": "string",
+                "description": "Metric name glob, e.g. `ebpf.usecs.p99` or `bash.*` (default `*`)",
+            },
+            "labels": {
+                "type": "object",
+                "description": "Label filters, e.g. {\"key\": \"sda\"}; values may be globs",
+            },
+            "since": {
+                "type": "number",
+                "description": "Only the last N seconds (instead of `start`/`end`)",
+            },
+            "start": {"type": "number", "description": "Range start, epoch seconds"},
+            "end": {"type": "number", "description": "Range end, epoch seconds"},
+            "step": {
+                "type": "number",
+                "description": "`range` bucket size in seconds (default: chosen to return at most 200 points)",
+            },
+            "agg": {
+                "type": "string",
+                "enum": list(AGGREGATIONS),
+                "description": "`range` aggregation per bucket (default `mean`)",
+            },
+            "compare_offset": {
+                "type": "number",
+                "description": "`aggregate`: also summarize the range shifted this many seconds back",
+            },
+            "limit": {
+                "type": "integer",
+                "description": f"Maximum series returned (default {_MAX_SERIES})",
+                "minimum": 1,
+            },
+        },
+    }
+
+    async def execute(
+        self,
+        action: str = "aggregate",
+        name: str = "*",
+        labels: Optional[Dict[str, Any]] = None,
+        since: Optional[float] = None,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        step: Optional[float] = None,
+        agg: str = "mean",
+        compare_offset: Optional[float] = None,
+        limit: int = _MAX_SERIES,
+        **kwargs,
+    ) -> ToolResult:
+        store = get_metric_store()
+        selected = store.select(name or "*", labels)
+        if since is not None:
+            end = time.time() if end is None else end
+            start = end - float(since)
+        lo = -np.inf if start is None else float(start)
+        hi = np.inf if end is None else float(end)
+        if lo > hi:
+            raise ToolError("`start` is after `end`.")
+
+        result: Dict[str, Any] = {"ok": True, "matched": len(selected), "series": []}
+        if len(selected) > limit:
+            result["truncated"] = True
+        series_out: List[Dict[str, Any]] = result["series"]
+
+        if action == "list":
+            for series in selected[:limit]:
+                last = series.last
+                series_out.append({
+                    "name": series.name,
+                    "labels": series.label_dict,
+                    "points": series.points,
+                    "first_ts": series.first_ts,
+                    "last_ts": last[0] if last else None,
+                    "last": _round(last[1]) if last else None,
+                })
+        elif action == "aggregate":
+            for series in selected[:limit]:
+                item = {
+                    "name": series.name,
+                    "labels": series.label_dict,
+                    **{k: _round(v) for k, v in summarize(*store.slice(series, lo, hi)).items()},
+                }
+                if compare_offset:
+                    offset = float(compare_offset)
+                    previous = summarize(*store.slice(series, lo - offset, hi - offset))
+                    item["previous"] = {k: _round(v) for k, v in previous.items()}
+                    if previous["count"] and item["count"]:
+                        item["change"] = {
+                            k: _round(item[k] - previous[k]) for k in ("mean", "p50", "p90", "p99", "max")
+                        }
+                series_out.append(item)
+        elif action == "range":
+            if agg not in AGGREGATIONS:
+                raise ToolError(f"Unknown `agg` {agg!r}; use one of {', '.join(AGGREGATIONS)}")
+            for series in selected[:limit]:
+                ts, values = store.slice(series, lo, hi)
+                bucket = step
+                if not bucket:
+                    span = float(ts[-1] - ts[0]) if len(ts) else 0.0
+                    bucket = max(span / (_MAX_POINTS - 1), 1e-3) if len(ts) > _MAX_POINTS else None
+                if bucket:
+                    ts, values = downsample(ts, values, float(bucket), agg)
+                if len(ts) > _MAX_POINTS:
+                    ts, values = ts[-_MAX_POINTS:], values[-_MAX_POINTS:]
+                    result["truncated"] = True
+                series_out.append({
+                    "name": series.name,
+                    "labels": series.label_dict,
+                    "step": bucket,
+                    "points": [[_round(float(t)), _round(float(v))] for t, v in zip(ts, values)],
+                })
+        else:
+            raise ToolError(f"Unknown action {action!r}; use list, aggregate or range.")
+
+        if store.dropped_series:
+            result["dropped_series"] = store.dropped_series
+        if store.evicted_series:
+            result["evicted_series"] = store.evicted_series
+        return ToolResult(output=json.dumps(result, ensure_ascii=False))
@@ -0,0 +1,119 @@
+import os
+import tempfile
+from typing import Any, Dict, Optional
+
+from SREgent.config import TOOL_OUTPUT_CONFIG
+
+
+class OutputCapture:
+    """Bounded capture of one command output stream.
+
+    Output is kept in memory up to `max_bytes`. Past that, everything (including
+    what was already buffered) goes to a spill file and only the first
+    `head_bytes` and last `tail_bytes` stay in memory; `text()` then returns the
+    head and tail around a note with the line/byte counts and the spill path, so
+    the agent can page through the rest with `read_file`.
+    """
+
+    def __init__(
+        self,
+        prefix: str = "output",
+        max_bytes: Optional[int] = None,
+        head_bytes: Optional[int] = None,
+        tail_bytes: Optional[int] = None,
+        spill_dir: Optional[str] = None,
+    ):
+        self.prefix = prefix
+        self.max_bytes = TOOL_OUTPUT_CONFIG["MAX_BYTES"] if max_bytes is None else max_bytes
+        self.head_bytes = TOOL_OUTPUT_CONFIG["HEAD_BYTES"] if head_bytes is None else head_bytes
+        self.tail_bytes = TOOL_OUTPUT_CONFIG["TAIL_BYTES"] if tail_bytes is None else tail_bytes
+        self.spill_dir = spill_dir or TOOL_OUTPUT_CONFIG["SPILL_DIR"]
+
+        self.bytes = 0
+        self.spill_path: Optional[str] = None
+        self._newlines = 0
+        self._ends_with_newline = True
+        # the whole output until it is spilled, the head afterwards
+        self._buffer = bytearray()
+        self._tail = bytearray()
+        self._spill = None
+
+    def __enter__(self) -> "OutputCapture":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    @property
+    def truncated(self) -> bool:
+        return self.spill_path is not None
+
+    @property
+    def lines(self) -> int:
+        return self._newlines + (0 if self._ends_with_newline else 1)
+
+    def write(self, data: bytes) -> None:
+        if not data:
+            return
+        self.bytes += len(data)
+        self._newlines += data.count(b"\n")
+        self._ends_with_newline = data.endswith(b"\n")
+
+        if self._spill is None:
+            self._buffer += data
+            if len(self._buffer) > self.max_bytes:
+                self._start_spill()
+            return
+
+        self._spill.write(data)
+        self._tail += data
+        # trim lazily so the tail is not shifted on every small write
+        if len(self._tail) > 2 * self.tail_bytes + 4096:
+            del self._tail[: len(self._tail) - self.tail_bytes]
+
+    def _start_spill(self) -> None:
+        os.makedirs(self.spill_dir, exist_ok=True)
+        self._spill = tempfile.NamedTemporaryFile(
+            mode="wb", prefix=f"{self.prefix}-", suffix=".log", dir=self.spill_dir, delete=False
+        )
+        self.spill_path = self._spill.name
+        self._spill.write(self._buffer)
+        self._tail = self._buffer[len(self._buffer) - self.tail_bytes :] if self.tail_bytes else bytearray()
+        del self._buffer[self.head_bytes :]
+
+    def close(self) -> None:
+        """Flush the spill file (if any); the capture can still be rendered"""
+        if self._spill is not None and not self._spill.closed:
+            self._spill.close()
+
+    def text(self) -> str:
+        """The full output, or head + summary + tail when it was spilled"""
+        if not self.truncated:
+            return self._buffer.decode(errors="replace")
+
+        head = self._buffer.decode(errors="replace")
+        if "\n" in head:
+            head = head[: head.rindex("\n") + 1]
+        tail = bytes(self._tail[len(self._tail) - self.tail_bytes :]) if self.tail_bytes else b""
+        tail = tail.decode(errors="replace")
+        if "\n" in tail[:-1]:
+            tail = tail[tail.index("\n") + 1 :]
+
+        note = (
+            f"... [output truncated: {self.lines} lines, {self.bytes} bytes in total; "
+            f"only the beginning and the end are shown. "
+            f"Full output saved to {self.spill_path}, use read_file with offset/limit "
+            f"to page through it] ..."
+        )
+        if head and not head.endswith("\n"):
+            head += "\n"
+        return f"{head}{note}\n{tail}"
+
+    def summary(self) -> Dict[str, Any]:
+        """Line/byte counts and spill location"""
+        return {
+            "lines": self.lines,
+            "bytes": self.bytes,
+            "truncated": self.truncated,
+            "spill_path": self.spill_path,
+        }
@@ -0,0 +1,695 @@
+"""Cheap /proc and /sys sampling with per-interval deltas.
+
+Every file is opened once and re-read with pread at offset 0 (procfs
+regenerates the content on each read), so a sample costs one syscall per file
+and no process spawns. Rates are computed against the previous sample.
+"""
+
+import asyncio
+import errno
+import heapq
+import json
+import operator
+import os
+import resource
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from SREgent.config import PROC_COLLECTOR_CONFIG
+from SREgent.exceptions import ToolError
+from SREgent.logger import logger
+from SREgent.tool.base import BaseTool, ToolResult
+from SREgent.tool.metric_store import get_metric_store
+
+
+_CLK_TCK = os.sysconf("SC_CLK_TCK")
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+_CPU_FIELDS = ("user", "nice", "system", "idle", "iowait", "irq", "softirq", "steal")
+_MEMINFO_KEYS = {
+    b"MemTotal": "total",
+    b"MemFree": "free",
+    b"MemAvailable": "available",
+    b"Buffers": "buffers",
+    b"Cached": "cached",
+    b"Dirty": "dirty",
+    b"Writeback": "writeback",
+    b"AnonPages": "anon",
+    b"Shmem": "shmem",
+    b"Slab": "slab",
+    b"SwapTotal": "swap_total",
+    b"SwapFree": "swap_free",
+}
+_GONE = (errno.ESRCH, errno.ENOENT)
+
+_PROC_SNAPSHOT_DESCRIPTION = """Sample system and per-process counters straight from /proc and /sys (instead of running top/vmstat/iostat/sar through bash).
+* Returns one compact snapshot with rates over the last `interval` seconds: CPU utilization by mode, context switches, load, memory, per-disk IOPS/throughput/await/util, per-interface network rates, PSI stall percentages, and the top processes by CPU, I/O and RSS
+* `samples` > 1 keeps sampling every `interval` seconds; every sample is recorded in the metric store (`node.*`, `proc.*` per command) for `metrics_query` and `detect_anomalies`
+* `pids` restricts the process section to those PIDs
+"""
+
+
+class _ProcFile:
+    """A /proc or /sys file kept open and re-read with pread"""
+
+    __slots__ = ("fd", "size")
+
+    def __init__(self, path: str, size: int = 4096):
+        self.fd = os.open(path, os.O_RDONLY | os.O_CLOEXEC)
+        self.size = size
+
+    def read(self) -> bytes:
+        while True:
+            data = os.pread(self.fd, self.size, 0)
+            if len(data) < self.size:
+                return data
+            # did not fit: grow the buffer and read again from the start
+            self.size *= 2
+
+    def close(self) -> None:
+        try:
+            os.close(self.fd)
+        except OSError:
+            pass
+
+
+def _read_once(path: str) -> bytes:
+    fd = os.open(path, os.O_RDONLY | os.O_CLOEXEC)
+    try:
+        chunks = []
+        while True:
+            chunk = os.read(fd, 65536)
+            if not chunk:
+                return b"".join(chunks)
+            chunks.append(chunk)
+    finally:
+        os.close(fd)
+
+
+def _rate(new: float, old: Optional[float], seconds: float) -> Optional[float]:
+    if old is None or seconds <= 0:
+        return None
+    # counters can wrap or reset (device re-attached); report 0 instead of a negative rate
+    return max(0.0, new - old) / seconds
+
+
+def _r(value: Optional[float], digits: int = 2) -> Optional[float]:
+    return None if value is None else round(value, digits)
+
+
+# -------- parsers --------
+
+
+def parse_stat(data: bytes) -> Dict[str, Any]:
+    cpus: Dict[str, Tuple[int, ...]] = {}
+    counters: Dict[str, int] = {}
+    for line in data.split(b"\n"):
+        if line.startswith(b"cpu"):
+            parts = line.split()
+            cpus[parts[0].decode()] = tuple(int(v) for v in parts[1:9])
+        elif line:
+            key, _, value = line.partition(b" ")
+            if key in (b"ctxt", b"intr", b"processes", b"procs_running", b"procs_blocked"):
+                counters[key.decode()] = int(value.split(None, 1)[0])
+    return {"cpus": cpus, **counters}
+
+
+def parse_meminfo(data: bytes) -> Dict[str, int]:
+    """Selected fields, in kB"""
+    out = {}
+    for line in data.split(b"\n"):
+        key, _, value = line.partition(b":")
+        name = _MEMINFO_KEYS.get(key)
+        if name is not None:
+            out[name] = int(value.split()[0])
+    return out
+
+
+def parse_diskstats(data: bytes) -> Dict[str, Tuple[int, ...]]:
+    """name -> (reads, sectors read, ms reading, writes, sectors written, ms writing, in flight, ms busy, weighted ms)"""
+    out = {}
+    for line in data.split(b"\n"):
+        parts = line.split()
+        if len(parts) < 14:
+            continue
+        f = [int(v) for v in parts[3:14]]
+        out[parts[2].decode()] = (f[0], f[2], f[3], f[4], f[6], f[7], f[8], f[9], f[10])
+    return out
+
+
+def parse_net_dev(data: bytes) -> Dict[str, Tuple[int, ...]]:
+    """iface -> (rx bytes, rx packets, rx errs, rx drop, tx bytes, tx packets, tx errs, tx drop)"""
+    out = {}
+    for line in data.split(b"\n")[2:]:
+        name, sep, rest = line.partition(b":")
+        if not sep:
+            continue
+        f = [int(v) for v in rest.split()]
+        out[name.strip().decode()] = (f[0], f[1], f[2], f[3], f[8], f[9], f[10], f[11])
+    return out
+
+
+def parse_pressure(data: bytes) -> Dict[str, Dict[str, float]]:
+    """{"some": {"avg10": .., "total": usec}, "full": {...}}"""
+    out = {}
+    for line in data.split(b"\n"):
+        parts = line.split()
+        if not parts:
+            continue
+        fields = dict(part.split(b"=", 1) for part in parts[1:])
+        out[parts[0].decode()] = {
+            "avg10": float(fields[b"avg10"]),
+            "total": int(fields[b"total"]),
+        }
+    return out
+
+
+def parse_pid_io(data: bytes) -> Tuple[int, int]:
+    """(read_bytes, write_bytes): bytes fetched from / sent to the storage layer"""
+    return _field(data, b"\nread_bytes:"), _field(data, b"\nwrite_bytes:")
+
+
+def _field(data: bytes, key: bytes) -> int:
+    start = data.find(key)
+    if start < 0:
+        return 0
+    start += len(key)
+    end = data.find(b"\n", start)
+    return int(data[start:end if end >= 0 else None].split()[0])
+
+
+def parse_pid_status(data: bytes) -> Tuple[int, int, int]:
+    """(voluntary ctxt switches, involuntary ctxt switches, swap kB)"""
+    return (
+        _field(data, b"\nvoluntary_ctxt_switches:"),
+        _field(data, b"\nnonvoluntary_ctxt_switches:"),
+        _field(data, b"\nVmSwap:"),
+    )
+
+
+# -------- processes --------
+
+
+class _Pid:
+    """Open files, last stat line and counters of one process"""
+
+    __slots__ = (
+        "pid", "stat", "io", "status", "start", "data", "state", "rss",
+        "counters", "last", "io_denied",
+    )
+
+    def __init__(self, pid: int):
+        self.pid = pid
+        self.stat: Optional[_ProcFile] = None
+        self.io: Optional[_ProcFile] = None
+        self.status: Optional[_ProcFile] = None
+        self.start: Optional[int] = None
+        self.data = b""
+        self.state = b"?"
+        self.rss = 0
+        # (cpu ticks, major faults, read bytes, write bytes, ctxt switches, swap kB)
+        # now and at the previous sample
+        self.counters: Optional[Tuple[Any, ...]] = None
+        self.last: Optional[Tuple[Any, ...]] = None
+        self.io_denied = False
+
+    @property
+    def fds(self) -> int:
+        return sum(f is not None for f in (self.stat, self.io, self.status))
+
+    def close(self) -> None:
+        for f in (self.stat, self.io, self.status):
+            if f is not None:
+                f.close()
+        self.stat = self.io = self.status = None
+
+
+class ProcCollector:
+    """Samples /proc and /sys; each `sample()` returns rates since the previous one.
+
+    File descriptors stay open for the system files and for up to
+    `max_open_fds` per-process files; past that budget files are read with
+    open/read/close. A process that used no CPU tick and took no major fault
+    since the previous sample is treated as idle: only its stat file is read
+    and its I/O and context-switch rates are reported as 0.
+    """
+
+    def __init__(
+        self,
+        proc: str = "/proc",
+        sys: str = "/sys",
+        pid_status: Optional[bool] = None,
+        max_open_fds: Optional[int] = None,
+    ):
+        self.proc = proc
+        self.sys = sys
+        self.pid_status = PROC_COLLECTOR_CONFIG["PID_STATUS"] if pid_status is None else pid_status
+        soft_limit = resource.getrlimit(resource.RLIMIT_NOFILE)[0]
+        budget = PROC_COLLECTOR_CONFIG["MAX_OPEN_FDS"] if max_open_fds is None else max_open_fds
+        if soft_limit != resource.RLIM_INFINITY:
+            budget = min(budget, soft_limit // 2)
+        self.max_open_fds = budget
+
+        self._files: Dict[str, _ProcFile] = {}
+        for name in ("stat", "meminfo", "diskstats", "net/dev", "loadavg",
+                     "pressure/cpu", "pressure/memory", "pressure/io"):
+            try:
+                self._files[name] = _ProcFile(f"{proc}/{name}", 16384 if name == "stat" else 4096)
+            except OSError:
+                # e.g. no PSI on kernels before 4.20 or with psi=0
+                pass
+        self._disks = self._whole_disks()
+        self._pids: Dict[int, _Pid] = {}
+        self._open_fds = 0
+        self._prev: Optional[Dict[str, Any]] = None
+        self._prev_time: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def _whole_disks(self) -> Optional[set]:
+        """Devices in /sys/block (partitions are not listed there), minus loop/ram devices"""
+        try:
+            names = os.listdir(f"{self.sys}/block")
+        except OSError:
+            return None
+        return {n for n in names if not n.startswith(("loop", "ram", "zram"))}
+
+    @property
+    def last_sample_age(self) -> Optional[float]:
+        """Seconds since the previous sample, None before the first one"""
+        return None if self._prev_time is None else time.monotonic() - self._prev_time
+
+    def close(self) -> None:
+        with self._lock:
+            for f in self._files.values():
+                f.close()
+            self._files.clear()
+            for entry in self._pids.values():
+                entry.close()
+            self._pids.clear()
+            self._open_fds = 0
+
+    # -------- sampling --------
+
+    def sample(self, top_n: int = 10, pids: Optional[List[int]] = None) -> Dict[str, Any]:
+        """Read everything once and return the snapshot (rates need a previous sample)"""
+        with self._lock:
+            started = time.perf_counter()
+            now = time.monotonic()
+            raw: Dict[str, Any] = {}
+            for name, f in self._files.items():
+                try:
+                    raw[name] = f.read()
+                except OSError as e:
+                    logger.debug(f"Cannot read {self.proc}/{name}: {e}")
+
+            cur: Dict[str, Any] = {
+                "stat": parse_stat(raw["stat"]) if "stat" in raw else None,
+                "disks": parse_diskstats(raw["diskstats"]) if "diskstats" in raw else {},
+                "net": parse_net_dev(raw["net/dev"]) if "net/dev" in raw else {},
+                "pressure": {
+                    name.split("/")[1]: parse_pressure(raw[name])
+                    for name in ("pressure/cpu", "pressure/memory", "pressure/io")
+                    if name in raw
+                },
+            }
+            prev = self._prev or {}
+            seconds = now - self._prev_time if self._prev_time is not None else 0.0
+
+            snapshot: Dict[str, Any] = {
+                "ts": time.time(),
+                "interval_s": round(seconds, 3) if self._prev is not None else None,
+            }
+            snapshot["cpu"] = self._cpu(cur["stat"], prev.get("stat"), seconds)
+            if "loadavg" in raw:
+                snapshot["load"] = [float(v) for v in raw["loadavg"].split()[:3]]
+            if "meminfo" in raw:
+                snapshot["memory"] = self._memory(parse_meminfo(raw["meminfo"]))
+            snapshot["disks"] = self._disk_rates(cur["disks"], prev.get("disks", {}), seconds)
+            snapshot["net"] = self._net_rates(cur["net"], prev.get("net", {}), seconds)
+            snapshot["pressure"] = self._pressure(cur["pressure"], prev.get("pressure", {}), seconds)
+            snapshot["processes"] = self._processes(seconds, top_n, pids)
+
+            self._prev, self._prev_time = cur, now
+            snapshot["collect_ms"] = round((time.perf_counter() - started) * 1000, 2)
+            return snapshot
+
+    def _cpu(self, cur: Optional[Dict[str, Any]], prev: Optional[Dict[str, Any]], seconds: float) -> Dict[str, Any]:
+        if cur is None:
+            return {}
+        out: Dict[str, Any] = {
+            "count": sum(1 for name in cur["cpus"] if name != "cpu"),
+            "running": cur.get("procs_running"),
+            "blocked": cur.get("procs_blocked"),
+        }
+        if prev is None or seconds <= 0:
+            return out
+
+        def util(name: str) -> Optional[Dict[str, float]]:
+            new, old = cur["cpus"].get(name), prev["cpus"].get(name)
+            if new is None or old is None:
+                return None
+            delta = [max(0, a - b) for a, b in zip(new, old)]
+            total = sum(delta)
+            if not total:
+                return None
+            pct = {field: 100.0 * d / total for field, d in zip(_CPU_FIELDS, delta)}
+            pct["util"] = 100.0 - pct["idle"] - pct["iowait"]
+            return pct
+
+        overall = util("cpu")
+        if overall is not None:
+            for field in ("util", "user", "system", "iowait", "irq", "softirq", "steal"):
+                out[f"{field}_pct"] = _r(overall[field] + (overall["nice"] if field == "user" else 0.0))
+        per_cpu = [(name[3:], util(name)) for name in cur["cpus"] if name != "cpu"]
+        busiest = sorted(((n, u["util"]) for n, u in per_cpu if u), key=lambda x: x[1], reverse=True)
+        out["busiest"] = [[n, _r(u)] for n, u in busiest[:4]]
+        for key in ("ctxt", "intr", "processes"):
+            if key in cur and key in prev:
+                label = "forks" if key == "processes" else key
+                out[f"{label}_per_s"] = _r(_rate(cur[key], prev[key], seconds), 1)
+        return out
+
+    @staticmethod
+    def _memory(mem: Dict[str, int]) -> Dict[str, Any]:
+        mb = lambda kb: round(kb / 1024, 1)  # noqa: E731
+        out = {f"{name}_mb": mb(value) for name, value in mem.items() if name not in ("swap_total", "swap_free")}
+        if "total" in mem and "available" in mem and mem["total"]:
+            out["used_pct"] = round(100.0 * (1 - mem["available"] / mem["total"]), 2)
+        if "swap_total" in mem:
+            out["swap_used_mb"] = mb(mem["swap_total"] - mem.get("swap_free", 0))
+        return out
+
+    def _disk_rates(self, cur, prev, seconds: float) -> List[Dict[str, Any]]:
+        if self._disks is not None and any(name not in self._disks for name in cur):
+            self._disks = self._whole_disks()
+        out = []
+        for name, new in cur.items():
+            old = prev.get(name)
+            if old is None or seconds <= 0 or (self._disks is not None and name not in self._disks):
+                continue
+            d = [max(0, a - b) for a, b in zip(new, old)]
+            ios = d[0] + d[3]
+            if not ios and not d[7]:
+                continue
+            out.append({
+                "device": name,
+                "reads_per_s": _r(d[0] / seconds, 1),
+                "writes_per_s": _r(d[3] / seconds, 1),
+                "read_kb_per_s": _r(d[1] * 512 / 1024 / seconds, 1),
+                "write_kb_per_s": _r(d[4] * 512 / 1024 / seconds, 1),
+                "await_ms": _r((d[2] + d[5]) / ios) if ios else None,
+                "util_pct": _r(min(100.0, d[7] / (seconds * 10))),
+                "queue": _r(d[8] / (seconds * 1000)),
+                "in_flight": new[6],
+            })
+        return sorted(out, key=lambda x: x["util_pct"], reverse=True)
+
+    @staticmethod
+    def _net_rates(cur, prev, seconds: float) -> List[Dict[str, Any]]:
+        out = []
+        for name, new in cur.items():
+            old = prev.get(name)
+            if old is None or seconds <= 0:
+                continue
+            d = [max(0, a - b) / seconds for a, b in zip(new, old)]
+            if not any(d):
+                continue
+            out.append({
+                "iface": name,
+                "rx_kb_per_s": _r(d[0] / 1024, 1),
+                "tx_kb_per_s": _r(d[4] / 1024, 1),
+                "rx_pkts_per_s": _r(d[1], 1),
+                "tx_pkts_per_s": _r(d[5], 1),
+                "errors_per_s": _r(d[2] + d[6], 1),
+                "drops_per_s": _r(d[3] + d[7], 1),
+            })
+        return sorted(out, key=lambda x: x["rx_kb_per_s"] + x["tx_kb_per_s"], reverse=True)
+
+    @staticmethod
+    def _pressure(cur, prev, seconds: float) -> Dict[str, Any]:
+        out = {}
+        for resource_name, kinds in cur.items():
+            item = {}
+            for kind, values in kinds.items():
+                item[f"{kind}_avg10"] = values["avg10"]
+                old = prev.get(resource_name, {}).get(kind)
+                if old is not None and seconds > 0:
+                    # total is in microseconds of stall
+                    item[f"{kind}_pct"] = _r(min(100.0, (values["total"] - old["total"]) / (seconds * 1e4)))
+            out[resource_name] = item
+        return out
+
+    # -------- processes --------
+
+    def _read_pid_file(self, entry: _Pid, name: str, size: int, keep: bool = True) -> bytes:
+        """Read through the kept-open file, opening it if `keep` and the fd budget allows"""
+        f = getattr(entry, name)
+        if f is None:
+            path = f"{self.proc}/{entry.pid}/{name}"
+            if not keep or self._open_fds >= self.max_open_fds:
+                return _read_once(path)
+            f = _ProcFile(path, size)
+            setattr(entry, name, f)
+            self._open_fds += 1
+        return f.read()
+
+    def _drop_pid(self, pid: int) -> None:
+        entry = self._pids.pop(pid, None)
+        if entry is not None:
+            self._open_fds -= entry.fds
+            entry.close()
+
+    def _pid_io(self, entry: _Pid, keep: bool) -> Tuple[Optional[int], Optional[int]]:
+        if entry.io_denied:
+            return None, None
+        try:
+            return parse_pid_io(self._read_pid_file(entry, "io", 512, keep))
+        except PermissionError:
+            # other users' processes without CAP_SYS_PTRACE; not retried
+            entry.io_denied = True
+            return None, None
+
+    def _pid_status(self, entry: _Pid, keep: bool) -> Tuple[Optional[int], int]:
+        if not self.pid_status:
+            return None, 0
+        voluntary, involuntary, swap = parse_pid_status(
+            self._read_pid_file(entry, "status", 2048, keep)
+        )
+        return voluntary + involuntary, swap
+
+    def _processes(self, seconds: float, top_n: int, only: Optional[List[int]]) -> Dict[str, Any]:
+        try:
+            listed = {int(name) for name in os.listdir(self.proc) if name.isdigit()}
+        except OSError:
+            return {}
+        if only:
+            listed &= set(only)
+        for pid in [pid for pid in self._pids if pid not in listed]:
+            self._drop_pid(pid)
+
+        samples = []
+        states: Dict[bytes, int] = {}
+        gone = []
+        for pid in listed:
+            entry = self._pids.get(pid)
+            if entry is None:
+                entry = self._pids[pid] = _Pid(pid)
+            try:
+                data = self._read_pid_file(entry, "stat", 1024)
+                if data == entry.data:
+                    # byte-identical stat line: the process did not run since the last sample
+                    entry.last = entry.counters
+                    states[entry.state] = states.get(entry.state, 0) + 1
+                    samples.append((0, 0, entry.rss, pid))
+                    continue
+                close = data.rfind(b")")
+                if close < 0:
+                    gone.append(pid)
+                    continue
+                f = data[close + 2 :].split()
+                # f[0] is field 3 (state) of proc(5)
+                start = int(f[19])
+                if entry.start != start:
+                    # new process (or a reused PID): nothing to diff against
+                    entry.start, entry.counters = start, None
+                ticks = int(f[11]) + int(f[12])
+                majflt = int(f[9])
+                prev = entry.counters
+                if prev is None or ticks != prev[0] or majflt != prev[1]:
+                    # first reads are only a baseline; fds are kept for processes seen active
+                    read_bytes, write_bytes = self._pid_io(entry, keep=prev is not None)
+                    ctxsw, swap = self._pid_status(entry, keep=prev is not None)
+                else:
+                    # no CPU tick and no major fault since the last sample: skip the
+                    # io/status reads (most processes are idle) and keep their counters
+                    read_bytes, write_bytes, ctxsw, swap = prev[2:]
+            except OSError as e:
+                if e.errno in _GONE or isinstance(e, PermissionError):
+                    gone.append(pid)
+                    continue
+                raise
+            entry.data, entry.state, entry.rss = data, f[0], int(f[21]) * _PAGE_SIZE
+            entry.last = prev
+            entry.counters = (ticks, majflt, read_bytes, write_bytes, ctxsw, swap)
+            states[f[0]] = states.get(f[0], 0) + 1
+            cpu = io = 0
+            if prev is not None:
+                cpu = ticks - prev[0]
+                if read_bytes is not None and prev[2] is not None:
+                    io = read_bytes - prev[2] + write_bytes - prev[3]
+            samples.append((cpu, io, entry.rss, pid))
+        for pid in gone:
+            self._drop_pid(pid)
+
+        def top(key: int) -> List[Dict[str, Any]]:
+            ranked = heapq.nlargest(top_n, samples, key=operator.itemgetter(key))
+            return [self._pid_row(sample, seconds) for sample in ranked if sample[key] > 0]
+
+        return {
+            "count": len(samples),
+            "states": {state.decode(): count for state, count in states.items()},
+            "open_fds": self._open_fds,
+            "top_cpu": top(0),
+            "top_io": top(1),
+            "top_rss": top(2),
+        }
+
+    def _pid_row(self, sample, seconds: float) -> Dict[str, Any]:
+        entry = self._pids[sample[3]]
+        data, prev, cur = entry.data, entry.last, entry.counters
+        close = data.rfind(b")")
+        row: Dict[str, Any] = {
+            "pid": entry.pid,
+            "comm": data[data.find(b"(") + 1 : close].decode("utf-8", errors="replace"),
+            "state": entry.state.decode(),
+            "threads": int(data[close + 2 :].split()[17]),
+            "rss_mb": round(entry.rss / 1048576, 1),
+        }
+        if prev is not None and seconds > 0:
+            row["cpu_pct"] = _r(100.0 * max(0, cur[0] - prev[0]) / _CLK_TCK / seconds)
+            row["majflt_per_s"] = _r(_rate(cur[1], prev[1], seconds), 1)
+            if cur[2] is not None and prev[2] is not None:
+                row["read_kb_per_s"] = _r(_rate(cur[2], prev[2], seconds) / 1024, 1)
+                row["write_kb_per_s"] = _r(_rate(cur[3], prev[3], seconds) / 1024, 1)
+            if cur[4] is not None and prev[4] is not None:
+                row["ctxsw_per_s"] = _r(_rate(cur[4], prev[4], seconds), 1)
+        if cur[5]:
+            row["swap_mb"] = round(cur[5] / 1024, 1)
+        return row
+
+
+def record_snapshot(snapshot: Dict[str, Any]) -> int:
+    """Store a snapshot's rates as `node.*` / `proc.*` series; returns the points stored"""
+    points: List[Tuple[str, Optional[Dict[str, str]], float]] = []
+    for key, value in snapshot.get("cpu", {}).items():
+        if isinstance(value, (int, float)) and key != "count":
+            points.append((f"node.cpu.{key}", None, value))
+    for i, value in enumerate(snapshot.get("load", [])):
+        points.append(("node.load", {"window": ("1m", "5m", "15m")[i]}, value))
+    for key, value in snapshot.get("memory", {}).items():
+        points.append((f"node.memory.{key}", None, value))
+    for disk in snapshot.get("disks", []):
+        labels = {"device": disk["device"]}
+        points.extend(
+            (f"node.disk.{k}", labels, v) for k, v in disk.items() if k != "device" and v is not None
+        )
+    for net in snapshot.get("net", []):
+        labels = {"iface": net["iface"]}
+        points.extend((f"node.net.{k}", labels, v) for k, v in net.items() if k != "iface")
+    for resource_name, item in snapshot.get("pressure", {}).items():
+        for key, value in item.items():
+            points.append((f"node.pressure.{key}", {"resource": resource_name}, value))
+    processes = snapshot.get("processes", {})
+    if "count" in processes:
+        points.append(("node.processes", None, processes["count"]))
+    # per-command series summed over the listed processes: pids come and go, a
+    # series per pid would grow without bound
+    seen = set()
+    by_comm: Dict[str, Dict[str, float]] = {}
+    for section in ("top_cpu", "top_io", "top_rss"):
+        for row in processes.get(section, []):
+            if row["pid"] in seen:
+                continue
+            seen.add(row["pid"])
+            totals = by_comm.setdefault(row["comm"], {})
+            for key in ("cpu_pct", "rss_mb", "read_kb_per_s", "write_kb_per_s", "majflt_per_s", "ctxsw_per_s"):
+                if row.get(key) is not None:
+                    totals[key] = totals.get(key, 0.0) + row[key]
+    for comm, totals in by_comm.items():
+        labels = {"comm": comm}
+        points.extend((f"proc.{key}", labels, value) for key, value in totals.items())
+    return get_metric_store().append_many(points, snapshot.get("ts"))
+
+
+_collector: Optional[ProcCollector] = None
+_collector_lock = threading.Lock()
+
+
+def get_proc_collector() -> ProcCollector:
+    """The collector shared by all tools in this process, so rates span calls"""
+    global _collector
+    with _collector_lock:
+        if _collector is None:
+            _collector = ProcCollector()
+        return _collector
+
+
+class ProcSnapshot(BaseTool):
+    """A tool for sampling /proc and /sys without spawning processes"""
+
+    name: str = "proc_snapshot"
+    description: str = _PROC_SNAPSHOT_DESCRIPTION
+    parameters: dict = {
+        "type": "object",
+        "properties": {
+            "interval": {
+                "type": "number",
+                "description": "Seconds between samples, i.e. the window the rates cover (default 1)",
+                "minimum": 0.1,
+            },
+            "samples": {
+                "type": "integer",
+                "description": "Number of snapshots to take (default 1); only the last is returned",
+                "minimum": 1,
+            },
+            "top_n": {
+                "type": "integer",
+                "description": "Processes listed per ranking (default 10)",
+                "minimum": 1,
+            },
+            "pids": {
+                "type": "array",
+                "items": {"type": "integer"},
+                "description": "Only report these processes",
+            },
+        },
+    }
+
+    async def execute(
+        self,
+        interval: float = 1.0,
+        samples: int = 1,
+        top_n: int = 10,
+        pids: Optional[List[int]] = None,
+        **kwargs,
+    ) -> ToolResult:
+        interval = max(0.1, float(interval))
+        samples = max(1, int(samples))
+        if interval * samples > PROC_COLLECTOR_CONFIG["MAX_DURATION"]:
+            raise ToolError(
+                f"interval * samples must not exceed {PROC_COLLECTOR_CONFIG['MAX_DURATION']} seconds"
+            )
+        collector = get_proc_collector()
+        # baseline for the first rates, unless the previous call left a fresh enough one
+        age = collector.last_sample_age
+        if age is None or age > interval:
+            await asyncio.to_thread(collector.sample, top_n, pids)
+
+        snapshot: Dict[str, Any] = {}
+        recorded = 0
+        for _ in range(samples):
+            await asyncio.sleep(interval)
+            snapshot = await asyncio.to_thread(collector.sample, top_n, pids)
+            recorded += record_snapshot(snapshot)
+        snapshot["metrics_recorded"] = recorded
+        return ToolResult(output=json.dumps(snapshot, ensure_ascii=False))
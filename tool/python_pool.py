@@ -0,0 +1,307 @@
+import asyncio
+import json
+import os
+import signal
+import sys
+import tempfile
+import weakref
+from typing import Any, Dict, List, Optional, Set
+
+from SREgent.config import PYTHON_POOL_CONFIG, TOOL_OUTPUT_CONFIG
+from SREgent.logger import logger
+from SREgent.tool.output_capture import OutputCapture
+
+
+# Runs inside each worker (python -c). Requests and replies are JSON lines on
+# private copies of fds 0/1; during a call fds 1/2 point at per-call files so
+# prints, C extensions and child processes are all captured.
+_WORKER_SOURCE = r"""
+import importlib, json, os, sys, traceback
+
+def main(options):
+    requests = os.fdopen(os.dup(0), "r", encoding="utf-8")
+    replies = os.fdopen(os.dup(1), "w", encoding="utf-8")
+    null_in = os.open(os.devnull, os.O_RDONLY)
+    null_out = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(null_in, 0)
+    os.dup2(null_out, 1)
+    os.dup2(null_out, 2)
+
+    for name in options["preload"]:
+        try:
+            importlib.import_module(name)
+        except Exception:
+            pass
+    if options["memory_limit"]:
+        import resource
+        limit = int(options["memory_limit"])
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+    base_cwd = os.getcwd()
+    base_env = dict(os.environ)
+    namespace = None
+    replies.write(json.dumps({"ready": True}) + "\n")
+    replies.flush()
+
+    for line in requests:
+        job = json.loads(line)
+        out = open(job["stdout"], "wb")
+        err = open(job["stderr"], "wb")
+        os.dup2(out.fileno(), 1)
+        os.dup2(err.fileno(), 2)
+        if namespace is None or job["reset"]:
+            namespace = {"__name__": "__main__", "__builtins__": __builtins__}
+        returncode, recycle = 0, False
+        try:
+            os.chdir(job["cwd"])
+            os.environ.update(job["env"])
+            sys.argv = ["-c", *job["args"]]
+            exec(compile(job["code"], "<string>", "exec"), namespace)
+        except SystemExit as e:
+            if e.code is None or isinstance(e.code, int):
+                returncode = e.code or 0
+            else:
+                print(e.code, file=sys.stderr)
+                returncode = 1
+        except MemoryError:
+            traceback.print_exc()
+            returncode, recycle = 1, True
+        except BaseException:
+            traceback.print_exc()
+            returncode = 1
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os.dup2(null_out, 1)
+            os.dup2(null_out, 2)
+            out.close()
+            err.close()
+            os.chdir(base_cwd)
+            os.environ.clear()
+            os.environ.update(base_env)
+        replies.write(json.dumps({"returncode": returncode, "recycle": recycle}) + "\n")
+        replies.flush()
+
+main(json.loads(sys.argv[1]))
+"""
+
+
+class _Worker:
+    def __init__(self, process: asyncio.subprocess.Process):
+        self.process = process
+        self.runs = 0
+
+    @property
+    def pid(self) -> int:
+        return self.process.pid
+
+    @property
+    def alive(self) -> bool:
+        return self.process.returncode is None
+
+    async def call(self, job: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Send one job; None if the worker died before replying"""
+        self.runs += 1
+        try:
+            self.process.stdin.write(json.dumps(job).encode() + b"\n")
+            await self.process.stdin.drain()
+            line = await self.process.stdout.readline()
+        except (BrokenPipeError, ConnectionResetError):
+            return None
+        return json.loads(line) if line else None
+
+    async def kill(self) -> None:
+        if self.alive:
+            try:
+                os.killpg(self.pid, signal.SIGKILL)
+            except (ProcessLookupError, PermissionError):
+                pass
+        await self.process.wait()
+
+
+class PythonWorkerPool:
+    """Pre-started, pre-imported interpreters for exec_python.
+
+    Each call takes an idle worker (up to `size` at once), runs the code with a
+    per-call timeout and returns the same fields as a cold `python -c` run.
+    Workers are replaced after `max_runs` calls, after a MemoryError, a crash or
+    a timeout; replacements are started in the background so the pool stays warm.
+    With `reset_namespace` every call gets fresh globals (cwd and environment are
+    always restored); otherwise globals persist per worker.
+    """
+
+    def __init__(
+        self,
+        size: Optional[int] = None,
+        preload: Optional[List[str]] = None,
+        max_runs: Optional[int] = None,
+        memory_limit_mb: Optional[float] = None,
+        reset_namespace: Optional[bool] = None,
+    ):
+        self.size = size or PYTHON_POOL_CONFIG["SIZE"]
+        self.preload = PYTHON_POOL_CONFIG["PRELOAD"] if preload is None else preload
+        self.max_runs = max_runs or PYTHON_POOL_CONFIG["MAX_RUNS"]
+        self.memory_limit_mb = (
+            PYTHON_POOL_CONFIG["MEMORY_LIMIT_MB"] if memory_limit_mb is None else memory_limit_mb
+        )
+        self.reset_namespace = (
+            PYTHON_POOL_CONFIG["RESET_NAMESPACE"] if reset_namespace is None else reset_namespace
+        )
+        self.interpreter = sys.executable or "python"
+
+        self._slots = asyncio.Semaphore(self.size)
+        self._idle: List[_Worker] = []
+        self._warming: Set[asyncio.Task] = set()
+        self._closed = False
+
+    async def start(self) -> None:
+        """Start all workers up front instead of on first use"""
+        missing = self.size - len(self._idle) - len(self._warming)
+        workers = await asyncio.gather(*(self._spawn() for _ in range(missing)))
+        self._idle.extend(workers)
+
+    async def _spawn(self) -> _Worker:
+        options = {
+            "preload": self.preload,
+            "memory_limit": self.memory_limit_mb * 1024 * 1024 if self.memory_limit_mb else None,
+        }
+        process = await asyncio.create_subprocess_exec(
+            self.interpreter,
+            "-c",
+            _WORKER_SOURCE,
+            json.dumps(options),
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+            start_new_session=True,
+        )
+        worker = _Worker(process)
+        if not await process.stdout.readline():
+            await worker.kill()
+            raise RuntimeError(f"python worker exited during startup ({process.returncode})")
+        return worker
+
+    def _replace(self, worker: _Worker) -> None:
+        """Retire a worker and warm up its successor in the background"""
+        asyncio.create_task(worker.kill())
+        if self._closed:
+            return
+        task = asyncio.create_task(self._spawn())
+        self._warming.add(task)
+        task.add_done_callback(self._on_warmed)
+
+    def _on_warmed(self, task: asyncio.Task) -> None:
+        self._warming.discard(task)
+        if task.cancelled():
+            return
+        if task.exception() is not None:
+            logger.warning(f"Failed to start python worker: {task.exception()}")
+            return
+        if self._closed or len(self._idle) >= self.size:
+            asyncio.create_task(task.result().kill())
+        else:
+            self._idle.append(task.result())
+
+    async def _acquire(self) -> _Worker:
+        while self._idle:
+            worker = self._idle.pop()
+            if worker.alive:
+                return worker
+        return await self._spawn()
+
+    async def run(
+        self,
+        code: str,
+        args: Optional[List[str]] = None,
+        workdir: Optional[str] = None,
+        timeout: float = 120,
+        env: Optional[Dict[str, str]] = None,
+        reset: Optional[bool] = None,
+    ) -> Dict[str, Any]:
+        """Run code on a warm worker; returns returncode/stdout/stderr/timed_out"""
+        if self._closed:
+            raise RuntimeError("python worker pool is closed")
+        job = {
+            "code": code,
+            "args": [str(a) for a in args or []],
+            "cwd": workdir or os.getcwd(),
+            "env": {str(k): str(v) for k, v in (env or {}).items() if v is not None},
+            "reset": self.reset_namespace if reset is None else reset,
+            "stdout": _output_path("stdout"),
+            "stderr": _output_path("stderr"),
+        }
+        async with self._slots:
+            worker = await self._acquire()
+            pid = worker.pid
+            timed_out = False
+            reply = None
+            try:
+                async with asyncio.timeout(timeout):
+                    reply = await worker.call(job)
+            except TimeoutError:
+                timed_out = True
+            finally:
+                if reply is None or reply["recycle"] or worker.runs >= self.max_runs:
+                    self._replace(worker)
+                else:
+                    self._idle.append(worker)
+
+        result: Dict[str, Any] = {"timed_out": timed_out, "worker_pid": pid}
+        if reply is not None:
+            result["returncode"] = reply["returncode"]
+        else:
+            # timed out (partial output is still returned) or crashed
+            await worker.process.wait()
+            result["returncode"] = worker.process.returncode
+        for name in ("stdout", "stderr"):
+            capture = await asyncio.to_thread(_collect, job[name], f"python-{name}")
+            result[name] = capture.text()
+            if capture.truncated:
+                result[f"{name}_summary"] = capture.summary()
+        if reply is None and not timed_out:
+            note = f"python worker crashed (exit status {result['returncode']})"
+            result["stderr"] = f"{result['stderr']}\n{note}" if result["stderr"] else note
+        return result
+
+    async def close(self) -> None:
+        self._closed = True
+        for task in list(self._warming):
+            task.cancel()
+        workers, self._idle = self._idle, []
+        await asyncio.gather(*(worker.kill() for worker in workers))
+
+
+def _output_path(name: str) -> str:
+    os.makedirs(TOOL_OUTPUT_CONFIG["SPILL_DIR"], exist_ok=True)
+    fd, path = tempfile.mkstemp(prefix=f"pyworker-{name}-", dir=TOOL_OUTPUT_CONFIG["SPILL_DIR"])
+    os.close(fd)
+    return path
+
+
+def _collect(path: str, prefix: str) -> OutputCapture:
+    """Move a worker's per-call output file into a bounded capture"""
+    with OutputCapture(prefix=prefix) as capture:
+        try:
+            with open(path, "rb") as f:
+                while chunk := f.read(1024 * 1024):
+                    capture.write(chunk)
+        finally:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+    return capture
+
+
+# One pool per event loop: workers' pipes belong to the loop that started them
+_pools: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, PythonWorkerPool]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_python_pool() -> PythonWorkerPool:
+    loop = asyncio.get_running_loop()
+    pool = _pools.get(loop)
+    if pool is None or pool._closed:
+        pool = _pools[loop] = PythonWorkerPool()
+    return pool
@@ -0,0 +1,290 @@
+import gzip
+import io
+import mmap
+import os
+import re
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+from SREgent.config import TOOL_FS_CONFIG
+from SREgent.tool.dir_scan import matches_any, walk
+
+
+_BINARY_SNIFF_BYTES = 8192
+_MAX_LINE_CHARS = 500  # longer lines are cut in results
+_COUNT_CHUNK = 1024 * 1024
+
+
+class _Budget:
+    """Total match cap shared by the search threads"""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.used = 0
+        self.exhausted = threading.Event()
+        self._lock = threading.Lock()
+
+    def take(self) -> bool:
+        with self._lock:
+            if self.used >= self.limit:
+                self.exhausted.set()
+                return False
+            self.used += 1
+            return True
+
+
+def _clip(line: bytes) -> str:
+    text = line.rstrip(b"\r\n").decode("utf-8", errors="replace")
+    return text if len(text) <= _MAX_LINE_CHARS else text[:_MAX_LINE_CHARS] + "..."
+
+
+class _LiteralMatch:
+    __slots__ = ("_start", "_end")
+
+    def __init__(self, start: int, end: int):
+        self._start, self._end = start, end
+
+    def start(self) -> int:
+        return self._start
+
+    def end(self) -> int:
+        return self._end
+
+
+class _LiteralFinder:
+    """Case-sensitive literal search through bytes.find, much faster than `re`"""
+
+    def __init__(self, needle: bytes):
+        self.needle = needle
+
+    def search(self, data, pos: int = 0, endpos: Optional[int] = None) -> Optional[_LiteralMatch]:
+        start = data.find(self.needle, pos) if endpos is None else data.find(self.needle, pos, endpos)
+        return None if start < 0 else _LiteralMatch(start, start + len(self.needle))
+
+
+def _compile(pattern: str, literal: bool, ignore_case: bool):
+    """A finder with `.search(data, pos)`; plain case-sensitive text skips the regex engine"""
+    if not ignore_case and pattern and (literal or re.escape(pattern) == pattern):
+        return _LiteralFinder(pattern.encode("utf-8"))
+    source = re.escape(pattern) if literal else pattern
+    flags = re.MULTILINE | (re.IGNORECASE if ignore_case else 0)
+    return re.compile(source.encode("utf-8"), flags)
+
+
+def _count_newlines(mm: mmap.mmap, start: int, end: int) -> int:
+    count = 0
+    for pos in range(start, end, _COUNT_CHUNK):
+        count += mm[pos : min(end, pos + _COUNT_CHUNK)].count(b"\n")
+    return count
+
+
+def _search_mmap(
+    path: str, regex: Any, context: int, per_file: int, budget: _Budget
+) -> Tuple[str, List[Dict[str, Any]]]:
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return "ok", []
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if b"\0" in mm[:_BINARY_SNIFF_BYTES]:
+                return "binary", []
+            size = len(mm)
+            matches: List[Dict[str, Any]] = []
+            line_no, counted_to, pos = 1, 0, 0
+            while len(matches) < per_file and not budget.exhausted.is_set():
+                match = regex.search(mm, pos)
+                if match is None:
+                    break
+                line_start = mm.rfind(b"\n", 0, match.start()) + 1
+                line_end = mm.find(b"\n", match.start())
+                line_end = size if line_end < 0 else line_end
+                if match.end() > line_end:
+                    # the match runs into the newline (e.g. `\s`, `timeout\s+\d+`): look
+                    # for one that stays inside this line, otherwise go on to the next
+                    match = regex.search(mm, line_start, line_end)
+                    if match is None:
+                        pos = line_end + 1
+                        if pos >= size:
+                            break
+                        continue
+                line_no += _count_newlines(mm, counted_to, line_start)
+                counted_to = line_start
+                if not budget.take():
+                    break
+
+                item = {
+                    "path": path,
+                    "line": line_no,
+                    "column": len(mm[line_start : match.start()].decode("utf-8", errors="replace")) + 1,
+                    "text": _clip(mm[line_start:line_end]),
+                }
+                if context:
+                    before, start = [], line_start
+                    for _ in range(context):
+                        if start == 0:
+                            break
+                        prev = mm.rfind(b"\n", 0, start - 1) + 1
+                        before.append(_clip(mm[prev : start - 1]))
+                        start = prev
+                    after, end = [], line_end
+                    for _ in range(context):
+                        if end >= size - 1:
+                            break
+                        nxt = mm.find(b"\n", end + 1)
+                        nxt = size if nxt < 0 else nxt
+                        after.append(_clip(mm[end + 1 : nxt]))
+                        end = nxt
+                    item["before"] = before[::-1]
+                    item["after"] = after
+                matches.append(item)
+                # one result per line, like grep
+                pos = line_end + 1
+                if pos >= size:
+                    break
+            return "ok", matches
+
+
+def _open_compressed(path: str) -> Optional[io.BufferedIOBase]:
+    if path.endswith(".gz"):
+        return gzip.open(path, "rb")
+    try:
+        import zstandard
+    except ImportError:
+        return None
+    return io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True))
+
+
+def _search_stream(
+    path: str, regex: Any, context: int, per_file: int, budget: _Budget
+) -> Tuple[str, List[Dict[str, Any]]]:
+    """Line-by-line search of a .gz / .zst file, decompressed on the fly"""
+    stream = _open_compressed(path)
+    if stream is None:
+        return "unsupported", []
+    matches: List[Dict[str, Any]] = []
+    before: deque = deque(maxlen=context)
+    # matches still collecting their trailing context
+    pending: List[Dict[str, Any]] = []
+    with stream:
+        if b"\0" in stream.peek(_BINARY_SNIFF_BYTES)[:_BINARY_SNIFF_BYTES]:
+            return "binary", []
+        for line_no, line in enumerate(stream, 1):
+            for item in pending:
+                item["after"].append(_clip(line))
+            pending = [item for item in pending if len(item["after"]) < context]
+            if len(matches) >= per_file or budget.exhausted.is_set():
+                if not pending:
+                    break
+                continue
+            # matched without the newline, like the mmap search
+            match = regex.search(line[:-1] if line.endswith(b"\n") else line)
+            if match is not None and budget.take():
+                item = {
+                    "path": path,
+                    "line": line_no,
+                    "column": len(line[: match.start()].decode("utf-8", errors="replace")) + 1,
+                    "text": _clip(line),
+                }
+                if context:
+                    item["before"] = list(before)
+                    item["after"] = []
+                    pending.append(item)
+                matches.append(item)
+            if context:
+                before.append(_clip(line))
+    return "ok", matches
+
+
+def _search_file(
+    path: str, regex: Any, context: int, per_file: int, budget: _Budget
+) -> Tuple[str, List[Dict[str, Any]]]:
+    if budget.exhausted.is_set():
+        return "skipped", []
+    try:
+        if path.endswith((".gz", ".zst")):
+            return _search_stream(path, regex, context, per_file, budget)
+        return _search_mmap(path, regex, context, per_file, budget)
+    except (OSError, ValueError, EOFError):
+        return "unreadable", []
+
+
+def _iter_files(
+    root: Path, glob: List[str], exclude: List[str], include_hidden: bool, max_depth: Optional[int]
+) -> Iterator[str]:
+    if not root.is_dir():
+        yield str(root)
+        return
+    for entry, _ in walk(str(root), max_depth, include_hidden, exclude):
+        if entry.is_dir or entry.error:
+            continue
+        if glob and not matches_any(entry.name, glob):
+            continue
+        yield entry.path
+
+
+def search_files(pattern: str,
+                 path: str = ".",
+                 literal: bool = False,
+                 ignore_case: bool = False,
+                 glob: Optional[Union[str, List[str]]] = None,
+                 exclude: Optional[Union[str, List[str]]] = None,
+                 include_hidden: bool = False,
+                 max_depth: Optional[int] = None,
+                 context: int = 0,
+                 max_matches: int = 200,
+                 max_matches_per_file: int = 20,
+                 max_workers: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Search file contents under `path` for a regex (or literal) pattern.
+    - glob / exclude: glob(s) on file names to include / skip (excluded dirs are not entered)
+    - context: lines of context before and after each match
+    - max_matches / max_matches_per_file: caps; `truncated` is set when a cap was hit
+    Files are scanned in parallel through mmap; binary files are skipped and .gz
+    (and .zst, with the optional `zstandard` package) are decompressed on the fly.
+    Matches never span a newline; one is reported per line, with 1-based line
+    and column numbers.
+    """
+    root = Path(path).expanduser()
+    if not root.exists():
+        return {"ok": False, "error": f"path not found: {root}"}
+    try:
+        regex = _compile(pattern, literal, ignore_case)
+    except re.error as e:
+        return {"ok": False, "error": f"invalid pattern: {e}"}
+
+    globs = [glob] if isinstance(glob, str) else list(glob or [])
+    excludes = [exclude] if isinstance(exclude, str) else list(exclude or [])
+    context = max(0, context)
+    budget = _Budget(max_matches)
+    files = list(_iter_files(root, globs, excludes, include_hidden, max_depth))
+
+    workers = max_workers or TOOL_FS_CONFIG["SEARCH_WORKERS"]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(
+            pool.map(
+                lambda f: _search_file(f, regex, context, max_matches_per_file, budget), files
+            )
+        )
+
+    matches: List[Dict[str, Any]] = []
+    skipped: Dict[str, int] = {}
+    files_matched = 0
+    per_file_capped = False
+    for status, found in results:
+        if status != "ok":
+            skipped[status] = skipped.get(status, 0) + 1
+        if found:
+            files_matched += 1
+            matches.extend(found)
+            per_file_capped = per_file_capped or len(found) >= max_matches_per_file
+
+    return {
+        "ok": True,
+        "matches": matches,
+        "files_searched": len(files) - skipped.get("skipped", 0),
+        "files_matched": files_matched,
+        "truncated": budget.exhausted.is_set() or per_file_capped,
+        "skipped": {k: v for k, v in skipped.items() if k != "skipped"},
+    }
@@ -1,13 +1,17 @@
 """File and directory manipulation tool with sandbox support."""
 
-from collections import defaultdict
+import asyncio
+import contextlib
+import os
+import weakref
 from pathlib import Path
-from typing import Any, DefaultDict, List, Literal, Optional, get_args
+from typing import Any, List, Literal, Optional, get_args
 
-from app.config import config
+from SREgent.config import SANDBOX_CONFIG
 from SREgent.exceptions import ToolError
 from SREgent.tool import BaseTool
 from SREgent.tool.base import CLIResult, ToolResult
+from SREgent.tool.edit_history import EditHistory, get_edit_history
 from SREgent.tool.file_operators import (
     FileOperator,
     LocalFileOperator,
@@ -22,24 +26,49 @@ Command = Literal[
     "str_replace",
     "insert",
     "undo_edit",
+    "search",
 ]
 
 # Constants
 SNIPPET_LINES: int = 4
 MAX_RESPONSE_LEN: int = 16000
+SEARCH_MAX_MATCHES: int = 100
 TRUNCATED_MESSAGE: str = (
     "<response clipped><NOTE>To save on context only part of this file has been shown to you. "
-    "You should retry this tool after you have searched inside the file with `grep -n` "
+    "You should retry this tool after you have searched inside the file with the `search` command "
     "in order to find the line numbers of what you are looking for.</NOTE>"
 )
+_SCAN_CHUNK: int = 1024 * 1024
+# commands that read, change and write back a file
+_MUTATING_COMMANDS = ("create", "str_replace", "insert", "undo_edit")
+
+# Per event loop, a lock per file being changed: concurrent edits of one file
+# would otherwise each write back their own copy and lose the other's change
+_path_locks: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, weakref.WeakValueDictionary[str, asyncio.Lock]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _path_lock(path: str) -> asyncio.Lock:
+    loop = asyncio.get_running_loop()
+    locks = _path_locks.get(loop)
+    if locks is None:
+        locks = _path_locks[loop] = weakref.WeakValueDictionary()
+    key = os.path.normpath(path)
+    lock = locks.get(key)
+    if lock is None:
+        lock = locks[key] = asyncio.Lock()
+    return lock
 
 # Tool description
 _STR_REPLACE_EDITOR_DESCRIPTION = """Custom editing tool for viewing, creating and editing files
 * State is persistent across command calls and discussions with the user
 * If `path` is a file, `view` displays the result of applying `cat -n`. If `path` is a directory, `view` lists non-hidden files and directories up to 2 levels deep
+* Large files are shown one window at a time: page through them with `view_range`
+* The `search` command lists the lines of the file at `path` matching the regular expression `pattern`, with their line numbers
 * The `create` command cannot be used if the specified `path` already exists as a file
 * If a `command` generates a long output, it will be truncated and marked with `<response clipped>`
-* The `undo_edit` command will revert the last edit made to the file at `path`
+* The `undo_edit` command will revert the last edit made to the file at `path` (or the last `steps` edits)
 
 Notes for using the `str_replace` command:
 * The `old_str` parameter should match EXACTLY one or more consecutive lines from the original file. Be mindful of whitespaces!
@@ -57,6 +86,48 @@ def maybe_truncate(
     return content[:truncate_after] + TRUNCATED_MESSAGE
 
 
+def _line_offset(text: str, line: int) -> int:
+    """Offset where 0-based `line` starts, counting newlines a chunk at a time"""
+    pos = 0
+    while line > 0 and pos < len(text):
+        chunk_end = min(len(text), pos + _SCAN_CHUNK)
+        count = text.count("\n", pos, chunk_end)
+        if count >= line:
+            for _ in range(line):
+                pos = text.find("\n", pos) + 1
+            return pos
+        line -= count
+        pos = chunk_end
+    return pos
+
+
+def _surrounding_lines(text: str, start: int, end: int, before: int, after: int) -> str:
+    """The lines spanning text[start:end] plus up to `before` / `after` lines around them"""
+    lo = text.rfind("\n", 0, start) + 1
+    for _ in range(before):
+        if lo == 0:
+            break
+        lo = text.rfind("\n", 0, lo - 1) + 1
+    hi = text.find("\n", end)
+    for _ in range(after):
+        if hi < 0:
+            break
+        hi = text.find("\n", hi + 1)
+    return text[lo:] if hi < 0 else text[lo:hi]
+
+
+def _occurrence_lines(text: str, needle: str) -> List[int]:
+    """1-based line numbers where each (non-overlapping) occurrence of `needle` starts"""
+    lines, line, counted = [], 1, 0
+    pos = text.find(needle)
+    while pos >= 0:
+        line += text.count("\n", counted, pos)
+        counted = pos
+        lines.append(line)
+        pos = text.find(needle, pos + len(needle))
+    return lines
+
+
 class StrReplaceEditor(BaseTool):
     """A tool for viewing, creating, and editing files with sandbox support."""
 
@@ -66,8 +137,8 @@ class StrReplaceEditor(BaseTool):
         "type": "object",
         "properties": {
             "command": {
-                "description": "The commands to run. Allowed options are: `view`, `create`, `str_replace`, `insert`, `undo_edit`.",
-                "enum": ["view", "create", "str_replace", "insert", "undo_edit"],
+                "description": "The commands to run. Allowed options are: `view`, `create`, `str_replace`, `insert`, `undo_edit`, `search`.",
+                "enum": ["view", "create", "str_replace", "insert", "undo_edit", "search"],
                 "type": "string",
             },
             "path": {
@@ -95,19 +166,32 @@ class StrReplaceEditor(BaseTool):
                 "items": {"type": "integer"},
                 "type": "array",
             },
+            "pattern": {
+                "description": "Required parameter of `search` command: a regular expression matched against each line of the file.",
+                "type": "string",
+            },
+            "steps": {
+                "description": "Optional parameter of `undo_edit` command: how many of the latest edits to revert (default 1).",
+                "type": "integer",
+                "minimum": 1,
+            },
         },
         "required": ["command", "path"],
     }
-    _file_history: DefaultDict[PathLike, List[str]] = defaultdict(list)
     _local_operator: LocalFileOperator = LocalFileOperator()
     _sandbox_operator: SandboxFileOperator = SandboxFileOperator()
 
+    @property
+    def _file_history(self) -> EditHistory:
+        """Reverse diffs per file, shared by all editors and bounded by EDITOR_HISTORY_CONFIG"""
+        return get_edit_history()
+
     # def _get_operator(self, use_sandbox: bool) -> FileOperator:
     def _get_operator(self) -> FileOperator:
         """Get the appropriate file operator based on execution mode."""
         return (
             self._sandbox_operator
-            if config.sandbox.use_sandbox
+            if SANDBOX_CONFIG["USE_SANDBOX"]
             else self._local_operator
         )
 
@@ -121,12 +205,34 @@ class StrReplaceEditor(BaseTool):
         old_str: str | None = None,
         new_str: str | None = None,
         insert_line: int | None = None,
+        steps: int = 1,
+        pattern: str | None = None,
         **kwargs: Any,
     ) -> str:
         """Execute a file operation command."""
         # Get the appropriate file operator
         operator = self._get_operator()
 
+        # Edits of one file run one at a time; reads and other files are not held up
+        lock = _path_lock(path) if command in _MUTATING_COMMANDS else contextlib.nullcontext()
+        async with lock:
+            return await self._execute(
+                command, path, operator, file_text, view_range, old_str, new_str, insert_line, steps, pattern
+            )
+
+    async def _execute(
+        self,
+        command: Command,
+        path: str,
+        operator: FileOperator,
+        file_text: str | None,
+        view_range: list[int] | None,
+        old_str: str | None,
+        new_str: str | None,
+        insert_line: int | None,
+        steps: int,
+        pattern: str | None,
+    ) -> str:
         # Validate path and command combination
         await self.validate_path(command, Path(path), operator)
 
@@ -137,7 +243,6 @@ class StrReplaceEditor(BaseTool):
             if file_text is None:
                 raise ToolError("Parameter `file_text` is required for command: create")
             await operator.write_file(path, file_text)
-            self._file_history[path].append(file_text)
             result = ToolResult(output=f"File created successfully at: {path}")
         elif command == "str_replace":
             if old_str is None:
@@ -154,7 +259,11 @@ class StrReplaceEditor(BaseTool):
                 raise ToolError("Parameter `new_str` is required for command: insert")
             result = await self.insert(path, insert_line, new_str, operator)
         elif command == "undo_edit":
-            result = await self.undo_edit(path, operator)
+            result = await self.undo_edit(path, operator, steps)
+        elif command == "search":
+            if not pattern:
+                raise ToolError("Parameter `pattern` is required for command: search")
+            result = await self.search(path, pattern, operator)
         else:
             # This should be caught by type checking, but we include it for safety
             raise ToolError(
@@ -237,23 +346,30 @@ class StrReplaceEditor(BaseTool):
         operator: FileOperator,
         view_range: Optional[List[int]] = None,
     ) -> CLIResult:
-        """Display file content, optionally within a specified line range."""
-        # Read file content
-        file_content = await operator.read_file(path)
-        init_line = 1
+        """Display file content, optionally within a specified line range.
 
-        # Apply view range if specified
+        Only the requested lines are read, at most MAX_RESPONSE_LEN bytes of them,
+        so viewing any part of a large file costs about the same.
+        """
+        init_line, final_line = 1, None
         if view_range:
             if len(view_range) != 2 or not all(isinstance(i, int) for i in view_range):
                 raise ToolError(
                     "Invalid `view_range`. It should be a list of two integers."
                 )
-
-            file_lines = file_content.split("\n")
-            n_lines_file = len(file_lines)
             init_line, final_line = view_range
 
-            # Validate view range
+        # Read only the window
+        file_content, info = await operator.read_lines(
+            path,
+            init_line,
+            None if final_line in (None, -1) else final_line,
+            max_bytes=MAX_RESPONSE_LEN,
+        )
+
+        # Validate view range
+        if view_range:
+            n_lines_file = max(1, info["total_lines"])
             if init_line < 1 or init_line > n_lines_file:
                 raise ToolError(
                     f"Invalid `view_range`: {view_range}. Its first element `{init_line}` should be "
@@ -269,17 +385,34 @@ class StrReplaceEditor(BaseTool):
                     f"Invalid `view_range`: {view_range}. Its second element `{final_line}` should be "
                     f"larger or equal than its first `{init_line}`"
                 )
-
-            # Apply range
-            if final_line == -1:
-                file_content = "\n".join(file_lines[init_line - 1 :])
-            else:
-                file_content = "\n".join(file_lines[init_line - 1 : final_line])
+            if file_content.endswith("\n"):
+                file_content = file_content[:-1]
 
         # Format and return result
-        return CLIResult(
-            output=self._make_output(file_content, str(path), init_line=init_line)
-        )
+        output = self._make_output(file_content, str(path), init_line=init_line)
+        if info["truncated"]:
+            output += (
+                f"{TRUNCATED_MESSAGE}\n<NOTE>Shown: lines {init_line}-{info['end_line']} of "
+                f"{info['total_lines']}. Use `view_range` to see the rest.</NOTE>"
+            )
+        return CLIResult(output=output)
+
+    async def search(
+        self, path: PathLike, pattern: str, operator: FileOperator = None
+    ) -> CLIResult:
+        """List the lines of a file matching a regular expression."""
+        matches, capped = await operator.search(path, pattern, SEARCH_MAX_MATCHES)
+        if not matches:
+            return CLIResult(output=f"No lines matching `{pattern}` in {path}.")
+
+        lines = "\n".join(f"{line:6}\t{text}" for line, text in matches)
+        output = f"Lines matching `{pattern}` in {path}:\n{lines}\n"
+        if capped:
+            output += (
+                f"<NOTE>Only the first {SEARCH_MAX_MATCHES} matching lines are shown. "
+                "Use a more specific pattern to see the others.</NOTE>"
+            )
+        return CLIResult(output=maybe_truncate(output))
 
     async def str_replace(
         self,
@@ -290,43 +423,43 @@ class StrReplaceEditor(BaseTool):
     ) -> CLIResult:
         """Replace a unique string in a file with a new string."""
         # Read file content and expand tabs
-        file_content = (await operator.read_file(path)).expandtabs()
+        file_content = await operator.read_file(path)
+        if "\t" in file_content:
+            file_content = file_content.expandtabs()
         old_str = old_str.expandtabs()
         new_str = new_str.expandtabs() if new_str is not None else ""
+        if not old_str:
+            raise ToolError("No replacement was performed, `old_str` is empty.")
 
-        # Check if old_str is unique in the file
-        occurrences = file_content.count(old_str)
-        if occurrences == 0:
+        # Check if old_str is unique in the file; the scan stops at a second occurrence
+        start = file_content.find(old_str)
+        if start < 0:
             raise ToolError(
                 f"No replacement was performed, old_str `{old_str}` did not appear verbatim in {path}."
             )
-        elif occurrences > 1:
-            # Find line numbers of occurrences
-            file_content_lines = file_content.split("\n")
-            lines = [
-                idx + 1
-                for idx, line in enumerate(file_content_lines)
-                if old_str in line
-            ]
+        if file_content.find(old_str, start + len(old_str)) >= 0:
+            lines = _occurrence_lines(file_content, old_str)
             raise ToolError(
                 f"No replacement was performed. Multiple occurrences of old_str `{old_str}` "
                 f"in lines {lines}. Please ensure it is unique"
             )
 
-        # Replace old_str with new_str
-        new_file_content = file_content.replace(old_str, new_str)
+        # Replace old_str with new_str (built in one allocation)
+        new_file_content = file_content.replace(old_str, new_str, 1)
 
         # Write the new content to the file
         await operator.write_file(path, new_file_content)
 
-        # Save the original content to history
-        self._file_history[path].append(file_content)
+        # Save how to get back to the original content (diffing and the journal
+        # write stay off the event loop)
+        await asyncio.to_thread(self._file_history.record, path, file_content, new_file_content)
 
         # Create a snippet of the edited section
-        replacement_line = file_content.split(old_str)[0].count("\n")
+        replacement_line = file_content.count("\n", 0, start)
         start_line = max(0, replacement_line - SNIPPET_LINES)
-        end_line = replacement_line + SNIPPET_LINES + new_str.count("\n")
-        snippet = "\n".join(new_file_content.split("\n")[start_line : end_line + 1])
+        snippet = _surrounding_lines(
+            new_file_content, start, start + len(new_str), SNIPPET_LINES, SNIPPET_LINES
+        )
 
         # Prepare the success message
         success_msg = f"The file {path} has been edited. "
@@ -346,10 +479,11 @@ class StrReplaceEditor(BaseTool):
     ) -> CLIResult:
         """Insert text at a specific line in a file."""
         # Read and prepare content
-        file_text = (await operator.read_file(path)).expandtabs()
+        file_text = await operator.read_file(path)
+        if "\t" in file_text:
+            file_text = file_text.expandtabs()
         new_str = new_str.expandtabs()
-        file_text_lines = file_text.split("\n")
-        n_lines_file = len(file_text_lines)
+        n_lines_file = file_text.count("\n") + 1
 
         # Validate insert_line
         if insert_line < 0 or insert_line > n_lines_file:
@@ -358,27 +492,21 @@ class StrReplaceEditor(BaseTool):
                 f"the range of lines of the file: {[0, n_lines_file]}"
             )
 
-        # Perform insertion
-        new_str_lines = new_str.split("\n")
-        new_file_text_lines = (
-            file_text_lines[:insert_line]
-            + new_str_lines
-            + file_text_lines[insert_line:]
-        )
+        # Perform insertion as new lines after line `insert_line`
+        if insert_line < n_lines_file:
+            offset = _line_offset(file_text, insert_line)
+            new_file_text = "".join((file_text[:offset], new_str, "\n", file_text[offset:]))
+        else:
+            offset = len(file_text) + 1
+            new_file_text = "".join((file_text, "\n", new_str))
 
         # Create a snippet for preview
-        snippet_lines = (
-            file_text_lines[max(0, insert_line - SNIPPET_LINES) : insert_line]
-            + new_str_lines
-            + file_text_lines[insert_line : insert_line + SNIPPET_LINES]
+        snippet = _surrounding_lines(
+            new_file_text, offset, offset + len(new_str), SNIPPET_LINES, SNIPPET_LINES
         )
 
-        # Join lines and write to file
-        new_file_text = "\n".join(new_file_text_lines)
-        snippet = "\n".join(snippet_lines)
-
         await operator.write_file(path, new_file_text)
-        self._file_history[path].append(file_text)
+        await asyncio.to_thread(self._file_history.record, path, file_text, new_file_text)
 
         # Prepare success message
         success_msg = f"The file {path} has been edited. "
@@ -392,17 +520,24 @@ class StrReplaceEditor(BaseTool):
         return CLIResult(output=success_msg)
 
     async def undo_edit(
-        self, path: PathLike, operator: FileOperator = None
+        self, path: PathLike, operator: FileOperator = None, steps: int = 1
     ) -> CLIResult:
-        """Revert the last edit made to a file."""
-        if not self._file_history[path]:
+        """Revert the last `steps` edits made to a file."""
+        if not await asyncio.to_thread(self._file_history.steps, path):
             raise ToolError(f"No edit history found for {path}.")
 
-        old_text = self._file_history[path].pop()
+        current = await operator.read_file(path)
+        try:
+            old_text, undone = await asyncio.to_thread(
+                self._file_history.undo, path, current, max(1, steps)
+            )
+        except ValueError as e:
+            raise ToolError(f"Cannot undo the last edit to {path}: {e}.")
         await operator.write_file(path, old_text)
 
+        what = "Last edit" if undone == 1 else f"Last {undone} edits"
         return CLIResult(
-            output=f"Last edit to {path} undone successfully. {self._make_output(old_text, str(path))}"
+            output=f"{what} to {path} undone successfully. {self._make_output(old_text, str(path))}"
         )
 
     def _make_output(
@@ -1,77 +1,159 @@
+import asyncio
+import codecs
+import collections
+import heapq
+import inspect
+import itertools
 import os
+import signal
 import sys
 import shutil
-import subprocess
+import threading
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple, Union
+
+from SREgent.config import PYTHON_POOL_CONFIG, TOOL_EXEC_CONFIG
+from SREgent.tool.dir_scan import disk_usage, matches_any, walk
+from SREgent.tool.line_index import read_lines
+from SREgent.tool.output_capture import OutputCapture
+from SREgent.tool.python_pool import get_python_pool
+from SREgent.tool.search import search_files
 
 # -------- File tools --------
 
-def list_directory(path: str, recursive: bool = False, include_hidden: bool = False, max_entries: int = 2000) -> Dict[str, Any]:
+def list_directory(path: str,
+                   recursive: bool = False,
+                   include_hidden: bool = False,
+                   max_entries: int = 2000,
+                   max_depth: Optional[int] = None,
+                   pattern: Optional[Union[str, List[str]]] = None,
+                   exclude: Optional[Union[str, List[str]]] = None,
+                   sort_by: Optional[str] = None,
+                   reverse: bool = False,
+                   du: bool = False,
+                   cache_ttl: Optional[float] = None) -> Dict[str, Any]:
+    """
+    List a directory (breadth-first when recursive) using os.scandir.
+    - max_depth: levels below `path` to list (1 = direct children); implies recursive
+    - pattern / exclude: glob(s) on entry names; excluded directories are not entered
+    - sort_by: 'name', 'size' or 'mtime'; the walk keeps only the first max_entries in that order
+    - du: add du-style total_size/file_count to directories and the listing
+    - cache_ttl: reuse directory scans younger than this many seconds (TOOL_FS_CONFIG)
+    """
     p = Path(path).expanduser()
     if not p.exists():
         return {"ok": False, "error": f"path not found: {p}"}
-    results: List[Dict[str, Any]] = []
+    if sort_by not in (None, "name", "size", "mtime"):
+        return {"ok": False, "error": f"unsupported sort_by: {sort_by}"}
+    patterns = [pattern] if isinstance(pattern, str) else list(pattern or [])
+    excludes = [exclude] if isinstance(exclude, str) else list(exclude or [])
+
+    def describe(entry) -> Dict[str, Any]:
+        if entry.error:
+            return {"name": entry.name, "path": entry.path, "type": "unknown", "error": entry.error}
+        item = {
+            "name": entry.name,
+            "path": entry.path,
+            "type": "dir" if entry.is_dir else "file",
+            "size": entry.size,
+        }
+        if sort_by == "mtime":
+            item["mtime"] = entry.get_mtime()
+        return item
 
-    def add_entry(entry_path: Path):
+    if not p.is_dir():
         try:
-            is_dir = entry_path.is_dir()
-            name = entry_path.name
-            if not include_hidden and name.startswith('.'):
-                return
-            results.append({
-                "name": name,
-                "path": str(entry_path),
-                "type": "dir" if is_dir else "file",
-                "size": entry_path.stat().st_size if not is_dir else None,
-            })
-        except Exception as e:
-            results.append({"name": entry_path.name, "path": str(entry_path), "type": "unknown", "error": str(e)})
-
-    if recursive and p.is_dir():
-        for root, dirs, files in os.walk(p):
-            for d in dirs:
-                add_entry(Path(root) / d)
-                if len(results) >= max_entries:
-                    break
-            for f in files:
-                add_entry(Path(root) / f)
-                if len(results) >= max_entries:
-                    break
-            if len(results) >= max_entries:
-                break
-    elif p.is_dir():
-        for child in p.iterdir():
-            add_entry(child)
-            if len(results) >= max_entries:
-                break
+            st = p.stat()
+        except OSError as e:
+            item = {"name": p.name, "path": str(p), "type": "unknown", "error": str(e)}
+            return {"ok": True, "entries": [item], "truncated": False}
+        item = {"name": p.name, "path": str(p), "type": "file", "size": st.st_size}
+        if sort_by == "mtime":
+            item["mtime"] = st.st_mtime
+        return {"ok": True, "entries": [item], "truncated": False}
+
+    if max_depth is None and not recursive:
+        max_depth = 1
+    errors: List[Dict[str, str]] = []
+    seen = 0
+
+    def described():
+        nonlocal seen
+        for entry, _ in walk(str(p), max_depth, include_hidden, excludes, cache_ttl, errors):
+            if patterns and not matches_any(entry.name, patterns):
+                continue
+            seen += 1
+            yield describe(entry)
+
+    if sort_by is None:
+        results = list(itertools.islice(described(), max_entries + 1))
+        truncated = len(results) > max_entries
+        results = results[:max_entries]
     else:
-        add_entry(p)
+        # a bounded heap keeps only the first max_entries while walking; entries without
+        # a value (directories' size, errors) go last either way
+        if reverse:
+            key = lambda e: (1, e[sort_by]) if e.get(sort_by) is not None else (0, 0)
+            results = heapq.nlargest(max_entries, described(), key=key)
+        else:
+            key = lambda e: (0, e[sort_by]) if e.get(sort_by) is not None else (1, 0)
+            results = heapq.nsmallest(max_entries, described(), key=key)
+        truncated = seen > max_entries
 
-    truncated = len(results) >= max_entries
-    return {"ok": True, "entries": results, "truncated": truncated}
+    listing: Dict[str, Any] = {"ok": True, "entries": results, "truncated": truncated}
+    if du:
+        memo: Dict[str, Any] = {}
+        listed_dirs = [item for item in results if item["type"] == "dir" and not os.path.islink(item["path"])]
+        # deepest first, so parents reuse their children's totals
+        for item in sorted(listed_dirs, key=lambda item: item["path"].count(os.sep), reverse=True):
+            item["total_size"], item["file_count"] = disk_usage(item["path"], cache_ttl, memo)
+        listing["total_size"], listing["file_count"] = disk_usage(str(p), cache_ttl, memo)
+    if errors:
+        listing["errors"] = errors[:20]
+    return listing
 
 def read_file(path: str, offset: int = 1, limit: Optional[int] = None, encoding: str = "utf-8") -> Dict[str, Any]:
+    """
+    Read a text file, optionally a line range.
+    - offset: 1-based first line; negative counts from the end (-50 = last 50 lines)
+    - limit: number of lines to read
+
+    Line ranges are served from an mmap and a cached sparse line index, so paging
+    through (or tailing) a multi-GB log only touches the lines returned.
+    """
     p = Path(path).expanduser()
     if not p.exists():
         return {"ok": False, "error": f"file not found: {p}"}
     if p.is_dir():
         return {"ok": False, "error": f"path is a directory: {p}"}
-    if offset < 1:
-        offset = 1
     try:
-        with p.open("r", encoding=encoding, errors="replace") as f:
-            if offset == 1 and limit is None:
+        if offset == 1 and limit is None:
+            with p.open("r", encoding=encoding, errors="replace") as f:
                 content = f.read()
-            else:
+            return {"ok": True, "path": str(p), "content": content}
+
+        if not _line_splittable(encoding):
+            # b"\n" does not delimit lines in UTF-16/32; fall back to decoding everything
+            with p.open("r", encoding=encoding, errors="replace") as f:
                 lines = f.readlines()
-                start = offset - 1
-                end = None if limit is None else start + max(0, limit)
-                content = "".join(lines[start:end])
-        return {"ok": True, "path": str(p), "content": content}
+            start = max(0, len(lines) + offset) if offset < 0 else max(0, offset - 1)
+            end = None if limit is None else start + max(0, limit)
+            return {"ok": True, "path": str(p), "content": "".join(lines[start:end])}
+
+        data, info = read_lines(str(p), offset, limit)
+        return {
+            "ok": True,
+            "path": str(p),
+            "content": data.decode(encoding, errors="replace"),
+            **{k: v for k, v in info.items() if v is not None},
+        }
     except Exception as e:
         return {"ok": False, "error": str(e)}
 
+
+def _line_splittable(encoding: str) -> bool:
+    return not codecs.lookup(encoding).name.startswith(("utf-16", "utf-32"))
+
 def write_file(path: str, content: str, mode: str = "overwrite", encoding: str = "utf-8", create_dirs: bool = False) -> Dict[str, Any]:
     p = Path(path).expanduser()
     try:
@@ -86,6 +168,74 @@ def write_file(path: str, content: str, mode: str = "overwrite", encoding: str =
 
 # -------- Command tools --------
 
+# (stream name, decoded text chunk); may return an awaitable
+OutputCallback = Callable[[str, str], Any]
+
+class _SharedSemaphore:
+    """Counting semaphore for coroutines on any event loop and thread.
+
+    asyncio.Semaphore belongs to one loop; the agents' loops and the blocking
+    wrappers' background loop must draw from the same slots. Slots are handed
+    to waiters in arrival order.
+    """
+
+    def __init__(self, value: int):
+        self._value = value
+        self._lock = threading.Lock()
+        self._waiters: Deque[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = collections.deque()
+
+    async def acquire(self) -> None:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._value > 0 and not self._waiters:
+                self._value -= 1
+                return
+            waiter = (loop, loop.create_future())
+            self._waiters.append(waiter)
+        try:
+            await waiter[1]
+        except asyncio.CancelledError:
+            with self._lock:
+                try:
+                    self._waiters.remove(waiter)
+                    granted = False
+                except ValueError:
+                    granted = True
+            if granted:
+                # the slot was handed over as we were cancelled: pass it on
+                self.release()
+            raise
+
+    def release(self) -> None:
+        with self._lock:
+            while self._waiters:
+                loop, future = self._waiters.popleft()
+                if not loop.is_closed():
+                    loop.call_soon_threadsafe(_grant, future)
+                    return
+            self._value += 1
+
+    async def __aenter__(self) -> None:
+        await self.acquire()
+
+    async def __aexit__(self, *exc_info) -> None:
+        self.release()
+
+
+def _grant(future: asyncio.Future) -> None:
+    # a cancelled waiter gives the slot back itself
+    if not future.done():
+        future.set_result(None)
+
+
+# Bounds the subprocesses all agents run at once, whichever loop they run on
+_process_slots = _SharedSemaphore(TOOL_EXEC_CONFIG["MAX_CONCURRENT_PROCESSES"])
+
+
+def _process_slot() -> _SharedSemaphore:
+    return _process_slots
+
+
 def _merge_env(extra_env: Optional[Dict[str, str]]) -> Dict[str, str]:
     env = os.environ.copy()
     if extra_env:
@@ -94,16 +244,168 @@ def _merge_env(extra_env: Optional[Dict[str, str]]) -> Dict[str, str]:
                 env[str(k)] = str(v)
     return env
 
-def exec_shell(command: str,
-               shell: str = "bash",
-               workdir: Optional[str] = None,
-               timeout: int = 120,
-               env: Optional[Dict[str, str]] = None,
-               use_sudo: bool = False) -> Dict[str, Any]:
+
+def _kill_process_group(proc: asyncio.subprocess.Process) -> None:
+    """Kill the process and everything it spawned (it leads its own session)"""
+    try:
+        if os.name == "posix":
+            os.killpg(proc.pid, signal.SIGKILL)
+        else:
+            proc.kill()
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+async def _pump(
+    stream: asyncio.StreamReader,
+    name: str,
+    capture: OutputCapture,
+    on_output: Optional[OutputCallback],
+) -> None:
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    while True:
+        data = await stream.read(TOOL_EXEC_CONFIG["READ_CHUNK_SIZE"])
+        capture.write(data)
+        if on_output is not None:
+            text = decoder.decode(data, final=not data)
+            if text:
+                result = on_output(name, text)
+                if inspect.isawaitable(result):
+                    await result
+        if not data:
+            return
+
+
+async def _run_process(
+    argv: List[str],
+    cwd: str,
+    env: Dict[str, str],
+    timeout: float,
+    input_text: Optional[str] = None,
+    on_output: Optional[OutputCallback] = None,
+) -> Dict[str, Any]:
+    """Run argv in its own process group inside the shared process pool.
+
+    stdout/stderr are read as they arrive (and passed to `on_output`) into
+    bounded captures, so huge outputs are spilled to disk instead of memory. On
+    timeout or cancellation the whole group is killed and the partial output
+    returned.
+    """
+    async with _process_slot():
+        proc = await asyncio.create_subprocess_exec(
+            *argv,
+            cwd=cwd,
+            env=env,
+            stdin=asyncio.subprocess.PIPE if input_text is not None else asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            start_new_session=True,
+        )
+        stdout = OutputCapture(prefix="stdout")
+        stderr = OutputCapture(prefix="stderr")
+        timed_out = False
+        try:
+            async with asyncio.timeout(timeout):
+                if input_text is not None:
+                    proc.stdin.write(input_text.encode())
+                    try:
+                        await proc.stdin.drain()
+                    except (BrokenPipeError, ConnectionResetError):
+                        pass
+                    proc.stdin.close()
+                await asyncio.gather(
+                    _pump(proc.stdout, "stdout", stdout, on_output),
+                    _pump(proc.stderr, "stderr", stderr, on_output),
+                )
+                await proc.wait()
+        except TimeoutError:
+            timed_out = True
+        finally:
+            stdout.close()
+            stderr.close()
+            if proc.returncode is None:
+                _kill_process_group(proc)
+                await proc.wait()
+
+    result = {
+        "returncode": proc.returncode,
+        "stdout": stdout.text(),
+        "stderr": stderr.text(),
+        "timed_out": timed_out,
+    }
+    # only spilled streams get a summary (line/byte counts and the file to page through)
+    for name, capture in (("stdout", stdout), ("stderr", stderr)):
+        if capture.truncated:
+            result[f"{name}_summary"] = capture.summary()
+    return result
+
+
+def _capture_summaries(proc: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: v for k, v in proc.items() if k.endswith("_summary")}
+
+
+_sync_loop: Optional[asyncio.AbstractEventLoop] = None
+_sync_loop_lock = threading.Lock()
+
+
+def _background_loop() -> asyncio.AbstractEventLoop:
+    """Event loop thread shared by the blocking wrappers.
+
+    Keeping one loop alive lets sync callers share the process pool and the
+    warm python workers instead of rebuilding them per call.
+    """
+    global _sync_loop
+    with _sync_loop_lock:
+        if _sync_loop is None or _sync_loop.is_closed():
+            _sync_loop = asyncio.new_event_loop()
+            threading.Thread(
+                target=_sync_loop.run_forever, name="sregent-tool-loop", daemon=True
+            ).start()
+        return _sync_loop
+
+
+def _run_sync(coro: Awaitable[Dict[str, Any]]) -> Dict[str, Any]:
+    """Run a coroutine from synchronous code, blocking the calling thread.
+
+    Async code should await `aexec_shell` / `aexec_python` instead: called from an
+    event loop this blocks that loop, and from the background loop it would wait
+    for itself forever, so that raises.
+    """
+    loop = _background_loop()
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is loop:
+        coro.close()
+        raise RuntimeError("blocking tool wrappers cannot be called from the tool loop; await the async version")
+    return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+
+def _shell_argv(shell: str, command: str) -> Optional[List[str]]:
+    shell = shell.lower()
+    if shell in ("bash", "sh", "zsh"):
+        return [shell, "-lc", command]
+    if shell == "cmd":
+        return ["cmd", "/c", command]
+    if shell in ("powershell", "pwsh"):
+        pwsh = "pwsh" if shutil.which("pwsh") else "powershell"
+        return [pwsh, "-NoProfile", "-NonInteractive", "-Command", command]
+    return None
+
+
+async def aexec_shell(command: str,
+                      shell: str = "bash",
+                      workdir: Optional[str] = None,
+                      timeout: int = 120,
+                      env: Optional[Dict[str, str]] = None,
+                      use_sudo: bool = False,
+                      on_output: Optional[OutputCallback] = None) -> Dict[str, Any]:
     """
-    Execute shell commands.
+    Execute shell commands without blocking the event loop.
     - shell: 'bash' (default), 'sh', 'zsh', 'cmd', 'powershell'
     - use_sudo: when True, uses env var SUDO_PASSWORD for sudo -S
+    - on_output: called with ("stdout" | "stderr", text) as output arrives
     """
     workdir = workdir or os.getcwd()
     merged_env = _merge_env(env)
@@ -122,83 +424,111 @@ def exec_shell(command: str,
             command = f"sudo -S -p '' {command}"
         ran_with_sudo = True
 
-    try:
-        if shell.lower() in ("bash", "sh", "zsh"):
-            sh = "bash" if shell.lower() == "bash" else ("zsh" if shell.lower() == "zsh" else "sh")
-            proc = subprocess.run(
-                [sh, "-lc", command],
-                input=(sudo_pw + "\n") if ran_with_sudo else None,
-                cwd=workdir,
-                env=merged_env,
-                capture_output=True,
-                text=True,
-                timeout=timeout
-            )
-        elif shell.lower() == "cmd":
-            proc = subprocess.run(
-                ["cmd", "/c", command],
-                cwd=workdir, env=merged_env, capture_output=True, text=True, timeout=timeout
-            )
-        elif shell.lower() in ("powershell", "pwsh"):
-            pwsh = "pwsh" if shutil.which("pwsh") else "powershell"
-            proc = subprocess.run(
-                [pwsh, "-NoProfile", "-NonInteractive", "-Command", command],
-                cwd=workdir, env=merged_env, capture_output=True, text=True, timeout=timeout
-            )
-        else:
-            return {"ok": False, "error": f"unsupported shell: {shell}"}
+    argv = _shell_argv(shell, command)
+    if argv is None:
+        return {"ok": False, "error": f"unsupported shell: {shell}"}
 
-        return {
-            "ok": proc.returncode == 0,
-            "returncode": proc.returncode,
-            "stdout": proc.stdout,
-            "stderr": proc.stderr,
-            "shell": shell,
-            "sudo": ran_with_sudo,
-            "cwd": workdir
-        }
-    except subprocess.TimeoutExpired as e:
-        return {"ok": False, "error": f"timeout after {timeout}s", "stdout": e.stdout, "stderr": e.stderr}
+    try:
+        proc = await _run_process(
+            argv,
+            cwd=workdir,
+            env=merged_env,
+            timeout=timeout,
+            input_text=(sudo_pw + "\n") if ran_with_sudo else None,
+            on_output=on_output,
+        )
     except Exception as e:
         return {"ok": False, "error": str(e)}
 
-def exec_python(code: str,
-                args: Optional[List[str]] = None,
-                workdir: Optional[str] = None,
-                timeout: int = 120,
-                env: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    if proc["timed_out"]:
+        return {"ok": False, "error": f"timeout after {timeout}s", "stdout": proc["stdout"], "stderr": proc["stderr"], **_capture_summaries(proc)}
+    return {
+        "ok": proc["returncode"] == 0,
+        "returncode": proc["returncode"],
+        "stdout": proc["stdout"],
+        "stderr": proc["stderr"],
+        "shell": shell,
+        "sudo": ran_with_sudo,
+        "cwd": workdir,
+        **_capture_summaries(proc),
+    }
+
+
+async def aexec_python(code: str,
+                       args: Optional[List[str]] = None,
+                       workdir: Optional[str] = None,
+                       timeout: int = 120,
+                       env: Optional[Dict[str, str]] = None,
+                       on_output: Optional[OutputCallback] = None,
+                       use_pool: Optional[bool] = None) -> Dict[str, Any]:
     """
-    Execute Python code using current interpreter.
+    Execute Python code using current interpreter, without blocking the event loop.
+    - use_pool: run on a warm worker (see PythonWorkerPool); defaults to PYTHON_POOL_CONFIG
+      ENABLED. Pooled runs report output once the code has finished.
     """
     workdir = workdir or os.getcwd()
-    merged_env = _merge_env(env)
     py = sys.executable or "python"
-    argv = [py, "-c", code]
-    if args:
-        argv += list(map(str, args))
+    if use_pool is None:
+        use_pool = PYTHON_POOL_CONFIG["ENABLED"]
 
     try:
-        proc = subprocess.run(
-            argv,
-            cwd=workdir,
-            env=merged_env,
-            capture_output=True,
-            text=True,
-            timeout=timeout
-        )
-        return {
-            "ok": proc.returncode == 0,
-            "returncode": proc.returncode,
-            "stdout": proc.stdout,
-            "stderr": proc.stderr,
-            "interpreter": py,
-            "cwd": workdir
-        }
-    except subprocess.TimeoutExpired as e:
-        return {"ok": False, "error": f"timeout after {timeout}s", "stdout": e.stdout, "stderr": e.stderr}
+        if use_pool:
+            proc = await get_python_pool().run(
+                code, args=args, workdir=workdir, timeout=timeout, env=env
+            )
+            if on_output is not None:
+                for name in ("stdout", "stderr"):
+                    if proc[name]:
+                        result = on_output(name, proc[name])
+                        if inspect.isawaitable(result):
+                            await result
+        else:
+            argv = [py, "-c", code]
+            if args:
+                argv += list(map(str, args))
+            proc = await _run_process(
+                argv, cwd=workdir, env=_merge_env(env), timeout=timeout, on_output=on_output
+            )
     except Exception as e:
         return {"ok": False, "error": str(e)}
 
+    if proc["timed_out"]:
+        return {"ok": False, "error": f"timeout after {timeout}s", "stdout": proc["stdout"], "stderr": proc["stderr"], **_capture_summaries(proc)}
+    return {
+        "ok": proc["returncode"] == 0,
+        "returncode": proc["returncode"],
+        "stdout": proc["stdout"],
+        "stderr": proc["stderr"],
+        "interpreter": py,
+        "cwd": workdir,
+        **({"worker_pid": proc["worker_pid"]} if use_pool else {}),
+        **_capture_summaries(proc),
+    }
+
+
+def exec_shell(command: str,
+               shell: str = "bash",
+               workdir: Optional[str] = None,
+               timeout: int = 120,
+               env: Optional[Dict[str, str]] = None,
+               use_sudo: bool = False) -> Dict[str, Any]:
+    """
+    Execute shell commands (blocking wrapper around `aexec_shell`).
+    """
+    return _run_sync(aexec_shell(command, shell, workdir, timeout, env, use_sudo))
+
+
+def exec_python(code: str,
+                args: Optional[List[str]] = None,
+                workdir: Optional[str] = None,
+                timeout: int = 120,
+                env: Optional[Dict[str, str]] = None,
+                use_pool: Optional[bool] = None) -> Dict[str, Any]:
+    """
+    Execute Python code using current interpreter (blocking wrapper around `aexec_python`).
+    """
+    return _run_sync(aexec_python(code, args, workdir, timeout, env, use_pool=use_pool))
+
 # -------- JSON Schemas for registration --------
 
 SCHEMA_LIST_DIRECTORY: Dict[str, Any] = {
@@ -207,7 +537,13 @@ SCHEMA_LIST_DIRECTORY: Dict[str, Any] = {
         "path": {"type": "string", "description": "Path to list"},
         "recursive": {"type": "boolean", "default": False},
         "include_hidden": {"type": "boolean", "default": False},
-        "max_entries": {"type": "integer", "default": 2000, "minimum": 1}
+        "max_entries": {"type": "integer", "default": 2000, "minimum": 1},
+        "max_depth": {"type": "integer", "minimum": 1, "description": "Levels to list below path (1 = direct children)"},
+        "pattern": {"anyOf": [{"type": "string"}, {"type": "array", "items": {"type": "string"}}], "description": "Glob(s) entry names must match, e.g. *.log"},
+        "exclude": {"anyOf": [{"type": "string"}, {"type": "array", "items": {"type": "string"}}], "description": "Glob(s) of names to skip (directories are not entered)"},
+        "sort_by": {"type": "string", "enum": ["name", "size", "mtime"]},
+        "reverse": {"type": "boolean", "default": False, "description": "Descending order, e.g. largest or newest first"},
+        "du": {"type": "boolean", "default": False, "description": "Add total size and file count per directory"}
     },
     "required": ["path"]
 }
@@ -216,7 +552,7 @@ SCHEMA_READ_FILE: Dict[str, Any] = {
     "type": "object",
     "properties": {
         "path": {"type": "string"},
-        "offset": {"type": "integer", "default": 1, "minimum": 1},
+        "offset": {"type": "integer", "default": 1, "description": "1-based first line; negative reads the last N lines"},
         "limit": {"anyOf": [{"type": "integer", "minimum": 0}, {"type": "null"}], "default": None},
         "encoding": {"type": "string", "default": "utf-8"}
     },
@@ -235,6 +571,24 @@ SCHEMA_WRITE_FILE: Dict[str, Any] = {
     "required": ["path", "content"]
 }
 
+SCHEMA_SEARCH_FILES: Dict[str, Any] = {
+    "type": "object",
+    "properties": {
+        "pattern": {"type": "string", "description": "Regular expression (or literal text with literal=true)"},
+        "path": {"type": "string", "default": ".", "description": "File or directory to search"},
+        "literal": {"type": "boolean", "default": False},
+        "ignore_case": {"type": "boolean", "default": False},
+        "glob": {"anyOf": [{"type": "string"}, {"type": "array", "items": {"type": "string"}}], "description": "Only search files whose names match, e.g. *.log"},
+        "exclude": {"anyOf": [{"type": "string"}, {"type": "array", "items": {"type": "string"}}], "description": "File/dir name globs to skip"},
+        "include_hidden": {"type": "boolean", "default": False},
+        "max_depth": {"type": "integer", "minimum": 1},
+        "context": {"type": "integer", "default": 0, "minimum": 0, "description": "Lines of context around each match"},
+        "max_matches": {"type": "integer", "default": 200, "minimum": 1},
+        "max_matches_per_file": {"type": "integer", "default": 20, "minimum": 1}
+    },
+    "required": ["pattern"]
+}
+
 SCHEMA_EXEC_SHELL: Dict[str, Any] = {
     "type": "object",
     "properties": {
@@ -263,14 +617,14 @@ SCHEMA_EXEC_PYTHON: Dict[str, Any] = {
 DEFAULT_TOOLS: List[Dict[str, Any]] = [
     {
         "name": "list_directory",
-        "description": "列出目录内容，支持递归与隐藏文件过滤",
+        "description": "列出目录内容，支持递归、深度限制、glob 过滤、按大小/修改时间排序与 du 统计",
         "parameters": SCHEMA_LIST_DIRECTORY,
         "function": list_directory,
         "category": "file",
     },
     {
         "name": "read_file",
-        "description": "读取文本文件内容，支持按行偏移与限制",
+        "description": "读取文本文件内容，支持按行偏移与限制（负偏移读取末尾 N 行），大文件按需分页",
         "parameters": SCHEMA_READ_FILE,
         "function": read_file,
         "category": "file",
@@ -282,18 +636,25 @@ DEFAULT_TOOLS: List[Dict[str, Any]] = [
         "function": write_file,
         "category": "file",
     },
+    {
+        "name": "search_files",
+        "description": "在文件/目录中按正则或字面量搜索内容（并行扫描，跳过二进制，支持 .gz/.zst），返回带行列号与上下文的结构化结果",
+        "parameters": SCHEMA_SEARCH_FILES,
+        "function": search_files,
+        "category": "file",
+    },
     {
         "name": "exec_shell",
         "description": "执行 Shell 命令（bash/sh/zsh/cmd/powershell），可选 sudo 与超时",
         "parameters": SCHEMA_EXEC_SHELL,
-        "function": exec_shell,
+        "function": aexec_shell,
         "category": "command",
     },
     {
         "name": "exec_python",
         "description": "使用当前解释器执行 Python 代码（python -c）",
         "parameters": SCHEMA_EXEC_PYTHON,
-        "function": exec_python,
+        "function": aexec_python,
         "category": "command",
     },
 ]
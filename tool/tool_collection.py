@@ -1,5 +1,6 @@
 """Collection classes for managing multiple tools."""
-from typing import Any, Dict, List
+import json
+from typing import Any, Dict, List, Optional
 
 from SREgent.exceptions import ToolError
 from SREgent.logger import logger
@@ -15,12 +16,46 @@ class ToolCollection:
     def __init__(self, *tools: BaseTool):
         self.tools = tools
         self.tool_map = {tool.name: tool for tool in tools}
+        self._invalidate_params()
 
     def __iter__(self):
         return iter(self.tools)
 
+    def _invalidate_params(self) -> None:
+        """Drop cached schemas; called whenever the set of tools changes."""
+        self._params: Optional[List[Dict[str, Any]]] = None
+        self._params_json: Optional[List[str]] = None
+        self._token_counts: Dict[Any, Dict[str, int]] = {}
+
     def to_params(self) -> List[Dict[str, Any]]:
-        return [tool.to_param() for tool in self.tools]
+        """Tool schemas in OpenAI function calling format (memoized)."""
+        if self._params is None:
+            self._params = [tool.to_param() for tool in self.tools]
+        return self._params
+
+    def _param_jsons(self) -> List[str]:
+        """Each tool's serialized schema, as its tokens are counted (memoized)."""
+        if self._params_json is None:
+            self._params_json = [
+                json.dumps(param, ensure_ascii=False) for param in self.to_params()
+            ]
+        return self._params_json
+
+    def token_counts(self, token_counter: Any) -> Dict[str, int]:
+        """Per-tool token cost of the serialized schemas, cached per tokenizer.
+
+        Args:
+            token_counter: A TokenCounter (anything with `tokenizer` and `count_text`)
+        """
+        key = getattr(token_counter.tokenizer, "name", id(token_counter.tokenizer))
+        counts = self._token_counts.get(key)
+        if counts is None:
+            counts = {
+                tool.name: token_counter.count_text(param_json)
+                for tool, param_json in zip(self.tools, self._param_jsons())
+            }
+            self._token_counts[key] = counts
+        return counts
 
     async def execute(
         self, *, name: str, tool_input: Dict[str, Any] = None
@@ -59,6 +94,7 @@ class ToolCollection:
 
         self.tools += (tool,)
         self.tool_map[tool.name] = tool
+        self._invalidate_params()
         return self
 
     def add_tools(self, *tools: BaseTool):
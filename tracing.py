@@ -0,0 +1,243 @@
+"""Structured per-step spans for the agent loop.
+
+Spans (agent step, think, LLM request, queue/network time, argument parsing,
+tool execution, memory update) are recorded with wall-clock timestamps and
+attributes such as token counts, then handed to pluggable sinks: an in-memory
+ring buffer, a JSONL file or an OpenTelemetry tracer.
+
+Usage:
+    from SREgent.tracing import tracer, RingBufferSink
+
+    sink = tracer.add_sink(RingBufferSink(maxlen=1000))
+    ...
+    slowest = sorted(sink.spans(), key=lambda s: s.duration_ms, reverse=True)
+"""
+import contextlib
+import contextvars
+import json
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import deque
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from pydantic import BaseModel, Field
+
+from SREgent.config import TRACE_CONFIG
+from SREgent.logger import logger
+
+
+def _new_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+class Span(BaseModel):
+    """A timed operation; times are epoch seconds"""
+
+    name: str
+    trace_id: str
+    span_id: str = Field(default_factory=_new_id)
+    parent_id: Optional[str] = None
+    start_time: float = Field(default_factory=time.time)
+    end_time: Optional[float] = None
+    attributes: Dict[str, Any] = Field(default_factory=dict)
+    error: Optional[str] = None
+
+    @property
+    def duration_ms(self) -> Optional[float]:
+        if self.end_time is None:
+            return None
+        return (self.end_time - self.start_time) * 1000
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def set_attributes(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+    def to_dict(self) -> dict:
+        return {**self.model_dump(), "duration_ms": self.duration_ms}
+
+
+class SpanSink(ABC):
+    """Receives spans as they start and end"""
+
+    def on_start(self, span: Span) -> None:
+        """Called when a span starts (most sinks only need on_end)"""
+
+    @abstractmethod
+    def on_end(self, span: Span) -> None:
+        """Called when a span ends"""
+
+    def close(self) -> None:
+        """Flush and release resources"""
+
+
+class RingBufferSink(SpanSink):
+    """Keeps the last `maxlen` finished spans in memory"""
+
+    def __init__(self, maxlen: int = 1000):
+        self._spans: deque = deque(maxlen=maxlen)
+
+    def on_end(self, span: Span) -> None:
+        self._spans.append(span)
+
+    def spans(self, name: Optional[str] = None) -> List[Span]:
+        return [s for s in self._spans if name is None or s.name == name]
+
+    def clear(self) -> None:
+        self._spans.clear()
+
+
+class JsonlFileSink(SpanSink):
+    """Appends each finished span as one JSON line"""
+
+    def __init__(self, path: str):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def on_end(self, span: Span) -> None:
+        line = json.dumps(span.to_dict(), ensure_ascii=False, default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+
+
+class OpenTelemetrySink(SpanSink):
+    """Mirrors spans into an OpenTelemetry tracer (requires `opentelemetry-api`).
+
+    Any configured OTel exporter (OTLP, Jaeger, console, ...) then receives them.
+    """
+
+    def __init__(self, otel_tracer: Any = None):
+        try:
+            from opentelemetry import trace
+        except ImportError as e:
+            raise ImportError(
+                "OpenTelemetrySink requires the 'opentelemetry-api' package"
+            ) from e
+        self._trace = trace
+        self._tracer = otel_tracer or trace.get_tracer("SREgent")
+        self._live: Dict[str, Any] = {}
+
+    def on_start(self, span: Span) -> None:
+        parent = self._live.get(span.parent_id) if span.parent_id else None
+        context = self._trace.set_span_in_context(parent) if parent else None
+        self._live[span.span_id] = self._tracer.start_span(
+            span.name, context=context, start_time=int(span.start_time * 1e9)
+        )
+
+    def on_end(self, span: Span) -> None:
+        otel_span = self._live.pop(span.span_id, None)
+        if otel_span is None:
+            return
+        for key, value in span.attributes.items():
+            if value is not None:
+                otel_span.set_attribute(
+                    key, value if isinstance(value, (str, bool, int, float)) else str(value)
+                )
+        if span.error:
+            otel_span.set_status(self._trace.Status(self._trace.StatusCode.ERROR, span.error))
+        otel_span.end(end_time=int(span.end_time * 1e9))
+
+
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar(
+    "sregent_current_span", default=None
+)
+
+
+class Tracer:
+    """Creates spans and forwards them to the registered sinks.
+
+    The current span is tracked in a context variable, so spans opened in tasks
+    spawned by a step (e.g. concurrent tool calls) are parented correctly.
+    """
+
+    def __init__(self):
+        self.sinks: List[SpanSink] = []
+
+    def add_sink(self, sink: SpanSink) -> SpanSink:
+        self.sinks.append(sink)
+        return sink
+
+    def remove_sink(self, sink: SpanSink) -> None:
+        if sink in self.sinks:
+            self.sinks.remove(sink)
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.sinks)
+
+    @staticmethod
+    def current_span() -> Optional[Span]:
+        return _current_span.get()
+
+    def start_span(
+        self, name: str, parent: Optional[Span] = None, **attributes: Any
+    ) -> Span:
+        """Start a span without making it current (e.g. inside async generators)"""
+        parent = parent or _current_span.get()
+        span = Span(
+            name=name,
+            trace_id=parent.trace_id if parent else _new_id(),
+            parent_id=parent.span_id if parent else None,
+            attributes=attributes,
+        )
+        self._notify("on_start", span)
+        return span
+
+    def end_span(self, span: Span, error: Optional[BaseException] = None) -> None:
+        span.end_time = time.time()
+        if error is not None:
+            span.error = f"{type(error).__name__}: {error}"
+        self._notify("on_end", span)
+
+    @contextlib.contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[Span]:
+        """Context manager that times a block and makes the span current"""
+        span = self.start_span(name, **attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            self.end_span(span, error=e)
+            raise
+        else:
+            self.end_span(span)
+        finally:
+            _current_span.reset(token)
+
+    def _notify(self, method: str, span: Span) -> None:
+        for sink in self.sinks:
+            try:
+                getattr(sink, method)(span)
+            except Exception as e:
+                logger.debug(f"Span sink {type(sink).__name__} failed: {e}")
+
+    def close(self) -> None:
+        for sink in self.sinks:
+            sink.close()
+
+
+def _configure(tracer: Tracer) -> Tracer:
+    """Attach the sinks selected in TRACE_CONFIG"""
+    for name in TRACE_CONFIG["SINKS"]:
+        if name == "memory":
+            tracer.add_sink(RingBufferSink(TRACE_CONFIG["RING_SIZE"]))
+        elif name == "jsonl":
+            tracer.add_sink(JsonlFileSink(TRACE_CONFIG["JSONL_PATH"]))
+        elif name == "otel":
+            tracer.add_sink(OpenTelemetrySink())
+        else:
+            logger.warning(f"Unknown trace sink: {name}")
+    return tracer
+
+
+tracer = _configure(Tracer())